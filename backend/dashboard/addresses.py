@@ -0,0 +1,75 @@
+# dashboard/addresses.py
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import OrderAddress
+
+COUNTRY_ALIASES = {
+    'usa': 'US', 'us': 'US', 'u.s.a.': 'US', 'united states': 'US', 'united states of america': 'US',
+    'bangladesh': 'BD', 'bd': 'BD',
+    'uk': 'GB', 'united kingdom': 'GB', 'england': 'GB', 'great britain': 'GB',
+    'india': 'IN', 'pakistan': 'PK', 'canada': 'CA', 'australia': 'AU', 'germany': 'DE',
+    'france': 'FR', 'netherlands': 'NL', 'singapore': 'SG', 'malaysia': 'MY',
+    'united arab emirates': 'AE', 'uae': 'AE', 'saudi arabia': 'SA',
+}
+# "City, ST 12345" / "ST 12345-6789" (US), and bare 4-6 digit postcodes elsewhere.
+STATE_ZIP_RE = re.compile(r'^(?P<region>[A-Z]{2})\s+(?P<postcode>\d{5}(?:-\d{4})?)$')
+POSTCODE_RE = re.compile(r'\b(\d{4,6}(?:-\d{4})?|[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2})\b', re.IGNORECASE)
+APO_RE = re.compile(r'^(?:[A-Z]{3})\s+(?P<region>A[AEP])\s+(?P<postcode>\d{5})$')
+
+
+@lru_cache(maxsize=65536)
+def parse_address(text):
+    """(country, region, city, postcode) from a free-text address; unknown parts are ''."""
+    parts = [part.strip() for part in re.split(r'[,\n]+', text or '') if part.strip()]
+    country = region = city = postcode = ''
+
+    if parts and parts[-1].lower().strip('. ') in COUNTRY_ALIASES:
+        country = COUNTRY_ALIASES[parts.pop().lower().strip('. ')]
+
+    if parts:
+        last = parts[-1]
+        match = STATE_ZIP_RE.match(last) or APO_RE.match(last)
+        found = None if match else POSTCODE_RE.search(last)
+        if match:
+            # "Springfield, IL 62704": region and postcode share the last part.
+            region, postcode = match.group('region'), match.group('postcode')
+            country = country or 'US'
+            parts.pop()
+        elif found:
+            # "Dhaka 1209" / "London NW1 6XE": the postcode sits next to the city.
+            postcode = found.group(1).upper()
+            city = (last[:found.start()] + last[found.end():]).strip(' -')
+            parts.pop()
+
+    # Whatever is left reads street..., [city], [region] from the end.
+    if not city and not region and len(parts) >= 3:
+        region = parts.pop()
+    if not city and len(parts) >= 2:
+        city = parts.pop()
+    elif not city and len(parts) == 1 and not region and not any(ch.isdigit() for ch in parts[0]):
+        city = parts.pop()
+
+    return (
+        country or settings.ADDRESS_DEFAULT_COUNTRY,
+        region[:64],
+        city[:100].title() if city.isupper() or city.islower() else city[:100],
+        postcode[:16],
+    )
+
+
+def address_row(order_number, text):
+    country, region, city, postcode = parse_address(text)
+    return OrderAddress(order_number=order_number, country=country, region=region, city=city, postcode=postcode)
+
+
+def record_address(order, update_fields=None):
+    """Parse the order's address on write; saves that don't touch delivery_address are skipped."""
+    if update_fields is not None and 'delivery_address' not in update_fields:
+        return
+    row = address_row(order.order_number, order.delivery_address)
+    OrderAddress.objects.update_or_create(order_number=row.order_number, defaults={
+        'country': row.country, 'region': row.region, 'city': row.city, 'postcode': row.postcode,
+    })
@@ -0,0 +1,132 @@
+# dashboard/affinity.py
+import heapq
+from collections import Counter
+from itertools import combinations
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .jobs import enqueue
+from .models import OrderItem, ProductOrderCount, ProductPairCount, ProductAffinity, SyncState
+from .tiers import tiers_for
+from .stores import store_db
+
+# SyncState key holding the number of paid orders with items (the lift denominator),
+# kept incrementally so a settlement does not COUNT every paid order.
+BASKETS = 'affinity.baskets'
+
+
+def count_baskets(baskets):
+    """Item and pair counts for a list of product-id sets. Pairs are keyed (low, high)."""
+    items = Counter()
+    pairs = Counter()
+    for basket in baskets:
+        products = sorted(basket)
+        items.update(products)
+        pairs.update(combinations(products, 2))
+    return items, pairs
+
+
+def paid_order_count():
+    return sum(
+        order_model.objects.filter(payment_status='Paid').count()
+        for order_model, _ in tiers_for()
+    )
+
+
+def basket_count():
+    value = SyncState.get_value(BASKETS)
+    if value is None:
+        value = paid_order_count()
+        SyncState.set_value(BASKETS, value)
+    return int(value)
+
+
+def rank_neighbours(product_id, neighbours, item_counts, baskets):
+    """Top-K ProductAffinity rows from {other product: co-occurring orders}."""
+    product_orders = item_counts.get(product_id, 0)
+    if not product_orders or not baskets:
+        return []
+    scored = []
+    for other_id, orders in neighbours.items():
+        if orders < settings.AFFINITY_MIN_ORDERS or not item_counts.get(other_id):
+            continue
+        confidence = orders / product_orders
+        lift = confidence * baskets / item_counts[other_id]
+        scored.append((lift, confidence, orders, other_id))
+    best = heapq.nlargest(settings.AFFINITY_TOP_K, scored)
+    return [
+        ProductAffinity(
+            product_id=product_id, rank=rank, other_product_id=other_id,
+            orders=orders, confidence=confidence, lift=lift,
+        )
+        for rank, (lift, confidence, orders, other_id) in enumerate(best, start=1)
+    ]
+
+
+def refresh_top_k(product_ids):
+    baskets = basket_count()
+    for product_id in product_ids:
+        neighbours = dict(
+            ProductPairCount.objects.filter(product_id=product_id).values_list('other_product_id', 'orders')
+        )
+        item_counts = dict(
+            ProductOrderCount.objects.filter(product_id__in=[product_id, *neighbours])
+            .values_list('product_id', 'orders')
+        )
+        rows = rank_neighbours(product_id, neighbours, item_counts, baskets)
+        with transaction.atomic(using=store_db()):
+            ProductAffinity.objects.filter(product_id=product_id).delete()
+            ProductAffinity.objects.bulk_create(rows)
+
+
+def increment(model, lookup):
+    """Add one order to a count row, creating it if needed; safe against concurrent settlements."""
+    for _ in range(3):
+        if model.objects.filter(**lookup).update(orders=F('orders') + 1):
+            return
+        try:
+            # The savepoint keeps a lost insert race from breaking the caller's transaction.
+            with transaction.atomic(using=store_db()):
+                _, created = model.objects.get_or_create(defaults={'orders': 1}, **lookup)
+            if created:
+                return
+        except IntegrityError:
+            pass
+    raise IntegrityError(f"Could not increment {model.__name__} {lookup}")
+
+
+def record_paid_order(order_number):
+    """Fold one newly settled order into the counts and re-rank the products it touched.
+
+    This is a same-day approximation. Orders paid by writes that bypass Django (the
+    storefront bot) are not seen, and the lift of untouched products drifts as the
+    basket total grows. The nightly `build_product_affinity` rebuild is the source of
+    truth and resets both.
+    """
+    products = sorted(set(
+        OrderItem.objects.filter(order_number=order_number).values_list('product_id', flat=True)
+    ))
+    if not products:
+        return
+    with transaction.atomic(using=store_db()):
+        SyncState.adjust(BASKETS, 1, paid_order_count)
+        for product_id in products:
+            increment(ProductOrderCount, {'product_id': product_id})
+        for a, b in combinations(products, 2):
+            increment(ProductPairCount, {'product_id': a, 'other_product_id': b})
+            increment(ProductPairCount, {'product_id': b, 'other_product_id': a})
+    refresh_top_k(products)
+
+
+def queue_paid_order(order_number):
+    # Counting and re-ranking run on a job worker, not in the request that settled the order.
+    transaction.on_commit(
+        lambda: enqueue('affinity.record_paid_order', {'order_number': order_number}), using=store_db(),
+    )
+
+
+def schedule_paid_order(order, created=False):
+    if order.became_paid(created):
+        queue_paid_order(order.order_number)
@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
 
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_schema, sender=self)
+
+
+def install_schema(sender, using, **kwargs):
+    # Deploy step for the bot-owned tables: `manage.py migrate` (once per store database,
+    # `--database <store>`) adds the order total columns and the order and review triggers,
+    # then fills old rows and rebuilds the rating summaries.
+    from .order_totals import install_order_totals
+    from .ratings import install_rating_triggers
+    for store, config in settings.STORES.items():
+        if config['database'] == using:
+            install_order_totals(using)
+            install_rating_triggers(store)
+            break
@@ -0,0 +1,28 @@
+# dashboard/authentication.py
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import PermissionDenied
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .stores import can_use_store
+
+
+class StoreAccessMixin:
+    """Refuses (403) an authenticated user the middleware routed to a store they may not use.
+
+    The store comes from a client-chosen header or host, so the middleware only checks
+    that it exists; whether this user belongs to it is only known after authentication.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and not can_use_store(result[0]):
+            raise PermissionDenied("You do not have access to this store.")
+        return result
+
+
+class StoreJWTAuthentication(StoreAccessMixin, JWTAuthentication):
+    pass
+
+
+class StoreSessionAuthentication(StoreAccessMixin, SessionAuthentication):
+    pass
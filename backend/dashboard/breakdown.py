@@ -0,0 +1,140 @@
+# dashboard/breakdown.py
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import OrderCube, OrderCubeOrders, SyncState
+from .tiers import tiers_for
+
+# Whitelisted dimensions: name -> lookup on an order item.
+DIMENSIONS = {
+    'payment_method': 'order_number__payment_method',
+    'delivery_method': 'order_number__delivery_method',
+    'payment_status': 'order_number__payment_status',
+    'order_status': 'order_number__order_status',
+    'category': 'product__category',
+}
+
+MEASURES = {
+    'revenue': lambda: Sum('amount'),
+    'units': lambda: Sum('quantity'),
+    'orders': lambda: Count('order_number', distinct=True),
+}
+
+# Order attributes: one value per order, unlike category.
+ORDER_DIMENSIONS = [dim for dim in DIMENSIONS if dim != 'category']
+
+# v2: builds before order_cube_orders existed must not be read, so the marker was renamed.
+CUBE_BUILT_THROUGH = 'order_cube.v2.built_through'
+
+
+def cube_built_through():
+    """First day not covered by the cube, or None if it has never been built."""
+    value = SyncState.get_value(CUBE_BUILT_THROUGH)
+    return date.fromisoformat(value) if value else None
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def grouped(queryset, fields, annotations):
+    """GROUP BY `fields`; with no fields one aggregate row (values() with no fields would group by every column)."""
+    if fields:
+        return queryset.values(*fields).annotate(**annotations).order_by()
+    row = queryset.aggregate(**annotations)
+    return [row] if any(value is not None for value in row.values()) else []
+
+
+def live_rows(dims, measures, start=None, end=None, by_day=False):
+    """GROUP BY over order items of both tiers for days in [start, end); `by_day` prefixes keys with the day."""
+    since = day_start(start) if start else None
+    totals = {}
+    for _, item_model in tiers_for(since):
+        queryset = item_model.objects.all()
+        if start:
+            queryset = queryset.filter(order_number__timestamp__gte=since)
+        if end:
+            queryset = queryset.filter(order_number__timestamp__lt=day_start(end))
+        if by_day:
+            queryset = queryset.annotate(day=TruncDate('order_number__timestamp'))
+        fields = (['day'] if by_day else []) + [DIMENSIONS[dim] for dim in dims]
+        rows = grouped(queryset, fields, {measure: MEASURES[measure]() for measure in measures})
+        for row in rows:
+            # Each order lives in exactly one tier, so distinct order counts add up across tiers.
+            accumulate(totals, tuple(row[field] for field in fields), row, measures)
+    return totals
+
+
+def cube_sources(dims, measures):
+    """(cube model, measures read from it) pairs answering `measures` grouped by `dims`."""
+    if 'orders' not in measures or 'category' in dims:
+        return [(OrderCube, measures)]
+    # An order spanning several categories is in several OrderCube rows, so its distinct
+    # order counts only add up grouped by category; without category use OrderCubeOrders.
+    rest = [measure for measure in measures if measure != 'orders']
+    return [(OrderCube, rest), (OrderCubeOrders, ['orders'])] if rest else [(OrderCubeOrders, ['orders'])]
+
+
+def cube_rows(dims, measures, start=None, end=None):
+    totals = {}
+    for model, model_measures in cube_sources(dims, measures):
+        queryset = model.objects.all()
+        if start:
+            queryset = queryset.filter(day__gte=start)
+        if end:
+            queryset = queryset.filter(day__lt=end)
+        rows = grouped(queryset, dims, {measure: Sum(measure) for measure in model_measures})
+        for row in rows:
+            accumulate(totals, tuple(row[dim] for dim in dims), row, model_measures, measures)
+    return totals
+
+
+def accumulate(totals, key, row, measures, all_measures=None):
+    entry = totals.setdefault(key, dict.fromkeys(all_measures or measures, 0))
+    for measure in measures:
+        entry[measure] += row[measure] or 0
+
+
+def grouping(dims, measures, start=None, end=None):
+    """Totals for one grouping set, from the cube for complete days and live SQL for the rest."""
+    built_through = cube_built_through()
+    if built_through is None or (start and start >= built_through):
+        return live_rows(dims, measures, start, end), 'live'
+
+    cube_end = min(end, built_through) if end else built_through
+    totals = cube_rows(dims, measures, start, cube_end)
+    if end and end <= built_through:
+        return totals, 'cube'
+    for key, row in live_rows(dims, measures, built_through, end).items():
+        accumulate(totals, key, row, measures)
+    return totals, 'cube+live'
+
+
+def breakdown(dims, measures, start=None, end=None, rollup=False):
+    """Rows for `dims` plus, with `rollup`, subtotals for each dimension prefix and a grand total."""
+    levels = range(len(dims), -1, -1) if rollup else [len(dims)]
+    rows = []
+    sources = set()
+    for level in levels:
+        totals, source = grouping(dims[:level], measures, start, end)
+        sources.update(source.split('+'))
+        for key, values in totals.items():
+            row = dict(zip(dims, key + (None,) * (len(dims) - level)))
+            row.update({measure: float(values[measure]) for measure in measures})
+            row['level'] = level
+            rows.append(row)
+    return rows, '+'.join(sorted(sources))
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def day_after(value):
+    return value + timedelta(days=1) if value else None
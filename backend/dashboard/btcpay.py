@@ -0,0 +1,90 @@
+# dashboard/btcpay.py
+import http.client
+import json
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+
+# Greenfield invoice status -> (payment_status, order_status), same mapping as the webhook.
+INVOICE_STATUSES = {
+    'Settled': ('Paid', 'Processing'),
+    'Expired': ('Failed', 'Cancelled'),
+    'Invalid': ('Failed', 'Cancelled'),
+}
+
+
+class GreenfieldClient:
+    """Minimal Greenfield API client with one keep-alive connection per thread."""
+
+    def __init__(self, base_url=None, api_key=None, store_id=None, timeout=30):
+        parts = urlsplit(base_url or settings.BTCPAY_URL)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.api_key = api_key or settings.BTCPAY_API_KEY
+        self.store_id = store_id or settings.BTCPAY_STORE_ID
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def connection(self):
+        if getattr(self._local, 'connection', None) is None:
+            self._local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        return self._local.connection
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def get(self, path, params):
+        url = f"{self.prefix}{path}?{urlencode(params)}"
+        headers = {'Authorization': f'token {self.api_key}', 'Accept': 'application/json'}
+        for attempt in range(2):
+            try:
+                connection = self.connection()
+                connection.request('GET', url, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; reconnect once.
+                self.close()
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"BTCPay returned HTTP {response.status} for {path}: {body[:200]!r}")
+        return json.loads(body)
+
+    def invoices(self, skip, take, start=None, end=None):
+        params = {'skip': skip, 'take': take}
+        if start is not None:
+            params['startDate'] = start
+        if end is not None:
+            params['endDate'] = end
+        return self.get(f"/api/v1/stores/{self.store_id}/invoices", params)
+
+
+def corrections(invoices, orders):
+    """{(payment_status, order_status) changes: [order_number]} for orders whose statuses lag their invoice.
+
+    `orders` holds the current order rows keyed by invoice_id. A Paid order is never
+    failed, and fulfilment progress past Processing is never rolled back.
+    """
+    grouped = {}
+    for invoice in invoices:
+        target = INVOICE_STATUSES.get(invoice.get('status'))
+        order = orders.get(invoice.get('id'))
+        if target is None or order is None:
+            continue
+        payment_status, order_status = target
+        if order['payment_status'] == payment_status:
+            continue
+        if order['payment_status'] == 'Paid':
+            continue
+        changes = {'payment_status': payment_status}
+        if order['order_status'] in (None, '', 'Pending'):
+            changes['order_status'] = order_status
+        grouped.setdefault(tuple(sorted(changes.items())), []).append(order['order_number'])
+    return grouped
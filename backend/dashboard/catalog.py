@@ -0,0 +1,79 @@
+# dashboard/catalog.py
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .media import versioned_url
+from .models import Category, Product, ProductRatingSummary, StoreInfo
+from .versions import get_version, bump_version
+from .stores import current_store, store_db
+
+VERSION_NAME = 'catalog'
+
+
+class Document:
+    """Pre-encoded JSON body with its strong ETag."""
+
+    def __init__(self, data):
+        self.body = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+        self.etag = '"%s"' % hashlib.sha256(self.body).hexdigest()[:32]
+
+
+class CatalogSnapshot:
+    def __init__(self, version):
+        self.version = version
+
+        ratings = {
+            summary.product_id: {'count': summary.count, 'average': round(summary.average, 2)}
+            for summary in ProductRatingSummary.objects.all()
+        }
+        products = [{
+            'product_id': product.product_id,
+            'product_name': product.product_name,
+            'category': product.category,
+            'category_id': product.category_ref_id,
+            'details': product.details,
+            'price': product.price,
+            'image': f"{settings.PUBLIC_BASE_URL}{versioned_url(product.image.name)}" if product.image else None,
+            'rating': ratings.get(product.product_id),
+        } for product in Product.objects.order_by('product_id')]
+        categories = list(Category.objects.order_by('name').values('category_id', 'name'))
+        store = StoreInfo.objects.values(
+            'about', 'contact_email', 'currency', 'delivery_fee', 'store_image'
+        ).first() or {}
+        if store.get('store_image'):
+            store['store_image'] = f"{settings.PUBLIC_BASE_URL}{versioned_url(store['store_image'])}"
+
+        self.documents = {
+            'catalog': Document({'products': products, 'categories': categories, 'store': store}),
+            'products': Document(products),
+            'categories': Document(categories),
+            'store': Document(store),
+        }
+        self.products = {product['product_id']: Document(product) for product in products}
+
+
+# store -> CatalogSnapshot
+_snapshots = {}
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """The current store's snapshot, rebuilt lazily (once per worker) after any catalog write."""
+    store = current_store()
+    version = get_version(VERSION_NAME)
+    snapshot = _snapshots.get(store)
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            snapshot = _snapshots.get(store)
+            if snapshot is None or snapshot.version != version:
+                snapshot = _snapshots[store] = CatalogSnapshot(version)
+    return snapshot
+
+
+def invalidate():
+    transaction.on_commit(lambda: bump_version(VERSION_NAME), using=store_db())
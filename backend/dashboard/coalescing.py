@@ -0,0 +1,129 @@
+# dashboard/coalescing.py
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .throttling import admitted
+from .versions import get_version, bump_version
+from .stores import current_store, store_db
+
+DATA_VERSIONS = ('orders', 'catalog')
+METRICS = ('executed', 'coalesced_local', 'coalesced_shared')
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def count(metric):
+    key = f'singleflight:metrics:{metric}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def metrics():
+    values = {metric: cache.get(f'singleflight:metrics:{metric}', 0) for metric in METRICS}
+    total = sum(values.values())
+    coalesced = values['coalesced_local'] + values['coalesced_shared']
+    return {**values, 'requests': total, 'coalescing_ratio': round(coalesced / total, 4) if total else 0}
+
+
+def orders_changed():
+    """Call on any order or order item write; cached and in-flight results keyed on the old version go stale."""
+    transaction.on_commit(lambda: bump_version('orders'), using=store_db())
+
+
+def flight_key(view_name, request):
+    params = sorted((name, tuple(values)) for name, values in request.query_params.lists())
+    versions = [get_version(name) for name in DATA_VERSIONS]
+    # The store is part of the key because in-process flights are shared by all stores.
+    raw = repr((current_store(), view_name, params, versions))
+    return 'singleflight:' + hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def shared_result(key, compute):
+    """Run `compute` once across workers: the first caller holds a cache lock, the rest poll for its result.
+
+    The result is only kept long enough for the callers already waiting to pick it up;
+    this is not a result cache, so a request arriving later computes fresh numbers.
+    """
+    result_key, lock_key = f'{key}:result', f'{key}:lock'
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        result = cache.get(result_key)
+        if result is not None:
+            count('coalesced_shared')
+            return result
+        if cache.add(lock_key, 1, timeout=settings.SINGLE_FLIGHT_LOCK_SECONDS):
+            try:
+                result = compute()
+                count('executed')
+                cache.set(result_key, result, timeout=settings.SINGLE_FLIGHT_RESULT_SECONDS)
+                return result
+            finally:
+                cache.delete(lock_key)
+        if time.monotonic() >= deadline:
+            # The leader is too slow (or gone); compute rather than wait forever.
+            result = compute()
+            count('executed')
+            return result
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def single_flight(key, compute):
+    """Share one computation between identical concurrent callers in this process, then across workers."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+
+    if not leader:
+        flight.done.wait()
+        count('coalesced_local')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = shared_result(key, compute)
+        return flight.result
+    except Exception as error:
+        flight.error = error
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def coalesced(get):
+    """Decorator for analytics `get` methods whose response depends only on the query string and data."""
+    @wraps(get)
+    def wrapper(self, request, *args, **kwargs):
+        def compute():
+            with admitted(self.admission_pool):
+                response = get(self, request, *args, **kwargs)
+            return response.status_code, response.data
+
+        status_code, data = single_flight(flight_key(type(self).__name__, request), compute)
+        return Response(data, status=status_code)
+    return wrapper
@@ -0,0 +1,87 @@
+# dashboard/customers.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import CustomerStats, SyncState
+from .tiers import tiers_for
+from .stores import store_db
+
+# SyncState key holding the number of customer_stats rows, so the all-time
+# customer count is a primary key lookup rather than a COUNT(*) scan.
+# Django and webhook writes refresh a customer right away; orders the bot inserts
+# directly arrive with the scheduled `rebuild_customer_stats` (JOBS_SCHEDULE).
+CUSTOMER_COUNT = 'customers.count'
+
+
+def customer_rows(user_ids):
+    """Build unsaved CustomerStats rows for `user_ids` from both order tiers."""
+    stats = {}
+    for order_model, item_model in tiers_for():
+        orders = order_model.objects.filter(user_id__in=user_ids)
+        for user_id, username, timestamp in orders.values_list('user_id', 'username', 'timestamp'):
+            row = stats.get(user_id)
+            if row is None:
+                row = stats[user_id] = CustomerStats(
+                    user_id=user_id, username=username, order_count=0, paid_revenue=Decimal(0),
+                )
+            row.order_count += 1
+            if timestamp is None:
+                continue
+            if row.first_order_at is None or timestamp < row.first_order_at:
+                row.first_order_at = timestamp
+            if row.last_order_at is None or timestamp >= row.last_order_at:
+                row.last_order_at = timestamp
+                row.username = username
+
+        paid = (
+            item_model.objects
+            .filter(order_number__user_id__in=user_ids, order_number__payment_status='Paid')
+            .values('order_number__user_id')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for entry in paid:
+            stats[entry['order_number__user_id']].paid_revenue += entry['total'] or 0
+    return list(stats.values())
+
+
+def refresh_customer(user_id):
+    if user_id is None:
+        return
+    rows = customer_rows([user_id])
+    if not rows:
+        deleted, _ = CustomerStats.objects.filter(user_id=user_id).delete()
+        if deleted:
+            adjust_customer_count(-1)
+        return
+    row = rows[0]
+    _, created = CustomerStats.objects.update_or_create(user_id=user_id, defaults={
+        'username': row.username,
+        'order_count': row.order_count,
+        'paid_revenue': row.paid_revenue,
+        'first_order_at': row.first_order_at,
+        'last_order_at': row.last_order_at,
+    })
+    if created:
+        adjust_customer_count(1)
+
+
+def adjust_customer_count(delta):
+    # First use: seed from the table, which already includes this change.
+    SyncState.adjust(CUSTOMER_COUNT, delta, CustomerStats.objects.count)
+
+
+def customer_total():
+    """Customers with at least one order; orders without a user_id (guests) are not counted."""
+    value = SyncState.get_value(CUSTOMER_COUNT)
+    if value is None:
+        value = CustomerStats.objects.count()
+        SyncState.set_value(CUSTOMER_COUNT, value)
+    return int(value)
+
+
+def schedule_refresh(user_id):
+    # Recompute after commit so the aggregate sees the write that triggered it.
+    transaction.on_commit(lambda: refresh_customer(user_id), using=store_db())
@@ -0,0 +1,66 @@
+# dashboard/forecasting.py
+import numpy as np
+
+SEASON = 7  # weekly seasonality of daily series
+Z_95 = 1.96
+
+# Smoothing parameter grid (alpha: level, beta: trend, gamma: season); every
+# series is fitted with every combination at once and keeps its best.
+ALPHAS = (0.05, 0.2, 0.4, 0.7)
+BETAS = (0.0, 0.05, 0.2)
+GAMMAS = (0.05, 0.2, 0.5)
+
+
+def holt_winters(y, horizon, season=SEASON):
+    """Additive Holt-Winters fitted to every row of `y` (series x days) in one vectorized pass.
+
+    Returns (forecast, lower, upper), each series x horizon, with a 95% band
+    from the in-sample one-step error and the usual h-step variance factor.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n_series, n_days = y.shape
+    grid = np.array([(a, b, g) for a in ALPHAS for b in BETAS for g in GAMMAS])
+    n_params = len(grid)
+
+    # One row per (series, parameter set).
+    ys = np.repeat(y, n_params, axis=0)
+    alpha, beta, gamma = (np.tile(grid[:, i], n_series) for i in range(3))
+
+    first, second = ys[:, :season].mean(axis=1), ys[:, season:2 * season].mean(axis=1)
+    level = first.copy()
+    trend = (second - first) / season
+    seasonal = ys[:, :season] - first[:, None]
+
+    sse = np.zeros(len(ys))
+    for t in range(n_days):
+        s = seasonal[:, t % season]
+        error = ys[:, t] - (level + trend + s)
+        if t >= season:
+            sse += error ** 2
+        new_level = alpha * (ys[:, t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[:, t % season] = gamma * (ys[:, t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    # Best parameter set per series.
+    sse = sse.reshape(n_series, n_params)
+    best = sse.argmin(axis=1)
+    rows = np.arange(n_series) * n_params + best
+    level, trend, seasonal = level[rows], trend[rows], seasonal[rows]
+    alpha, beta, gamma = alpha[rows], beta[rows], gamma[rows]
+    sigma = np.sqrt(sse[np.arange(n_series), best] / max(n_days - season, 1))
+
+    steps = np.arange(1, horizon + 1)
+    forecast = (
+        level[:, None] + steps[None, :] * trend[:, None]
+        + seasonal[:, (n_days + steps - 1) % season]
+    )
+
+    # Var(h) = sigma^2 * (1 + sum_{j<h} (alpha(1 + j*beta) + gamma*[j mod m == 0])^2)
+    j = np.arange(1, horizon)
+    terms = (alpha[:, None] * (1 + j[None, :] * beta[:, None]) + gamma[:, None] * (j % season == 0)[None, :]) ** 2
+    factor = np.sqrt(1 + np.concatenate([np.zeros((n_series, 1)), np.cumsum(terms, axis=1)], axis=1))
+    band = Z_95 * sigma[:, None] * factor
+
+    # Revenue and order counts are never negative.
+    return np.maximum(forecast, 0), np.maximum(forecast - band, 0), np.maximum(forecast + band, 0)
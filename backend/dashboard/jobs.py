@@ -0,0 +1,158 @@
+# dashboard/jobs.py
+import contextvars
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job, SyncState
+from .stores import store_db, store_connection
+
+_tasks = {}
+
+
+def task(name):
+    """Register a function as a job task: `@task('orders.refresh_totals')`."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    if name not in _tasks:
+        autodiscover_modules('tasks')
+    return _tasks[name]
+
+
+def enqueue(task_name, payload=None, priority=0, delay=None, max_attempts=None):
+    """Queue a job. Inside a transaction the job commits (or rolls back) with the caller's writes."""
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        priority=priority,
+        run_at=timezone.now() + (delay or timedelta()),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def worker_name(suffix=''):
+    return f"{socket.gethostname()}:{os.getpid()}{suffix}"
+
+
+def ready_jobs():
+    return Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).order_by('-priority', 'run_at', 'id')
+
+
+def claim(worker):
+    """Lock and mark the next ready job as running; None when the queue is empty."""
+    now = timezone.now()
+    if store_connection().features.has_select_for_update_skip_locked:
+        # MySQL 8 / PostgreSQL: concurrent workers skip each other's locked rows.
+        with transaction.atomic(using=store_db()):
+            job = ready_jobs().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status, job.locked_by, job.locked_at = Job.RUNNING, worker, now
+            job.attempts += 1
+            job.save(update_fields=['status', 'locked_by', 'locked_at', 'attempts'])
+            return job
+
+    # SQLite and older MySQL: optimistic claim, retrying when another worker wins the race.
+    for _ in range(5):
+        job_id = ready_jobs().values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def backoff(attempts):
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped."""
+    delay = min(settings.JOBS_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOBS_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+@contextmanager
+def lease(job):
+    """Renew the job's lease while it runs, so requeue_stale() only sees jobs whose worker died."""
+    stop = threading.Event()
+
+    def renew():
+        try:
+            while not stop.wait(settings.JOBS_LEASE_SECONDS / 3):
+                Job.objects.filter(id=job.id, locked_by=job.locked_by).update(locked_at=timezone.now())
+        finally:
+            connections[store_db()].close()
+
+    # Copy the context so the renewer writes to the same store database as the worker.
+    renewer = threading.Thread(target=contextvars.copy_context().run, args=(renew,), daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        renewer.join()
+
+
+def run(job):
+    try:
+        with lease(job):
+            result = get_task(job.task)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            job.status, job.run_at = Job.QUEUED, timezone.now() + backoff(job.attempts)
+        else:
+            job.status, job.finished_at = Job.FAILED, timezone.now()
+    else:
+        job.status, job.result, job.finished_at = Job.SUCCEEDED, result, timezone.now()
+    job.locked_by = job.locked_at = None
+    job.save(update_fields=['status', 'result', 'last_error', 'run_at', 'finished_at', 'locked_by', 'locked_at'])
+    return job
+
+
+def requeue_stale():
+    """Return jobs whose worker died mid-run (lease expired) to the queue; workers call it periodically."""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOBS_LEASE_SECONDS))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, locked_by=None, locked_at=None, last_error='Worker lease expired',
+    )
+    return stale.update(status=Job.QUEUED, locked_by=None, locked_at=None)
+
+
+def enqueue_scheduled():
+    """Queue each JOBS_SCHEDULE command whose interval has passed; workers call it periodically.
+
+    The last run time is a SyncState row claimed with a compare-and-set UPDATE, so one
+    worker queues each run however many are sweeping.
+    """
+    now = time.time()
+    queued = []
+    for name, seconds in settings.JOBS_SCHEDULE.items():
+        key = f'jobs.schedule.{name}'
+        last = SyncState.get_value(key)
+        if last is None:
+            _, claimed = SyncState.objects.get_or_create(key=key, defaults={'value': str(now)})
+        elif now - float(last) < seconds:
+            continue
+        else:
+            claimed = SyncState.objects.filter(key=key, value=last).update(value=str(now))
+        if claimed:
+            queued.append(enqueue('management.command', {'name': name}))
+    return queued
@@ -0,0 +1,135 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncMonth
+from dashboard.models import Product, Order, OrderItem
+from dashboard.stores import store_connection
+
+
+def advised_queries():
+    # Mirrors the querysets built by the analytics/list views and the webhook.
+    paid_items = OrderItem.objects.filter(order_number__payment_status='Paid')
+    return [
+        ('summary.total_revenue', paid_items.values('amount')),
+        ('summary.active_orders', Order.objects.filter(order_status__in=['Pending', 'Processing', 'Shipped'])),
+        ('summary.total_customers', Order.objects.values('user_id').distinct()),
+        ('summary.revenue_trend', paid_items.annotate(month=TruncMonth('order_number__timestamp'))
+            .values('month').annotate(amount=Sum('amount')).order_by('month')),
+        ('summary.recent_orders', Order.objects.order_by('-timestamp')[:5]),
+        ('order.items', OrderItem.objects.filter(order_number='ORD-0000')),
+        ('analytics.products', paid_items.values('product_id')
+            .annotate(sales=Sum('quantity'), revenue=Sum('amount')).order_by('-sales')),
+        ('analytics.orders.monthly', Order.objects.annotate(month=TruncMonth('timestamp'))
+            .values('month').annotate(count=Count('order_number')).order_by('month')),
+        ('analytics.revenue.paid_orders', Order.objects.filter(payment_status='Paid')),
+        ('orders.list', Order.objects.all()[:100]),
+        ('products.list', Product.objects.all()[:100]),
+        ('webhook.invoice_lookup', Order.objects.filter(invoice_id='INV-0000')),
+    ]
+
+
+def explain(queryset):
+    connection = store_connection()
+    sql, params = queryset.query.sql_with_params()
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Return the tables a plan reads without using any index."""
+    connection = store_connection()
+    tables = []
+    for row in plan:
+        if connection.vendor == 'mysql':
+            if row.get('type') == 'ALL':
+                tables.append(row.get('table'))
+        elif connection.vendor == 'sqlite':
+            detail = row.get('detail', '')
+            if detail.startswith('SCAN ') and 'INDEX' not in detail:
+                tables.append(detail.split()[1])
+        elif connection.vendor == 'postgresql':
+            line = next(iter(row.values()))
+            if 'Seq Scan on ' in line:
+                tables.append(line.split('Seq Scan on ')[1].split()[0])
+    return tables
+
+
+def missing_indexes():
+    """Yield (table, index name, columns) for declared indexes of unmanaged models that the database lacks."""
+    connection = store_connection()
+    with connection.cursor() as cursor:
+        for model in apps.get_app_config('dashboard').get_models():
+            if model._meta.managed or not model._meta.indexes:
+                continue
+            table = model._meta.db_table
+            existing = [
+                info['columns'] for info in
+                connection.introspection.get_constraints(cursor, table).values()
+                if info['index'] or info['unique'] or info['primary_key']
+            ]
+            for index in model._meta.indexes:
+                columns = [model._meta.get_field(name).column for name in index.fields]
+                # Any existing index with the same leading columns already serves the query.
+                if any(cols[:len(columns)] == columns for cols in existing):
+                    continue
+                yield table, index.name, columns
+
+
+def create_index_sql(table, name, columns):
+    connection = store_connection()
+    qn = connection.ops.quote_name
+    cols = ', '.join(qn(col) for col in columns)
+    if connection.vendor == 'mysql':
+        # MySQL has no IF NOT EXISTS for indexes; idempotency comes from the introspection check.
+        return f'CREATE INDEX {qn(name)} ON {qn(table)} ({cols}) ALGORITHM=INPLACE LOCK=NONE'
+    if connection.vendor == 'postgresql':
+        return f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} ON {qn(table)} ({cols})'
+    return f'CREATE INDEX IF NOT EXISTS {qn(name)} ON {qn(table)} ({cols})'
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the dashboard queries, flag full table scans and generate online CREATE INDEX DDL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help='Create the missing indexes')
+        parser.add_argument(
+            '--lock-wait-timeout', type=int, default=5,
+            help='Seconds to wait for a metadata lock before giving up (MySQL only)',
+        )
+
+    def handle(self, *args, **options):
+        connection = store_connection()
+        scanned = set()
+        for label, queryset in advised_queries():
+            tables = full_scans(explain(queryset))
+            scanned.update(tables)
+            if tables:
+                self.stdout.write(self.style.WARNING(f"⚠️  {label}: full scan on {', '.join(tables)}"))
+            else:
+                self.stdout.write(f"{label}: ok")
+
+        statements = [
+            (table, create_index_sql(table, name, columns))
+            for table, name, columns in missing_indexes()
+        ]
+        if not statements:
+            self.stdout.write(self.style.SUCCESS("✅ All declared indexes exist"))
+            return
+
+        for table, sql in statements:
+            note = '  -- full scan seen' if table in scanned else ''
+            self.stdout.write(f"{sql};{note}")
+
+        if not options['apply']:
+            return
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                # Never queue behind long transactions and block traffic waiting for the DDL lock.
+                cursor.execute('SET SESSION lock_wait_timeout = %s', [options['lock_wait_timeout']])
+            for _, sql in statements:
+                cursor.execute(sql)
+                self.stdout.write(self.style.SUCCESS(f"✅ {sql}"))
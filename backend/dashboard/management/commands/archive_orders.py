@@ -0,0 +1,70 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from dashboard.models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from dashboard.stores import store_db, store_connection
+
+
+def copy_rows(cursor, source, target, keys):
+    qn = store_connection().ops.quote_name
+    columns = ', '.join(qn(field.column) for field in source._meta.concrete_fields)
+    placeholders = ', '.join(['%s'] * len(keys))
+    cursor.execute(
+        f"INSERT INTO {qn(target._meta.db_table)} ({columns}) "
+        f"SELECT {columns} FROM {qn(source._meta.db_table)} WHERE {qn('order_number')} IN ({placeholders})",
+        keys,
+    )
+
+
+def delete_rows(cursor, source, keys):
+    qn = store_connection().ops.quote_name
+    placeholders = ', '.join(['%s'] * len(keys))
+    cursor.execute(
+        f"DELETE FROM {qn(source._meta.db_table)} WHERE {qn('order_number')} IN ({placeholders})",
+        keys,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Move finished orders older than the hot window into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_HOT_TIER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        # Never archive past the hot boundary, or recent-window queries would miss rows.
+        days = max(options['days'], settings.ORDER_HOT_TIER_DAYS)
+        cutoff = timezone.now() - timedelta(days=days)
+        candidates = Order.objects.filter(
+            timestamp__lt=cutoff,
+            order_status__in=settings.ORDER_ARCHIVABLE_STATUSES,
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"{candidates.count()} orders older than {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        moved = 0
+        while True:
+            # One short transaction per batch keeps row locks brief on the live table.
+            with transaction.atomic(using=store_db()):
+                numbers = list(
+                    candidates.select_for_update()
+                    .order_by('timestamp')
+                    .values_list('order_number', flat=True)[:options['batch_size']]
+                )
+                if not numbers:
+                    break
+                with store_connection().cursor() as cursor:
+                    copy_rows(cursor, Order, ArchivedOrder, numbers)
+                    copy_rows(cursor, OrderItem, ArchivedOrderItem, numbers)
+                    delete_rows(cursor, OrderItem, numbers)
+                    delete_rows(cursor, Order, numbers)
+            moved += len(numbers)
+            self.stdout.write(f"Archived {moved} orders")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Archived {moved} orders older than {cutoff:%Y-%m-%d}"))
@@ -0,0 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from dashboard.addresses import parse_address
+from dashboard.models import OrderAddress
+from dashboard.tiers import tiers_for
+from dashboard.stores import store_connection
+
+FIELDS = ['country', 'region', 'city', 'postcode']
+
+
+def parse_batch(rows):
+    # Runs in a worker process; parse_address's lru_cache is per process and
+    # pays off because many orders repeat the same address.
+    return [(order_number, *parse_address(text)) for order_number, text in rows]
+
+
+def close_connections():
+    # Forked workers must not touch the parent's database connections.
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Parse delivery addresses of existing orders into order_addresses using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--missing-only', action='store_true', help='Skip orders that already have a row')
+
+    def handle(self, *args, **options):
+        upsert = {'update_conflicts': True, 'update_fields': FIELDS}
+        if store_connection().features.supports_update_conflicts_with_target:
+            upsert['unique_fields'] = ['order_number']
+
+        parsed = 0
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=close_connections) as pool:
+            for order_model, _ in tiers_for():
+                last = None
+                while True:
+                    pages = []
+                    # Read a few pages ahead so every worker has a batch.
+                    for _ in range(options['workers']):
+                        page = order_model.objects.order_by('order_number')
+                        if last is not None:
+                            page = page.filter(order_number__gt=last)
+                        if options['missing_only']:
+                            page = page.exclude(order_number__in=OrderAddress.objects.values('order_number'))
+                        rows = list(page.values_list('order_number', 'delivery_address')[:options['batch_size']])
+                        if not rows:
+                            break
+                        last = rows[-1][0]
+                        pages.append(rows)
+                    if not pages:
+                        break
+                    for results in pool.map(parse_batch, pages):
+                        OrderAddress.objects.bulk_create([
+                            OrderAddress(order_number=order_number, **dict(zip(FIELDS, values)))
+                            for order_number, *values in results
+                        ], **upsert)
+                        parsed += len(results)
+                    self.stdout.write(f"Parsed {parsed} addresses (up to order {last})")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Parsed {parsed} delivery addresses"))
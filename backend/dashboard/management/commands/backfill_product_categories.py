@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, OuterRef, Subquery
+from dashboard import refcache
+from dashboard.catalog import invalidate as invalidate_catalog
+from dashboard.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Backfill products.category_id from the free-text category column in primary key batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Create categories for product category names not in the categories table')
+
+    def handle(self, *args, **options):
+        if options['create_missing']:
+            names = (
+                Product.objects.exclude(category__isnull=True).exclude(category='')
+                .values_list('category', flat=True).distinct()
+            )
+            names = list(names)
+            Category.objects.bulk_create([Category(name=name) for name in names], ignore_conflicts=True)
+            refcache.invalidate(Category)
+            self.stdout.write(f"Ensured {len(names)} category names exist")
+
+        category_key = Subquery(
+            Category.objects.filter(name=OuterRef('category')).values('category_id')[:1]
+        )
+        last_id = Product.objects.aggregate(last=Max('product_id'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id, options['batch_size']):
+            # One set-based UPDATE per primary key range keeps each statement's lock footprint small.
+            updated += Product.objects.filter(
+                product_id__gt=start, product_id__lte=start + options['batch_size'],
+            ).update(category_ref=category_key)
+            self.stdout.write(f"Backfilled products up to id {min(start + options['batch_size'], last_id)}")
+
+        invalidate_catalog()
+        unmatched = Product.objects.filter(category_ref__isnull=True).exclude(category__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Backfilled {updated} products ({unmatched} with a category name not in categories)"
+        ))
@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from dashboard.models import ArchivedOrder, ArchivedOrderItem
+from dashboard.tiers import HOT_TIER, ARCHIVE_TIER, items_since
+from dashboard.stores import store_db, store_connection
+
+BENCH_PREFIX = 'BENCH-'
+
+
+class Command(BaseCommand):
+    help = 'Time recent-window revenue queries on the hot tier against a scan spanning both tiers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-rows', type=int, default=0,
+                            help='Seed this many synthetic archived orders first (e.g. 50000000)')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=30, help='Recent window to query')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--cleanup', action='store_true', help='Delete the synthetic archive rows and exit')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            ArchivedOrderItem.objects.filter(order_number__startswith=BENCH_PREFIX).delete()
+            deleted, _ = ArchivedOrder.objects.filter(order_number__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f"✅ Removed {deleted} synthetic rows"))
+            return
+
+        if options['archive_rows']:
+            self.seed(options['archive_rows'], options['batch_size'])
+
+        since = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f"Archived orders: {ArchivedOrder.objects.count()}")
+        for label, tiers in (('hot tier', [HOT_TIER]), ('both tiers', [HOT_TIER, ARCHIVE_TIER])):
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                for _, item_model in tiers:
+                    items_since(item_model, since).filter(
+                        order_number__payment_status='Paid'
+                    ).aggregate(total=Sum('amount'))
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{label}: median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms over {len(timings)} runs"
+            )
+
+    def seed(self, rows, batch_size):
+        qn = store_connection().ops.quote_name
+        order_columns = [
+            'order_number', 'userID', 'username', 'invoice_id', 'payment_status', 'order_status', 'timestamp',
+            'items_total', 'item_count', 'grand_total',
+        ]
+        item_columns = ['order_number', 'product_id', 'quantity', 'amount']
+        order_sql = (
+            f"INSERT INTO {qn(ArchivedOrder._meta.db_table)} ({', '.join(qn(c) for c in order_columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(order_columns))})"
+        )
+        item_sql = (
+            f"INSERT INTO {qn(ArchivedOrderItem._meta.db_table)} ({', '.join(qn(c) for c in item_columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(item_columns))})"
+        )
+        oldest = timezone.now() - timedelta(days=settings.ORDER_HOT_TIER_DAYS + 1)
+        start = ArchivedOrder.objects.filter(order_number__startswith=BENCH_PREFIX).count()
+
+        for offset in range(start, start + rows, batch_size):
+            count = min(batch_size, start + rows - offset)
+            orders, items = [], []
+            for n in range(offset, offset + count):
+                number = f"{BENCH_PREFIX}{n:010d}"
+                amount = Decimal(random.randint(100, 50000)) / 100
+                # One item and no delivery fee, so the stored totals equal the item amount.
+                orders.append((
+                    number, random.randint(1, 1_000_000), 'bench', f"INV-{number}",
+                    'Paid', 'Delivered', oldest - timedelta(minutes=n % 5_000_000),
+                    amount, 1, amount,
+                ))
+                items.append((number, random.randint(1, 100), 1, amount))
+            with transaction.atomic(using=store_db()), store_connection().cursor() as cursor:
+                cursor.executemany(order_sql, orders)
+                cursor.executemany(item_sql, items)
+            self.stdout.write(f"Seeded {offset + count - start}/{rows} archived orders")
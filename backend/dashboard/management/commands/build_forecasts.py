@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from dashboard.breakdown import day_start, live_rows
+from dashboard.forecasting import SEASON, holt_winters
+from dashboard.models import Forecast
+from dashboard.tiers import orders_since, tiers_for
+from dashboard.stores import store_db
+
+METRICS = ('revenue', 'orders')
+
+
+class Command(BaseCommand):
+    help = 'Fit Holt-Winters models to daily revenue/order series (store and top categories) and store forecasts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', type=int, default=365)
+        parser.add_argument('--horizon', type=int, default=30, help='Days to forecast')
+        parser.add_argument('--top-categories', type=int, default=20)
+
+    def handle(self, *args, **options):
+        history = options['history_days']
+        if history < 4 * SEASON:
+            raise CommandError(f"--history-days must be at least {4 * SEASON}")
+        today = timezone.localdate()
+        first = today - timedelta(days=history)
+        since = day_start(first)
+        days = [first + timedelta(days=offset) for offset in range(history)]
+        position = {day: index for index, day in enumerate(days)}
+
+        # series name -> metric -> daily values over [first, today); today is incomplete and left out.
+        series = {}
+
+        def put(name, day, metric, value):
+            if day in position:
+                values = series.setdefault(name, {m: np.zeros(history) for m in METRICS})
+                values[metric][position[day]] += float(value or 0)
+
+        for order_model, _ in tiers_for(since):
+            rows = (
+                orders_since(order_model, since).filter(payment_status='Paid')
+                .annotate(day=TruncDate('timestamp'))
+                .values('day')
+                .annotate(revenue=Sum('items_total'), orders=Count('pk'))
+                .order_by()
+            )
+            for row in rows:
+                for metric in METRICS:
+                    put('store', row['day'], metric, row[metric])
+
+        categories = live_rows(['payment_status', 'category'], list(METRICS), first, today, by_day=True)
+        category_revenue = {}
+        for (day, payment_status, category), values in categories.items():
+            if payment_status == 'Paid' and category:
+                category_revenue[category] = category_revenue.get(category, 0) + float(values['revenue'])
+        top = set(sorted(category_revenue, key=category_revenue.get, reverse=True)[:options['top_categories']])
+        for (day, payment_status, category), values in categories.items():
+            if payment_status == 'Paid' and category in top:
+                for metric in METRICS:
+                    put(f'category:{category}', day, metric, values[metric])
+
+        if not series:
+            self.stdout.write(self.style.WARNING("No paid orders in the history window; nothing to forecast"))
+            return
+
+        # One matrix for every (series, metric): all models are fitted in a single vectorized pass.
+        keys = [(name, metric) for name in sorted(series) for metric in METRICS]
+        matrix = np.vstack([series[name][metric] for name, metric in keys])
+        forecast, lower, upper = holt_winters(matrix, options['horizon'])
+
+        generated_at = timezone.now()
+        rows = [
+            Forecast(
+                series=name, metric=metric, day=today + timedelta(days=step),
+                value=round(float(forecast[index, step]), 2),
+                lower=round(float(lower[index, step]), 2),
+                upper=round(float(upper[index, step]), 2),
+                generated_at=generated_at,
+            )
+            for index, (name, metric) in enumerate(keys)
+            for step in range(options['horizon'])
+        ]
+        with transaction.atomic(using=store_db()):
+            Forecast.objects.all().delete()
+            Forecast.objects.bulk_create(rows, batch_size=2000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Forecast {len(keys)} series {options['horizon']} days ahead from {history} days of history"
+        ))
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from dashboard.breakdown import DIMENSIONS, MEASURES, ORDER_DIMENSIONS, CUBE_BUILT_THROUGH, cube_built_through, live_rows
+from dashboard.models import OrderCube, OrderCubeOrders, SyncState
+from dashboard.tiers import tiers_for
+from dashboard.stores import store_db
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the daily order_cube used by /api/analytics/breakdown/. '
+        'Order statuses change after the day is built, so re-run nightly with --days to refresh a trailing window.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Rebuild only this many trailing days (default: everything)')
+        parser.add_argument('--step-days', type=int, default=31, help='Days aggregated per query')
+
+    def handle(self, *args, **options):
+        # Only complete days go into the cube; today is always answered live.
+        end = timezone.localdate()
+        built_through = cube_built_through()
+        # A partial rebuild is only valid on top of an existing full build.
+        if options['days'] and built_through:
+            start = min(end - timedelta(days=options['days']), built_through)
+        else:
+            oldest = [
+                order_model.objects.aggregate(first=Min('timestamp'))['first']
+                for order_model, _ in tiers_for()
+            ]
+            oldest = [ts for ts in oldest if ts]
+            if not oldest:
+                self.stdout.write("No orders to aggregate")
+                return
+            start = timezone.localtime(min(oldest)).date()
+
+        dims = list(DIMENSIONS)
+        measures = list(MEASURES)
+        cells = 0
+        day = start
+        while day < end:
+            step_end = min(day + timedelta(days=options['step_days']), end)
+            rows = [
+                OrderCube(day=key[0], **dict(zip(dims, key[1:])), **values)
+                for key, values in live_rows(dims, measures, day, step_end, by_day=True).items()
+                if key[0] is not None
+            ]
+            order_rows = [
+                OrderCubeOrders(day=key[0], **dict(zip(ORDER_DIMENSIONS, key[1:])), orders=values['orders'])
+                for key, values in live_rows(ORDER_DIMENSIONS, ['orders'], day, step_end, by_day=True).items()
+                if key[0] is not None
+            ]
+            with transaction.atomic(using=store_db()):
+                for model, cube in ((OrderCube, rows), (OrderCubeOrders, order_rows)):
+                    model.objects.filter(day__gte=day, day__lt=step_end).delete()
+                    model.objects.bulk_create(cube, batch_size=5000)
+            cells += len(rows)
+            self.stdout.write(f"Built {day} .. {step_end - timedelta(days=1)} ({len(rows)} cells)")
+            day = step_end
+
+        SyncState.set_value(CUBE_BUILT_THROUGH, end.isoformat())
+        self.stdout.write(self.style.SUCCESS(f"✅ Order cube built through {end} ({cells} cells)"))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from dashboard.models import OrderValueSketch
+from dashboard.sketches import DAY, MONTH, ValueSketch, periods_for, sketched
+from dashboard.tiers import tiers_for
+from dashboard.stores import store_db
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day and per-month order value sketches from paid orders in both tiers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sketches = {}
+        scanned = 0
+        for order_model, _ in tiers_for():
+            last = None
+            while True:
+                page = sketched(order_model.objects.all()).order_by('order_number')
+                if last is not None:
+                    page = page.filter(order_number__gt=last)
+                rows = list(page.values_list('order_number', 'timestamp', 'items_total')[:options['batch_size']])
+                if not rows:
+                    break
+                last = rows[-1][0]
+                for _, timestamp, value in rows:
+                    for key in periods_for(timezone.localtime(timestamp).date()):
+                        sketches.setdefault(key, ValueSketch()).add(value)
+                scanned += len(rows)
+                self.stdout.write(f"Scanned {scanned} paid orders")
+
+        with transaction.atomic(using=store_db()):
+            OrderValueSketch.objects.all().delete()
+            OrderValueSketch.objects.bulk_create([
+                OrderValueSketch(period=period, start=start, **sketch.row_fields())
+                for (period, start), sketch in sketches.items()
+            ], batch_size=1000)
+
+        days = sum(1 for period, _ in sketches if period == DAY)
+        months = sum(1 for period, _ in sketches if period == MONTH)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Built {days} daily and {months} monthly sketches from {scanned} paid orders"
+        ))
@@ -0,0 +1,101 @@
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from dashboard.affinity import BASKETS, count_baskets, rank_neighbours
+from dashboard.models import ProductOrderCount, ProductPairCount, ProductAffinity, SyncState
+from dashboard.tiers import tiers_for
+from dashboard.stores import store_db
+
+
+def paid_baskets(chunk_size):
+    """Yield lists of product-id sets, one list per keyset page of paid orders."""
+    for order_model, item_model in tiers_for():
+        paid = order_model.objects.filter(payment_status='Paid').order_by('order_number')
+        last = None
+        while True:
+            page = paid if last is None else paid.filter(order_number__gt=last)
+            numbers = list(page.values_list('order_number', flat=True)[:chunk_size])
+            if not numbers:
+                break
+            baskets = defaultdict(set)
+            rows = item_model.objects.filter(order_number__in=numbers).values_list('order_number', 'product_id')
+            for order_number, product_id in rows:
+                baskets[order_number].add(product_id)
+            yield list(baskets.values())
+            last = numbers[-1]
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product co-occurrence counts and top-K affinity table from paid orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Orders per counting task')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Counting processes; 0 counts in this process')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        item_counts = Counter()
+        pair_counts = Counter()
+        baskets = 0
+
+        def merge(result):
+            items, pairs = result
+            item_counts.update(items)
+            pair_counts.update(pairs)
+
+        chunks = paid_baskets(options['chunk_size'])
+        if options['workers']:
+            # Only the main process talks to the database; workers count pairs.
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                pending = set()
+                for chunk in chunks:
+                    baskets += len(chunk)
+                    pending.add(pool.submit(count_baskets, chunk))
+                    if len(pending) >= options['workers'] * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            merge(future.result())
+                for future in pending:
+                    merge(future.result())
+        else:
+            for chunk in chunks:
+                baskets += len(chunk)
+                merge(count_baskets(chunk))
+
+        self.stdout.write(f"Counted {baskets} baskets, {len(item_counts)} products, {len(pair_counts)} pairs")
+
+        neighbours = defaultdict(dict)
+        for (a, b), orders in pair_counts.items():
+            neighbours[a][b] = orders
+            neighbours[b][a] = orders
+
+        def pair_rows():
+            for product_id, others in neighbours.items():
+                for other_id, orders in others.items():
+                    yield ProductPairCount(product_id=product_id, other_product_id=other_id, orders=orders)
+
+        def affinity_rows():
+            for product_id, others in neighbours.items():
+                yield from rank_neighbours(product_id, others, item_counts, baskets)
+
+        batch_size = options['batch_size']
+        with transaction.atomic(using=store_db()):
+            SyncState.set_value(BASKETS, baskets)
+            ProductOrderCount.objects.all().delete()
+            ProductOrderCount.objects.bulk_create(
+                [ProductOrderCount(product_id=p, orders=n) for p, n in item_counts.items()],
+                batch_size=batch_size,
+            )
+            for model, rows in ((ProductPairCount, pair_rows()), (ProductAffinity, affinity_rows())):
+                model.objects.all().delete()
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    model.objects.bulk_create(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Affinity rebuilt for {len(neighbours)} products"))
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from dashboard.order_totals import (
+    current_delivery_fee, expected_totals, install_order_totals, item_totals, schema_ddl,
+)
+from dashboard.tiers import tiers_for
+from dashboard.stores import store_connection, store_db
+
+
+def check_batch(order_model, item_model, rows, fee, repair):
+    """Compare one page of stored totals with the line items; returns (checked, drifted)."""
+    try:
+        computed = item_totals([row[0] for row in rows], item_model)
+        drifted = []
+        for order_number, *stored in rows:
+            expected = expected_totals(tuple(stored), computed[order_number], fee)
+            if tuple(stored) != expected:
+                drifted.append(order_model(
+                    order_number=order_number,
+                    items_total=expected[0], item_count=expected[1], grand_total=expected[2],
+                ))
+        if repair and drifted:
+            order_model.objects.bulk_update(drifted, ['items_total', 'item_count', 'grand_total'])
+        return len(rows), len(drifted)
+    finally:
+        # Each pool thread opens its own connection; release it with the batch.
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Verify the denormalized order totals against order_items and optionally repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--print-ddl', action='store_true',
+                            help='Print the DDL `migrate` would run on the unmanaged orders table (columns, triggers)')
+        parser.add_argument('--install', action='store_true',
+                            help='Run that DDL now and fill in totals never computed (same as `migrate` does)')
+
+    def handle(self, *args, **options):
+        if options['print_ddl']:
+            # DELIMITER lets the mysql client take trigger bodies containing ';'.
+            self.stdout.write("DELIMITER $$")
+            for statement in schema_ddl(store_connection()):
+                self.stdout.write(f"{statement}$$")
+            self.stdout.write("DELIMITER ;")
+            return
+        if options['install']:
+            filled = install_order_totals(store_db())
+            self.stdout.write(self.style.SUCCESS(f"✅ Order total columns and triggers installed, {filled} orders filled in"))
+            return
+
+        fee = current_delivery_fee()
+        checked = drifted = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            pending = set()
+
+            def collect(futures):
+                nonlocal checked, drifted
+                for future in futures:
+                    batch_checked, batch_drifted = future.result()
+                    checked += batch_checked
+                    drifted += batch_drifted
+
+            for order_model, item_model in tiers_for():
+                last = None
+                while True:
+                    page = order_model.objects.order_by('order_number')
+                    if last is not None:
+                        page = page.filter(order_number__gt=last)
+                    rows = list(page.values_list(
+                        'order_number', 'items_total', 'item_count', 'grand_total'
+                    )[:options['batch_size']])
+                    if not rows:
+                        break
+                    last = rows[-1][0]
+                    pending.add(pool.submit(check_batch, order_model, item_model, rows, fee, options['repair']))
+                    if len(pending) >= options['workers'] * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    self.stdout.write(f"Queued orders up to {last}")
+            collect(pending)
+
+        verb = 'repaired' if options['repair'] else 'drifted'
+        style = self.style.SUCCESS if options['repair'] or not drifted else self.style.WARNING
+        self.stdout.write(style(f"Checked {checked} orders, {drifted} {verb}"))
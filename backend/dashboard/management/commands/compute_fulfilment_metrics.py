@@ -0,0 +1,133 @@
+import math
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from dashboard.models import OrderStatusEvent, OrderFulfilment, FulfilmentWeek, SyncState
+from dashboard.stores import store_db
+
+WATERMARK = 'fulfilment.last_event_id'
+# Longer than any transaction that writes status events stays open
+RESCAN_MINUTES = 15
+
+# event (field, new value) -> OrderFulfilment milestone
+MILESTONES = {
+    ('payment_status', 'Paid'): 'paid_at',
+    ('order_status', 'Shipped'): 'shipped_at',
+    ('order_status', 'Delivered'): 'delivered_at',
+}
+
+# metric -> (start milestone, end milestone); weeks are keyed by the end milestone
+METRICS = {
+    'paid_to_shipped': ('paid_at', 'shipped_at'),
+    'shipped_to_delivered': ('shipped_at', 'delivered_at'),
+}
+
+
+def week_of(moment):
+    day = timezone.localtime(moment).date()
+    return day - timedelta(days=day.weekday())
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile.
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Fold new order status events into fulfilment milestones and refresh the touched weekly percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--rescan-minutes', type=int, default=RESCAN_MINUTES,
+                            help='Re-fold events this recent behind the watermark')
+
+    def fold(self, events, touched):
+        numbers = {event.order_number for event in events}
+        rows = OrderFulfilment.objects.in_bulk(numbers)
+        created, changed = {}, {}
+        for event in events:
+            milestone = MILESTONES.get((event.field, event.new_value))
+            if milestone is None:
+                continue
+            row = rows.get(event.order_number) or created.get(event.order_number)
+            if row is None:
+                row = created[event.order_number] = OrderFulfilment(order_number=event.order_number)
+            # The first time a milestone is reached counts; later re-sets are ignored and
+            # folding the same event twice changes nothing.
+            reached = getattr(row, milestone)
+            if reached is None or event.created_at < reached:
+                if reached is not None:
+                    # The order leaves the week of its old end milestone; refresh that week too.
+                    for metric, (start, end) in METRICS.items():
+                        if end == milestone:
+                            touched.add((metric, week_of(reached)))
+                setattr(row, milestone, event.created_at)
+                if event.order_number in rows:
+                    changed[event.order_number] = row
+                for metric, (start, end) in METRICS.items():
+                    if getattr(row, start) and getattr(row, end):
+                        touched.add((metric, week_of(getattr(row, end))))
+        return created, changed
+
+    def save(self, created, changed, watermark=None):
+        with transaction.atomic(using=store_db()):
+            OrderFulfilment.objects.bulk_create(created.values())
+            OrderFulfilment.objects.bulk_update(changed.values(), ['paid_at', 'shipped_at', 'delivered_at'])
+            if watermark is not None:
+                SyncState.set_value(WATERMARK, watermark)
+
+    def handle(self, *args, **options):
+        last_id = int(SyncState.get_value(WATERMARK, 0))
+        touched = set()
+        folded = 0
+
+        # Ids are taken at insert but become visible at commit, so an event from a slow
+        # transaction can land below a watermark a later one already moved past.
+        # Re-fold the recent events behind the watermark to pick those up.
+        recent = OrderStatusEvent.objects.filter(
+            id__lte=last_id, created_at__gte=timezone.now() - timedelta(minutes=options['rescan_minutes']),
+        ).order_by('id')
+        after = 0
+        while True:
+            events = list(recent.filter(id__gt=after)[:options['batch_size']])
+            if not events:
+                break
+            self.save(*self.fold(events, touched))
+            after = events[-1].id
+
+        while True:
+            events = list(
+                OrderStatusEvent.objects.filter(id__gt=last_id).order_by('id')[:options['batch_size']]
+            )
+            if not events:
+                break
+            last_id = events[-1].id
+            self.save(*self.fold(events, touched), watermark=last_id)
+            folded += len(events)
+
+        for metric, week in sorted(touched):
+            start, end = METRICS[metric]
+            week_start = timezone.make_aware(datetime.combine(week, time.min))
+            durations = sorted(
+                (finished - began).total_seconds() / 3600
+                for began, finished in OrderFulfilment.objects.filter(**{
+                    f'{start}__isnull': False,
+                    f'{end}__gte': week_start,
+                    f'{end}__lt': week_start + timedelta(weeks=1),
+                }).values_list(start, end)
+            )
+            if not durations:
+                FulfilmentWeek.objects.filter(week=week, metric=metric).delete()
+                continue
+            FulfilmentWeek.objects.update_or_create(week=week, metric=metric, defaults={
+                'count': len(durations),
+                'p50': percentile(durations, 0.5),
+                'p90': percentile(durations, 0.9),
+                'p99': percentile(durations, 0.99),
+            })
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Folded {folded} events, refreshed {len(touched)} weekly metrics"
+        ))
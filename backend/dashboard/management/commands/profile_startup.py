@@ -0,0 +1,122 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Child process: boot the WSGI app the way a fresh worker does, then serve one request.
+FIRST_REQUEST = """
+import json, os, time
+started = time.perf_counter()
+from store_dashboard.wsgi import application
+booted = time.perf_counter()
+from django.test import Client
+response = Client().get(os.environ['PROFILE_PATH'])
+answered = time.perf_counter()
+print(json.dumps({
+    'boot_ms': (booted - started) * 1000,
+    'first_request_ms': (answered - booted) * 1000,
+    'time_to_first_response_ms': (answered - started) * 1000,
+    'status': response.status_code,
+}))
+"""
+
+IMPORTS = "import django; django.setup(); import store_dashboard.urls"
+
+
+def child_env(warmup):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'store_dashboard.settings')}
+    env['DJANGO_WARMUP'] = '1' if warmup else '0'
+    return env
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profile worker cold start: per-module import time and time to first response, with a regression check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Slowest modules to list')
+        parser.add_argument('--path', default='/api/public/store/', help='URL for the first request')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--no-warmup', action='store_true', help='Benchmark with DJANGO_WARMUP=0')
+        parser.add_argument('--save', help='Write the benchmark result to this JSON file')
+        parser.add_argument('--baseline', help='Compare against a saved result and fail on regression')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed slowdown against the baseline (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        cwd = str(settings.BASE_DIR)
+        warmup = not options['no_warmup']
+
+        profile = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORTS],
+            cwd=cwd, env=child_env(warmup), capture_output=True, text=True,
+        )
+        if profile.returncode:
+            raise CommandError(profile.stderr[-2000:])
+        rows = parse_importtime(profile.stderr)
+        # Top-level packages by cumulative time show which dependency is expensive as a whole.
+        packages = {}
+        for module, _, cumulative_us in rows:
+            if '.' not in module:
+                packages[module] = packages.get(module, 0) + cumulative_us
+        self.stdout.write("Slowest top-level imports (cumulative ms):")
+        for module, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f}  {module}")
+        self.stdout.write("Slowest modules (self ms):")
+        for module, self_us, _ in sorted(rows, key=lambda row: -row[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}  {module}")
+
+        samples = []
+        for _ in range(options['runs']):
+            run = subprocess.run(
+                [sys.executable, '-c', FIRST_REQUEST],
+                cwd=cwd, env={**child_env(warmup), 'PROFILE_PATH': options['path']},
+                capture_output=True, text=True,
+            )
+            if run.returncode:
+                raise CommandError(run.stderr[-2000:])
+            samples.append(json.loads(run.stdout.strip().splitlines()[-1]))
+
+        result = {
+            key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in ('boot_ms', 'first_request_ms', 'time_to_first_response_ms')
+        }
+        result.update(warmup=warmup, path=options['path'], runs=options['runs'], status=samples[-1]['status'])
+        self.stdout.write(
+            f"Median of {options['runs']} runs (warm-up {'on' if warmup else 'off'}): "
+            f"boot {result['boot_ms']} ms, first request {result['first_request_ms']} ms, "
+            f"time to first response {result['time_to_first_response_ms']} ms (HTTP {result['status']})"
+        )
+
+        if options['save']:
+            with open(options['save'], 'w') as handle:
+                json.dump(result, handle, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+            limit = baseline['time_to_first_response_ms'] * (1 + options['tolerance'])
+            if result['time_to_first_response_ms'] > limit:
+                raise CommandError(
+                    f"Time to first response regressed: {result['time_to_first_response_ms']} ms "
+                    f"vs baseline {baseline['time_to_first_response_ms']} ms (limit {limit:.1f} ms)"
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Within {options['tolerance']:.0%} of baseline ({baseline['time_to_first_response_ms']} ms)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Startup profile complete"))
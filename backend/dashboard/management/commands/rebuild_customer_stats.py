@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from dashboard.customers import CUSTOMER_COUNT, customer_rows
+from dashboard.models import CustomerStats, SyncState
+from dashboard.tiers import tiers_for
+from dashboard.stores import store_db
+
+
+def next_user_ids(after, limit):
+    ids = set()
+    for order_model, _ in tiers_for():
+        queryset = order_model.objects.filter(user_id__isnull=False)
+        if after is not None:
+            queryset = queryset.filter(user_id__gt=after)
+        ids.update(queryset.order_by('user_id').values_list('user_id', flat=True).distinct()[:limit])
+    return sorted(ids)[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer_stats table from the order history in user_id batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        last = None
+        total = 0
+        while True:
+            user_ids = next_user_ids(last, options['batch_size'])
+            if not user_ids:
+                break
+            rows = customer_rows(user_ids)
+            with transaction.atomic(using=store_db()):
+                # Replace the whole id range so customers with no orders left disappear too.
+                stale = CustomerStats.objects.filter(user_id__lte=user_ids[-1])
+                if last is not None:
+                    stale = stale.filter(user_id__gt=last)
+                stale.delete()
+                CustomerStats.objects.bulk_create(rows, batch_size=options['batch_size'])
+            last = user_ids[-1]
+            total += len(rows)
+            self.stdout.write(f"Rebuilt {total} customers")
+
+        leftovers = CustomerStats.objects.all()
+        if last is not None:
+            leftovers = leftovers.filter(user_id__gt=last)
+        leftovers.delete()
+        SyncState.set_value(CUSTOMER_COUNT, CustomerStats.objects.count())
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt stats for {total} customers"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from dashboard.catalog import invalidate as invalidate_catalog
+from dashboard.models import Review, ProductRatingSummary
+from dashboard.stores import store_db
+
+
+class Command(BaseCommand):
+    help = 'Rebuild product_rating_summary from the review table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = (
+            Review.objects
+            .filter(rating__gte=1, rating__lte=5)
+            .values('product_id')
+            .annotate(
+                count=Count('pk'),
+                total=Sum('rating'),
+                **{f'rating_{star}': Count('pk', filter=Q(rating=star)) for star in range(1, 6)},
+            )
+            .order_by()
+        )
+        summaries = [
+            ProductRatingSummary(average=row['total'] / row['count'], **row)
+            for row in rows
+        ]
+        with transaction.atomic(using=store_db()):
+            ProductRatingSummary.objects.all().delete()
+            ProductRatingSummary.objects.bulk_create(summaries, batch_size=options['batch_size'])
+            invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt rating summaries for {len(summaries)} products"))
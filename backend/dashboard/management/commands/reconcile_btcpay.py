@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from dashboard.btcpay import GreenfieldClient, corrections
+from dashboard.models import Order, SyncState
+from dashboard.status_events import bulk_update_statuses
+
+WATERMARK = 'btcpay.reconciled_through'
+
+
+def fetch_page(client, page, take, start, end):
+    return page, client.invoices(skip=page * take, take=take, start=start, end=end)
+
+
+class Command(BaseCommand):
+    help = 'Reconcile order payment statuses with BTCPay invoices (recovers lost webhook deliveries)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='BTCPay server URL (e.g. a local mock); defaults to BTCPAY_URL')
+        parser.add_argument('--concurrency', type=int, default=4, help='Pages fetched in parallel')
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--full', action='store_true', help='Ignore the watermark and scan every invoice')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        client = GreenfieldClient(base_url=options['base_url'])
+        take, concurrency = options['page_size'], options['concurrency']
+
+        # Freeze the window at the start so paging isn't shifted by invoices created meanwhile.
+        end = int(time.time())
+        start = None
+        if not options['full']:
+            watermark = SyncState.get_value(WATERMARK)
+            if watermark is not None:
+                # Invoices settle or expire some time after creation, so re-check a trailing overlap.
+                start = int(watermark) - settings.BTCPAY_RECONCILE_OVERLAP_HOURS * 3600
+
+        scanned = corrected = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_page = 0
+            pending = []
+            exhausted = False
+            # Keep at most `concurrency` pages in flight and in memory, processed in page order.
+            while pending or not exhausted:
+                while not exhausted and len(pending) < concurrency:
+                    pending.append(pool.submit(fetch_page, client, next_page, take, start, end))
+                    next_page += 1
+                page, invoices = pending.pop(0).result()
+                if len(invoices) < take:
+                    exhausted = True
+                    for future in pending:
+                        future.cancel()
+                    pending = [future for future in pending if not future.cancelled()]
+                scanned += len(invoices)
+                corrected += self.apply(invoices, options['dry_run'])
+                if page % 20 == 0:
+                    self.stdout.write(f"Scanned {scanned} invoices, {corrected} corrections")
+
+        if not options['dry_run']:
+            SyncState.set_value(WATERMARK, end)
+        verb = 'would correct' if options['dry_run'] else 'corrected'
+        self.stdout.write(self.style.SUCCESS(f"✅ Scanned {scanned} invoices, {verb} {corrected} orders"))
+
+    def apply(self, invoices, dry_run):
+        ids = [invoice['id'] for invoice in invoices if invoice.get('id')]
+        if not ids:
+            return 0
+        orders = {
+            row['invoice_id']: row for row in
+            Order.objects.filter(invoice_id__in=ids).values('order_number', 'invoice_id', 'payment_status', 'order_status')
+        }
+        fixed = 0
+        for changes, order_numbers in corrections(invoices, orders).items():
+            if dry_run:
+                fixed += len(order_numbers)
+            else:
+                fixed += len(bulk_update_statuses(order_numbers, dict(changes), source='reconcile'))
+        return fixed
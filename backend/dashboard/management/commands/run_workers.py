@@ -0,0 +1,82 @@
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from dashboard.jobs import claim, enqueue_scheduled, requeue_stale, run, worker_name
+
+
+def work(suffix, poll, burst, stop):
+    """Claim and run jobs until stopped (or, with --burst, until the queue is empty)."""
+    worker = worker_name(suffix)
+    processed = 0
+    next_sweep = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            if time.monotonic() >= next_sweep:
+                # Recover jobs of workers that died while the rest keep running.
+                requeue_stale()
+                enqueue_scheduled()
+                next_sweep = time.monotonic() + settings.JOBS_REQUEUE_INTERVAL_SECONDS
+            job = claim(worker)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll)
+                continue
+            run(job)
+            processed += 1
+    finally:
+        connections.close_all()
+    return processed
+
+
+def work_in_process(suffix, poll, burst):
+    # Forked children must not reuse the parent's database connections.
+    connections.close_all()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    return work(suffix, poll, burst, stop)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers from the jobs table (no external broker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOBS_WORKERS)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help='Threads for I/O-bound jobs, processes for CPU-bound batch commands')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        workers, poll, burst = options['workers'], options['poll'], options['burst']
+        self.stdout.write(f"Starting {workers} {options['mode']} workers")
+
+        if options['mode'] == 'process':
+            connections.close_all()
+            with multiprocessing.Pool(workers) as pool:
+                try:
+                    processed = sum(pool.starmap(work_in_process, [(f'/p{n}', poll, burst) for n in range(workers)]))
+                except KeyboardInterrupt:
+                    pool.terminate()
+                    raise
+        else:
+            stop = threading.Event()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(work, f'/t{n}', poll, burst, stop) for n in range(workers)]
+                try:
+                    processed = sum(future.result() for future in futures)
+                except KeyboardInterrupt:
+                    stop.set()
+                    processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Processed {processed} jobs in {time.monotonic() - started:.1f}s"
+        ))
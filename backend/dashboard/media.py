@@ -0,0 +1,112 @@
+# dashboard/media.py
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils._os import safe_join
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# name -> (mtime_ns, size, digest); files are re-hashed only when they change on disk.
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+
+def content_hash(name):
+    path = safe_join(settings.MEDIA_ROOT, name)
+    stat = os.stat(path)
+    cached = _hashes.get(name)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(64 * 1024), b''):
+            digest.update(block)
+    value = digest.hexdigest()[:16]
+    with _hashes_lock:
+        _hashes[name] = (stat.st_mtime_ns, stat.st_size, value)
+    return value
+
+
+def versioned_url(name):
+    """Content-addressed media URL; it changes whenever the file is overwritten in place."""
+    try:
+        return f"{settings.MEDIA_URL}v/{content_hash(name)}/{name}"
+    except (OSError, ValueError):
+        # Missing file (or a non-local name): fall back to the plain URL.
+        return f"{settings.MEDIA_URL}{name}"
+
+
+def byte_range(header, size):
+    """(start, end) inclusive for a single `Range: bytes=` header, None if absent, False if unsatisfiable."""
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    elif last:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return False
+    if start > end or start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+def file_response(request, path, name, size):
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL == 'nginx':
+        # nginx serves the bytes (ranges included) from an `internal` location.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_PREFIX}{name}"
+        return response
+    if settings.MEDIA_ACCEL == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    requested = byte_range(request.headers.get('Range'), size)
+    if requested is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if requested is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = requested
+        with open(path, 'rb') as handle:
+            handle.seek(start)
+            response = HttpResponse(handle.read(end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path, version=None):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        size = os.stat(full_path).st_size
+        current = content_hash(path)
+    except (OSError, ValueError):
+        raise Http404("Media file not found")
+
+    if version is not None and version != current:
+        # Stale version from an old page: point at the current content instead of caching it wrongly.
+        return HttpResponseRedirect(versioned_url(path))
+
+    etag = f'"{current}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = file_response(request, full_path, path, size)
+    response['ETag'] = etag
+    response['Cache-Control'] = IMMUTABLE if version else REVALIDATE
+    return response
@@ -2,8 +2,13 @@ from django.db import models
 from django.core.validators import FileExtensionValidator
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.db.models import F
+from django.db.models.functions import Cast
+from django.utils import timezone
 import os
 
+from .stores import media_prefix
+
 
 class Category(models.Model):
     category_id = models.AutoField(primary_key=True)
@@ -23,13 +28,18 @@ class Category(models.Model):
 def product_image_upload_path(instance, filename):
     # ext = filename.split('.')[-1]
     # return f"product_images/{instance.product_id or 'temp'}.{ext}"
-    return f"product_images/temp_{filename}"
+    return f"{media_prefix()}product_images/temp_{filename}"
 
 
 class Product(models.Model):
     product_id = models.AutoField(primary_key=True)
     product_name = models.CharField(max_length=255)
     category = models.CharField(max_length=255, blank=True, null=True)
+    # Integer key for joins and aggregation; kept in sync with `category` on save and rename.
+    category_ref = models.ForeignKey(
+        Category, models.SET_NULL, db_column='category_id', blank=True, null=True,
+        db_constraint=False, related_name='products',
+    )
     details = models.TextField(blank=True, null=True)
     
     image = models.ImageField(
@@ -44,6 +54,15 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         is_new = self._state.adding  # True if creating
 
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'category' in update_fields:
+            self.category_ref_id = (
+                Category.objects.filter(name=self.category).values_list('category_id', flat=True).first()
+                if self.category else None
+            )
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'category_ref'}
+
         # Save initially to get product_id
         super().save(*args, **kwargs)
 
@@ -51,7 +70,7 @@ class Product(models.Model):
             # Read the current file
             temp_image_path = self.image.name
             extension = os.path.splitext(temp_image_path)[1]
-            new_image_name = f"product_images/{self.product_id}{extension}"
+            new_image_name = f"{media_prefix()}product_images/{self.product_id}{extension}"
 
             # Rename the image
             image_content = self.image.read()
@@ -107,10 +126,49 @@ class Order(models.Model):
     payment_status = models.CharField(max_length=50, blank=True, null=True)
     order_status = models.CharField(max_length=50, blank=True, null=True)
     timestamp = models.DateTimeField(blank=True, null=True)
+    # Denormalized from order_items by DB triggers and dashboard.order_totals; columns and triggers
+    # are installed by `manage.py migrate` (see dashboard.order_totals.install_order_totals).
+    items_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)
+    grand_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Parsed delivery_address, joined on the order number; no column of its own.
+    address = models.ForeignObject(
+        'OrderAddress', on_delete=models.DO_NOTHING, from_fields=['order_number'], to_fields=['order_number'],
+        null=True, related_name='+', editable=False, serialize=False,
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the stored statuses so signal handlers can tell what a save changed.
+        instance._loaded_statuses = {
+            name: value for name, value in zip(field_names, values)
+            if name in ('payment_status', 'order_status')
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_statuses = {'payment_status': self.payment_status, 'order_status': self.order_status}
+
+    def became_paid(self, created=False):
+        if created:
+            # Inserted already settled; there is no earlier status to compare with.
+            return self.payment_status == 'Paid'
+        loaded = getattr(self, '_loaded_statuses', {})
+        return 'payment_status' in loaded and loaded['payment_status'] != 'Paid' and self.payment_status == 'Paid'
 
     class Meta:
         managed = False
         db_table = 'orders'
+        # Unmanaged: these are created online by `manage.py advise_indexes --apply`.
+        indexes = [
+            models.Index(fields=['payment_status', 'timestamp'], name='orders_payment_ts_idx'),
+            models.Index(fields=['order_status'], name='orders_status_idx'),
+            models.Index(fields=['timestamp'], name='orders_timestamp_idx'),
+            models.Index(fields=['invoice_id'], name='orders_invoice_idx'),
+            models.Index(fields=['user_id'], name='orders_user_idx'),
+        ]
 
     def __str__(self):
         return self.order_number
@@ -118,13 +176,65 @@ class Order(models.Model):
 
 class OrderItem(models.Model):
     order_number = models.ForeignKey(Order, models.DO_NOTHING, db_column='order_number', to_field='order_number')
-    product_id = models.IntegerField()
+    # No FK constraint exists in the table; the relation only enables joins to products.
+    product = models.ForeignKey(Product, models.DO_NOTHING, db_column='product_id', db_constraint=False, db_index=False)
     quantity = models.IntegerField()
     amount = models.DecimalField(max_digits=10, decimal_places=2)
 
     class Meta:
         managed = False
         db_table = 'order_items'
+        indexes = [
+            models.Index(fields=['product'], name='order_items_product_idx'),
+        ]
+
+
+class ArchivedOrder(models.Model):
+    # Archive tier of `orders`; rows are moved here by `manage.py archive_orders`.
+    order_number = models.CharField(primary_key=True, max_length=255)
+    user_id = models.BigIntegerField(db_column='userID', blank=True, null=True)
+    username = models.CharField(max_length=255)
+    invoice_id = models.CharField(max_length=255)
+    delivery_method = models.CharField(max_length=50, blank=True, null=True)
+    delivery_address = models.TextField(blank=True, null=True)
+    payment_method = models.CharField(max_length=50, blank=True, null=True)
+    payment_status = models.CharField(max_length=50, blank=True, null=True)
+    order_status = models.CharField(max_length=50, blank=True, null=True)
+    timestamp = models.DateTimeField(blank=True, null=True)
+    items_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)
+    grand_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Parsed delivery_address, joined on the order number; no column of its own.
+    address = models.ForeignObject(
+        'OrderAddress', on_delete=models.DO_NOTHING, from_fields=['order_number'], to_fields=['order_number'],
+        null=True, related_name='+', editable=False, serialize=False,
+    )
+
+    class Meta:
+        managed = True
+        db_table = 'orders_archive'
+        indexes = [
+            models.Index(fields=['payment_status', 'timestamp'], name='orders_arch_payment_ts_idx'),
+            models.Index(fields=['timestamp'], name='orders_arch_timestamp_idx'),
+            models.Index(fields=['user_id'], name='orders_arch_user_idx'),
+        ]
+
+    def __str__(self):
+        return self.order_number
+
+
+class ArchivedOrderItem(models.Model):
+    order_number = models.ForeignKey(ArchivedOrder, models.DO_NOTHING, db_column='order_number', to_field='order_number')
+    product = models.ForeignKey(Product, models.DO_NOTHING, db_column='product_id', db_constraint=False, db_index=False)
+    quantity = models.IntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        managed = True
+        db_table = 'order_items_archive'
+        indexes = [
+            models.Index(fields=['product'], name='order_items_arch_product_idx'),
+        ]
 
 
 class Cart(models.Model):
@@ -138,6 +248,9 @@ class Cart(models.Model):
         managed = False
         db_table = 'cart'
         unique_together = (('user_id', 'product_id'),)
+        indexes = [
+            models.Index(fields=['product_id'], name='cart_product_idx'),
+        ]
 
 
 class Wishlist(models.Model):
@@ -149,6 +262,9 @@ class Wishlist(models.Model):
         managed = False
         db_table = 'wishlist'
         unique_together = (('user_id', 'product_id'),)
+        indexes = [
+            models.Index(fields=['product_id'], name='wishlist_product_idx'),
+        ]
 
 
 class Review(models.Model):
@@ -159,13 +275,27 @@ class Review(models.Model):
     rating = models.IntegerField(blank=True, null=True)
     review = models.TextField(blank=True, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored (product, rating) pair lets rating summaries subtract the old value.
+        instance._loaded_rating = (instance.product_id, instance.rating)
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_rating = (self.product_id, self.rating)
+
     class Meta:
         managed = False
         db_table = 'review'
         unique_together = (('user_id', 'product_id', 'order_number'),)
+        indexes = [
+            models.Index(fields=['product_id', 'rating'], name='review_product_rating_idx'),
+        ]
         
 def store_image_upload_path(instance, filename):
-    return "store_info/store_image.png"  # Always same name to overwrite
+    return f"{media_prefix()}store_info/store_image.png"  # Always same name to overwrite
 
 class StoreInfo(models.Model):
     id = models.AutoField(primary_key=True)
@@ -183,21 +313,25 @@ class StoreInfo(models.Model):
     delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     bank_details = models.TextField(blank=True, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can spot a replaced image without re-reading the row.
+        instance._loaded_image = dict(zip(field_names, values)).get('store_image')
+        return instance
+
     def save(self, *args, **kwargs):
         # Delete old file if a new one is being uploaded
-        if self.pk:
-            try:
-                old_obj = StoreInfo.objects.get(pk=self.pk)
-                if (
-                    old_obj.store_image and
-                    old_obj.store_image.name != self.store_image.name and
-                    default_storage.exists(old_obj.store_image.name)
-                ):
-                    default_storage.delete(old_obj.store_image.name)
-            except StoreInfo.DoesNotExist:
-                pass
+        old_image = getattr(self, '_loaded_image', None)
+        if (
+            old_image and
+            old_image != self.store_image.name and
+            default_storage.exists(old_image)
+        ):
+            default_storage.delete(old_image)
 
         super().save(*args, **kwargs)
+        self._loaded_image = self.store_image.name
 
     class Meta:
         db_table = 'store_info'
@@ -205,3 +339,303 @@ class StoreInfo(models.Model):
 
     def __str__(self):
         return f"Store Info #{self.id}"
+
+
+class CustomerStats(models.Model):
+    # Maintained by dashboard.customers on order writes; rebuilt by `manage.py rebuild_customer_stats`.
+    user_id = models.BigIntegerField(primary_key=True, db_column='userID')
+    username = models.CharField(max_length=255)
+    order_count = models.IntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    first_order_at = models.DateTimeField(blank=True, null=True)
+    last_order_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = 'customer_stats'
+        indexes = [
+            models.Index(fields=['paid_revenue'], name='customer_stats_revenue_idx'),
+            models.Index(fields=['last_order_at'], name='customer_stats_last_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.username} ({self.user_id})"
+
+
+class CustomerCohort(models.Model):
+    # Written by `manage.py compute_customer_segments`.
+    cohort_month = models.DateField()
+    month_offset = models.IntegerField()
+    customers = models.IntegerField()
+
+    class Meta:
+        managed = True
+        db_table = 'customer_cohorts'
+        unique_together = (('cohort_month', 'month_offset'),)
+
+
+class CustomerSegment(models.Model):
+    # RFM scores are quintiles (1-5, 5 best); written by `manage.py compute_customer_segments`.
+    user_id = models.BigIntegerField(primary_key=True, db_column='userID')
+    recency_days = models.IntegerField()
+    frequency = models.IntegerField()
+    monetary = models.DecimalField(max_digits=14, decimal_places=2)
+    r_score = models.PositiveSmallIntegerField()
+    f_score = models.PositiveSmallIntegerField()
+    m_score = models.PositiveSmallIntegerField()
+    segment = models.CharField(max_length=32, db_index=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        managed = True
+        db_table = 'customer_segments'
+
+
+class ProductOrderCount(models.Model):
+    # Paid orders containing each product; maintained by dashboard.affinity.
+    product_id = models.IntegerField(primary_key=True)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'product_order_counts'
+
+
+class ProductPairCount(models.Model):
+    # Sparse co-occurrence matrix, stored in both directions so one product's row is an index range.
+    product_id = models.IntegerField()
+    other_product_id = models.IntegerField()
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'product_pair_counts'
+        unique_together = (('product_id', 'other_product_id'),)
+
+
+class ProductAffinity(models.Model):
+    # Top-K "frequently bought together" products per product.
+    product_id = models.IntegerField()
+    rank = models.PositiveSmallIntegerField()
+    other_product_id = models.IntegerField()
+    orders = models.IntegerField()
+    confidence = models.FloatField()
+    lift = models.FloatField()
+
+    class Meta:
+        managed = True
+        db_table = 'product_affinity'
+        unique_together = (('product_id', 'rank'),)
+
+
+class ProductRatingSummary(models.Model):
+    # Maintained on review writes by MySQL triggers (bot writes) or dashboard.ratings' signal
+    # handlers (other databases); rebuilt by `manage.py rebuild_rating_summaries`.
+    product = models.OneToOneField(
+        Product, models.DO_NOTHING, primary_key=True, db_column='product_id',
+        db_constraint=False, related_name='rating_summary',
+    )
+    count = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    average = models.FloatField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'product_rating_summary'
+        indexes = [
+            models.Index(fields=['average', 'count'], name='rating_summary_average_idx'),
+        ]
+
+    def distribution(self):
+        return {str(star): getattr(self, f'rating_{star}') for star in range(1, 6)}
+
+
+class SyncState(models.Model):
+    # Small key/value store for job watermarks and build markers.
+    key = models.CharField(primary_key=True, max_length=100)
+    value = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = 'sync_state'
+
+    @classmethod
+    def get_value(cls, key, default=None):
+        return cls.objects.filter(key=key).values_list('value', flat=True).first() or default
+
+    @classmethod
+    def set_value(cls, key, value):
+        cls.objects.update_or_create(key=key, defaults={'value': str(value)})
+
+    @classmethod
+    def adjust(cls, key, delta, initial):
+        """Add `delta` to an integer counter in one UPDATE; on first use store `initial()`,
+        which must already include the change."""
+        updated = cls.objects.filter(key=key).update(
+            value=Cast(Cast(F('value'), models.BigIntegerField()) + delta, models.CharField()),
+        )
+        if not updated:
+            cls.set_value(key, initial())
+
+
+class OrderCube(models.Model):
+    # Daily pre-aggregate of order lines by the breakdown dimensions; built by `manage.py build_order_cube`.
+    day = models.DateField()
+    payment_method = models.CharField(max_length=50, blank=True, null=True)
+    delivery_method = models.CharField(max_length=50, blank=True, null=True)
+    payment_status = models.CharField(max_length=50, blank=True, null=True)
+    order_status = models.CharField(max_length=50, blank=True, null=True)
+    category = models.CharField(max_length=255, blank=True, null=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+    units = models.IntegerField()
+    orders = models.IntegerField()
+
+    class Meta:
+        managed = True
+        db_table = 'order_cube'
+        indexes = [
+            models.Index(fields=['day'], name='order_cube_day_idx'),
+        ]
+
+
+class OrderCubeOrders(models.Model):
+    # Distinct orders per day and order attributes (no category), so order counts grouped
+    # without category come from the cube too; built alongside OrderCube.
+    day = models.DateField()
+    payment_method = models.CharField(max_length=50, blank=True, null=True)
+    delivery_method = models.CharField(max_length=50, blank=True, null=True)
+    payment_status = models.CharField(max_length=50, blank=True, null=True)
+    order_status = models.CharField(max_length=50, blank=True, null=True)
+    orders = models.IntegerField()
+
+    class Meta:
+        managed = True
+        db_table = 'order_cube_orders'
+        indexes = [
+            models.Index(fields=['day'], name='order_cube_orders_day_idx'),
+        ]
+
+
+class OrderStatusEvent(models.Model):
+    # Append-only history of payment_status/order_status transitions.
+    id = models.BigAutoField(primary_key=True)
+    order_number = models.CharField(max_length=255, db_index=True)
+    field = models.CharField(max_length=20)
+    old_value = models.CharField(max_length=50, blank=True, null=True)
+    new_value = models.CharField(max_length=50, blank=True, null=True)
+    source = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        managed = True
+        db_table = 'order_status_events'
+
+
+class OrderFulfilment(models.Model):
+    # Milestones folded from the event log by `manage.py compute_fulfilment_metrics`.
+    order_number = models.CharField(primary_key=True, max_length=255)
+    paid_at = models.DateTimeField(blank=True, null=True)
+    shipped_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    delivered_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    class Meta:
+        managed = True
+        db_table = 'order_fulfilment'
+
+
+class FulfilmentWeek(models.Model):
+    # Durations in hours, bucketed by the ISO week the later milestone happened in.
+    week = models.DateField()
+    metric = models.CharField(max_length=30)
+    count = models.IntegerField()
+    p50 = models.FloatField()
+    p90 = models.FloatField()
+    p99 = models.FloatField()
+
+    class Meta:
+        managed = True
+        db_table = 'fulfilment_weekly'
+        unique_together = (('week', 'metric'),)
+
+
+class Job(models.Model):
+    # Deferred work claimed by `manage.py run_workers`; see dashboard.jobs.
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, SUCCEEDED, FAILED)]
+
+    id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = 'jobs'
+        indexes = [
+            # Claim order: ready queued jobs, highest priority first.
+            models.Index(fields=['status', '-priority', 'run_at'], name='jobs_claim_idx'),
+        ]
+
+
+class OrderAddress(models.Model):
+    # delivery_address parsed once per order (at write time or by `manage.py backfill_order_addresses`).
+    order_number = models.CharField(primary_key=True, max_length=255)
+    country = models.CharField(max_length=64, blank=True, default='')
+    region = models.CharField(max_length=64, blank=True, default='')
+    city = models.CharField(max_length=100, blank=True, default='')
+    postcode = models.CharField(max_length=16, blank=True, default='')
+
+    class Meta:
+        managed = True
+        db_table = 'order_addresses'
+        indexes = [
+            models.Index(fields=['country', 'region', 'city'], name='order_addresses_geo_idx'),
+            models.Index(fields=['postcode'], name='order_addresses_postcode_idx'),
+        ]
+
+
+class OrderValueSketch(models.Model):
+    # Mergeable log-bucket sketch of paid order values per day and per month; see dashboard.sketches.
+    period = models.CharField(max_length=5)
+    start = models.DateField()
+    count = models.IntegerField(default=0)
+    zero_count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    buckets = models.JSONField(default=dict)
+
+    class Meta:
+        managed = True
+        db_table = 'order_value_sketches'
+        unique_together = (('period', 'start'),)
+
+
+class Forecast(models.Model):
+    # Daily forecasts with a 95% band; written by `manage.py build_forecasts`, never computed on request.
+    series = models.CharField(max_length=300)
+    metric = models.CharField(max_length=10)
+    day = models.DateField()
+    value = models.FloatField()
+    lower = models.FloatField()
+    upper = models.FloatField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        managed = True
+        db_table = 'forecasts'
+        unique_together = (('series', 'metric', 'day'),)
@@ -0,0 +1,190 @@
+# dashboard/order_totals.py
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Sum
+
+from . import refcache
+from .customers import refresh_customer
+from .models import Order, OrderItem, StoreInfo
+from .stores import store_db
+
+# Columns added to the bot-owned (unmanaged) orders table.
+COLUMNS = (
+    ('items_total', 'DECIMAL(12,2) NOT NULL DEFAULT 0'),
+    ('item_count', 'INT NOT NULL DEFAULT 0'),
+    ('grand_total', 'DECIMAL(12,2) NOT NULL DEFAULT 0'),
+)
+
+STORE_FEE_SQL = "COALESCE((SELECT delivery_fee FROM store_info ORDER BY id LIMIT 1), 0)"
+
+
+def refresh_sql(ref, where=None):
+    """UPDATE recomputing orders' totals from their items; `ref` is an SQL expression for the order number.
+
+    Same rules as expected_totals(). grand_total is assigned first because MySQL
+    evaluates single-table SET clauses left to right with the new values.
+    """
+    items = f"FROM order_items WHERE order_items.order_number = {ref}"
+    return (
+        f"UPDATE orders SET "
+        f"grand_total = CASE WHEN (SELECT COALESCE(SUM(quantity), 0) {items}) = 0 THEN 0 "
+        f"ELSE (SELECT COALESCE(SUM(amount), 0) {items}) + "
+        f"CASE WHEN item_count > 0 THEN grand_total - items_total ELSE {STORE_FEE_SQL} END END, "
+        f"items_total = (SELECT COALESCE(SUM(amount), 0) {items}), "
+        f"item_count = (SELECT COALESCE(SUM(quantity), 0) {items}) "
+        f"WHERE {where or f'orders.order_number = {ref}'}"
+    )
+
+
+def trigger_sql():
+    """{name: CREATE TRIGGER} keeping the totals right for writes that bypass Django (the storefront bot)."""
+    items = "FROM order_items WHERE order_items.order_number = NEW.order_number"
+    return {
+        'order_items_totals_insert': (
+            f"CREATE TRIGGER order_items_totals_insert AFTER INSERT ON order_items FOR EACH ROW "
+            f"{refresh_sql('NEW.order_number')}"
+        ),
+        'order_items_totals_update': (
+            f"CREATE TRIGGER order_items_totals_update AFTER UPDATE ON order_items FOR EACH ROW BEGIN "
+            f"{refresh_sql('NEW.order_number')}; "
+            f"IF NOT (OLD.order_number <=> NEW.order_number) THEN {refresh_sql('OLD.order_number')}; END IF; END"
+        ),
+        'order_items_totals_delete': (
+            f"CREATE TRIGGER order_items_totals_delete AFTER DELETE ON order_items FOR EACH ROW "
+            f"{refresh_sql('OLD.order_number')}"
+        ),
+        # Items inserted before their order row.
+        'orders_totals_insert': (
+            f"CREATE TRIGGER orders_totals_insert BEFORE INSERT ON orders FOR EACH ROW BEGIN "
+            f"IF NEW.item_count = 0 THEN "
+            f"SET NEW.items_total = (SELECT COALESCE(SUM(amount), 0) {items}), "
+            f"NEW.item_count = (SELECT COALESCE(SUM(quantity), 0) {items}); "
+            f"IF NEW.item_count > 0 THEN SET NEW.grand_total = NEW.items_total + {STORE_FEE_SQL}; END IF; "
+            f"END IF; END"
+        ),
+    }
+
+
+def schema_ddl(connection):
+    """Statements bringing `orders` up to date: missing total columns, then (MySQL) the triggers."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        existing = {column.name for column in connection.introspection.get_table_description(cursor, 'orders')}
+    missing = [(name, definition) for name, definition in COLUMNS if name not in existing]
+    statements = []
+    if missing:
+        algorithm = ', ALGORITHM=INSTANT' if connection.vendor == 'mysql' else ''
+        additions = ', '.join(f"ADD COLUMN {qn(name)} {definition}" for name, definition in missing)
+        statements.append(f"ALTER TABLE {qn('orders')} {additions}{algorithm}")
+    if connection.vendor == 'mysql':
+        for name, create in trigger_sql().items():
+            statements += [f"DROP TRIGGER IF EXISTS {name}", create]
+    return statements
+
+
+def backfill_totals(connection, batch_size=1000):
+    """Compute totals for orders that have items but were never computed; returns the count."""
+    filled = 0
+    last = ''
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                "SELECT order_number FROM orders WHERE item_count = 0 AND order_number > %s "
+                "AND EXISTS (SELECT 1 FROM order_items WHERE order_items.order_number = orders.order_number) "
+                "ORDER BY order_number LIMIT %s",
+                [last, batch_size],
+            )
+            numbers = [row[0] for row in cursor.fetchall()]
+            if not numbers:
+                return filled
+            placeholders = ', '.join(['%s'] * len(numbers))
+            cursor.execute(
+                refresh_sql('orders.order_number', where=f"orders.order_number IN ({placeholders})"), numbers,
+            )
+            filled += len(numbers)
+            last = numbers[-1]
+
+
+def install_order_totals(using):
+    """Idempotent deploy step for one store database; run by `migrate` (post_migrate)."""
+    connection = connections[using]
+    tables = connection.introspection.table_names()
+    if 'orders' not in tables or 'order_items' not in tables:
+        return 0
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for statement in schema_ddl(connection):
+            cursor.execute(statement)
+    return backfill_totals(connection)
+
+
+def current_delivery_fee():
+    store = refcache.first(StoreInfo)
+    return (store.delivery_fee if store else None) or Decimal(0)
+
+
+def item_totals(order_numbers, item_model=OrderItem):
+    """{order_number: (items_total, item_count)} recomputed from the line items."""
+    rows = (
+        item_model.objects
+        .filter(order_number__in=order_numbers)
+        .values('order_number')
+        .annotate(total=Sum('amount'), count=Sum('quantity'))
+        .order_by()
+    )
+    totals = dict.fromkeys(order_numbers, (Decimal(0), 0))
+    for row in rows:
+        totals[row['order_number']] = (row['total'] or Decimal(0), row['count'] or 0)
+    return totals
+
+
+def charged_fee(items_total, item_count, grand_total, fallback):
+    # The fee is snapshotted into grand_total once an order has items, so later
+    # changes to StoreInfo.delivery_fee don't rewrite historical orders.
+    return grand_total - items_total if item_count else fallback
+
+
+def expected_totals(stored, computed, fallback_fee):
+    """Correct (items_total, item_count, grand_total) given stored and recomputed values."""
+    items_total, item_count = computed
+    fee = charged_fee(*stored, fallback_fee)
+    return items_total, item_count, items_total + fee if item_count else Decimal(0)
+
+
+def refresh_order_totals(order_number):
+    """Recompute an order's totals after item writes, then its customer's stats."""
+    stored = Order.objects.filter(order_number=order_number).values_list(
+        'items_total', 'item_count', 'grand_total', 'user_id'
+    ).first()
+    if stored is None:
+        return
+    *stored, user_id = stored
+    items_total, item_count, grand_total = expected_totals(
+        stored, item_totals([order_number])[order_number], current_delivery_fee()
+    )
+    Order.objects.filter(order_number=order_number).update(
+        items_total=items_total, item_count=item_count, grand_total=grand_total,
+    )
+    # Paid revenue depends on the items too; the order row is already read here.
+    refresh_customer(user_id)
+
+
+def ensure_totals(order):
+    """Re-sum an order whose totals were never computed (items written without the triggers).
+
+    Called on status changes such as the webhook, so a settled order always reports its value.
+    """
+    if order.item_count:
+        return
+    items_total, item_count = item_totals([order.order_number])[order.order_number]
+    if not item_count:
+        return
+    order.items_total, order.item_count = items_total, item_count
+    order.grand_total = items_total + current_delivery_fee()
+    Order.objects.filter(pk=order.pk, item_count=0).update(
+        items_total=order.items_total, item_count=order.item_count, grand_total=order.grand_total,
+    )
+
+
+def schedule_order_totals(order_number):
+    transaction.on_commit(lambda: refresh_order_totals(order_number), using=store_db())
@@ -0,0 +1,114 @@
+# dashboard/ratings.py
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+
+from .catalog import invalidate as invalidate_catalog
+from .models import ProductRatingSummary
+from .stores import store_connection, store_db, use_store
+
+STARS = range(1, 6)
+
+
+def add_sql(ref):
+    """Upsert adding the rating of review row `ref` (NEW/OLD) to its product's summary."""
+    stars = ', '.join(f'rating_{star}' for star in STARS)
+    star_values = ', '.join(f'{ref}.rating = {star}' for star in STARS)
+    star_updates = ', '.join(f'rating_{star} = rating_{star} + ({ref}.rating = {star})' for star in STARS)
+    # ON DUPLICATE KEY UPDATE assigns left to right, so `average` sees the new count and total.
+    return (
+        f"INSERT INTO product_rating_summary (product_id, `count`, total, average, {stars}) "
+        f"VALUES ({ref}.product_id, 1, {ref}.rating, {ref}.rating, {star_values}) "
+        f"ON DUPLICATE KEY UPDATE `count` = `count` + 1, total = total + {ref}.rating, {star_updates}, "
+        f"average = total / `count`"
+    )
+
+
+def remove_sql(ref):
+    star_updates = ', '.join(f'rating_{star} = rating_{star} - ({ref}.rating = {star})' for star in STARS)
+    return (
+        f"UPDATE product_rating_summary SET `count` = `count` - 1, total = total - {ref}.rating, {star_updates}, "
+        f"average = IF(`count` > 0, total / `count`, 0) WHERE product_id = {ref}.product_id"
+    )
+
+
+def counted(ref):
+    return f"{ref}.product_id IS NOT NULL AND {ref}.rating BETWEEN 1 AND 5"
+
+
+def trigger_sql():
+    """{name: CREATE TRIGGER} keeping product_rating_summary right for reviews the storefront bot writes."""
+    return {
+        'review_ratings_insert': (
+            f"CREATE TRIGGER review_ratings_insert AFTER INSERT ON review FOR EACH ROW BEGIN "
+            f"IF {counted('NEW')} THEN {add_sql('NEW')}; END IF; END"
+        ),
+        'review_ratings_update': (
+            f"CREATE TRIGGER review_ratings_update AFTER UPDATE ON review FOR EACH ROW BEGIN "
+            f"IF NOT (OLD.product_id <=> NEW.product_id AND OLD.rating <=> NEW.rating) THEN "
+            f"IF {counted('OLD')} THEN {remove_sql('OLD')}; END IF; "
+            f"IF {counted('NEW')} THEN {add_sql('NEW')}; END IF; "
+            f"END IF; END"
+        ),
+        'review_ratings_delete': (
+            f"CREATE TRIGGER review_ratings_delete AFTER DELETE ON review FOR EACH ROW BEGIN "
+            f"IF {counted('OLD')} THEN {remove_sql('OLD')}; END IF; END"
+        ),
+    }
+
+
+def uses_triggers(connection=None):
+    # The triggers are MySQL-only; elsewhere (tests, SQLite) the signal handlers keep the summary.
+    return (connection or store_connection()).vendor == 'mysql'
+
+
+def install_rating_triggers(store):
+    """Idempotent deploy step for one store; run by `migrate` (post_migrate) next to the order totals."""
+    with use_store(store):
+        connection = store_connection()
+        if 'review' not in connection.introspection.table_names():
+            return
+        if uses_triggers(connection):
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                for name, create in trigger_sql().items():
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                    cursor.execute(create)
+        # Reviews written before the triggers existed are only counted by a rebuild.
+        call_command('rebuild_rating_summaries', stdout=StringIO())
+
+
+def apply_rating(product_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one rating from a product's summary under a row lock."""
+    if product_id is None or rating is None or not 1 <= rating <= 5:
+        return
+    with transaction.atomic(using=store_db()):
+        summary, _ = ProductRatingSummary.objects.select_for_update().get_or_create(product_id=product_id)
+        summary.count += delta
+        summary.total += rating * delta
+        bucket = f'rating_{rating}'
+        setattr(summary, bucket, getattr(summary, bucket) + delta)
+        summary.average = summary.total / summary.count if summary.count else 0
+        summary.save()
+
+
+def review_saved(review, created):
+    if uses_triggers():
+        # The review triggers already counted it; only the catalog's copy needs refreshing.
+        invalidate_catalog()
+        return
+    old = None if created else getattr(review, '_loaded_rating', None)
+    new = (review.product_id, review.rating)
+    if old == new:
+        return
+    with transaction.atomic(using=store_db()):
+        if old is not None:
+            apply_rating(*old, -1)
+        apply_rating(*new, 1)
+
+
+def review_deleted(review):
+    if uses_triggers():
+        invalidate_catalog()
+        return
+    apply_rating(*getattr(review, '_loaded_rating', (review.product_id, review.rating)), -1)
@@ -0,0 +1,166 @@
+# dashboard/realtime.py
+import asyncio
+import json
+import secrets
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from .stores import current_store, store_db, use_store
+
+ACTIVE_STATUSES = ('Pending', 'Processing', 'Shipped')
+
+
+class Subscription:
+    def __init__(self, loop, maxsize, store):
+        self.loop = loop
+        self.store = store
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        # Runs on the subscriber's loop. A client too slow to drain its queue
+        # loses the oldest deltas rather than growing memory.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class LocalBroker:
+    """In-process fan-out to the SSE connections served by this worker."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop(), settings.REALTIME_QUEUE_SIZE, current_store())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, message):
+        self.deliver(message)
+
+    def deliver(self, message):
+        # Publishers run in sync request threads; hand off to each subscriber's event loop.
+        store = json.loads(message).get('store')
+        with self._lock:
+            subscribers = [subscription for subscription in self._subscribers if subscription.store == store]
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.put, message)
+
+
+class RedisBroker(LocalBroker):
+    """Relays messages through Redis pub/sub so every worker's clients see every write."""
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.REALTIME_REDIS_URL)
+        self._channel = settings.REALTIME_CHANNEL
+        listener = threading.Thread(target=self._listen, name='realtime-redis', daemon=True)
+        listener.start()
+
+    def publish(self, message):
+        self._redis.publish(self._channel, message)
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel)
+        for item in pubsub.listen():
+            self.deliver(item['data'].decode())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BACKEND)()
+    return _broker
+
+
+def publish(event_type, **data):
+    message = json.dumps({'type': event_type, 'store': current_store(), **data}, default=str)
+    # Only announce writes that actually committed.
+    transaction.on_commit(lambda: get_broker().publish(message), using=store_db())
+
+
+def kpi_delta(old, new, items_total):
+    """Dashboard summary increments caused by an order moving from `old` to `new` statuses."""
+    delta = {}
+    was_active = old.get('order_status') in ACTIVE_STATUSES
+    is_active = new.get('order_status') in ACTIVE_STATUSES
+    if was_active != is_active:
+        delta['active_orders'] = 1 if is_active else -1
+    was_paid = old.get('payment_status') == 'Paid'
+    is_paid = new.get('payment_status') == 'Paid'
+    if was_paid != is_paid:
+        delta['total_revenue'] = float(items_total) * (1 if is_paid else -1)
+    return delta
+
+
+def order_saved(order, created):
+    new = {'payment_status': order.payment_status, 'order_status': order.order_status}
+    old = {} if created else getattr(order, '_loaded_statuses', None)
+    if old is None:
+        return
+    if created:
+        publish('order.created', order={
+            'order_number': order.order_number,
+            'username': order.username,
+            'order_status': order.order_status,
+            'total_amount': float(order.items_total),
+        }, kpi=kpi_delta({}, new, order.items_total))
+    elif old != new:
+        publish('order.status', order_number=order.order_number, **new,
+                kpi=kpi_delta(old, new, order.items_total))
+
+
+def statuses_bulk_updated(changed, changes):
+    """One message for a bulk status update instead of one per order."""
+    kpi = {}
+    for old in changed.values():
+        for key, value in kpi_delta(old, {**old, **changes}, old.get('items_total', 0)).items():
+            kpi[key] = kpi.get(key, 0) + value
+    publish('orders.status', order_numbers=list(changed), **changes, kpi=kpi)
+
+
+def _ticket_key(ticket):
+    return f'realtime:ticket:{ticket}'
+
+
+def issue_ticket(user_id):
+    """Single-use, short-lived ticket that opens one stream, so no JWT goes into a URL (and access logs)."""
+    ticket, store = secrets.token_urlsafe(24), current_store()
+    # Kept outside the per-store key space: EventSource can't send the X-Store header,
+    # so the stream request may resolve to another store than the one issuing the ticket.
+    with use_store(settings.DEFAULT_STORE):
+        cache.set(_ticket_key(ticket), (user_id, store), settings.REALTIME_TICKET_SECONDS)
+    return ticket
+
+
+def redeem_ticket(ticket):
+    """(user_id, store) for a valid unused ticket of an active user, else None."""
+    with use_store(settings.DEFAULT_STORE):
+        key = _ticket_key(ticket)
+        redeemed = cache.get(key)
+        # delete() reports whether this caller removed the key, so a ticket opens one stream only.
+        if redeemed is None or not cache.delete(key):
+            return None
+    user_id, store = redeemed
+    if not get_user_model().objects.filter(pk=user_id, is_active=True).exists():
+        return None
+    return user_id, store
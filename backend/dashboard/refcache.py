@@ -0,0 +1,59 @@
+# dashboard/refcache.py
+import copy
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .versions import get_version, bump_version
+from .stores import current_store, store_db
+
+# Read-through, process-local copies of small reference tables. Each registered
+# model has a version counter in the shared cache, bumped after any committed
+# save or delete, so a steady-state read costs one cache get and no queries.
+
+# model -> ordering of the cached rows
+_registry = {}
+# (store, model label) -> (version, rows)
+_tables = {}
+_lock = threading.Lock()
+
+
+def _version_name(model):
+    return f'refcache:{model._meta.label_lower}'
+
+
+def invalidate(model):
+    """Call after writes that bypass model signals (bulk_create, queryset update/delete)."""
+    transaction.on_commit(lambda: bump_version(_version_name(model)), using=store_db())
+
+
+def _changed(sender, **kwargs):
+    invalidate(sender)
+
+
+def register(model, ordering=None):
+    """Opt a small, rarely written model into the cache; keep it to tables of at most a few thousand rows."""
+    _registry[model] = ordering or (model._meta.pk.name,)
+    uid = f'refcache:{model._meta.label_lower}'
+    post_save.connect(_changed, sender=model, dispatch_uid=uid)
+    post_delete.connect(_changed, sender=model, dispatch_uid=uid)
+    return model
+
+
+def rows(model):
+    """All rows of a registered model as fresh copies, safe for callers to modify."""
+    key = (current_store(), model._meta.label_lower)
+    version = get_version(_version_name(model))
+    cached = _tables.get(key)
+    if cached is None or cached[0] != version:
+        with _lock:
+            cached = _tables.get(key)
+            if cached is None or cached[0] != version:
+                cached = _tables[key] = (version, tuple(model.objects.order_by(*_registry[model])))
+    return [copy.copy(instance) for instance in cached[1]]
+
+
+def first(model):
+    instances = rows(model)
+    return instances[0] if instances else None
@@ -0,0 +1,246 @@
+# dashboard/search.py
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Product, ProductOrderCount
+from .versions import get_version, bump_version
+from .stores import current_store, store_db
+
+VERSION_NAME = 'search'
+TOKEN_RE = re.compile(r'\w+')
+FIELD_WEIGHTS = {'product_name': 3, 'category': 2, 'details': 1}
+# Match quality multipliers: exact term, prefix of a term, one edit away.
+EXACT, PREFIX, TYPO = 1.0, 0.6, 0.4
+
+MIN_PREFIX = 2
+MAX_PREFIX = 8
+MAX_TOKEN_LENGTH = 24
+MIN_TYPO_LENGTH = 4
+
+
+def tokenize(text):
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+def deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def within_one_edit(a, b):
+    """Levenshtein distance <= 1, without building the full matrix."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+            j += 1
+        else:
+            i += 1
+            j += 1
+    return edits + (len(b) - j) <= 1
+
+
+class SearchIndex:
+    """Inverted index over product name, category and details.
+
+    Postings map each term to {product_id: field weight}. Prefixes (up to
+    MAX_PREFIX characters) and single-character deletions map back to terms,
+    so their size grows with the vocabulary rather than with the catalog.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self.postings = defaultdict(dict)
+        self.prefixes = defaultdict(set)
+        self.deletes = defaultdict(set)
+        self.sales = {}
+        self.sales_loaded_at = 0
+        self.version = None
+        self.lock = threading.RLock()
+
+    def build(self):
+        with self.lock:
+            self.docs.clear()
+            self.postings.clear()
+            self.prefixes.clear()
+            self.deletes.clear()
+            self.version = get_version(VERSION_NAME)
+            products = Product.objects.only('product_id', 'product_name', 'category', 'details', 'price')
+            for product in products.iterator(chunk_size=2000):
+                self.add(product)
+            self.load_sales()
+
+    def load_sales(self):
+        self.sales = dict(ProductOrderCount.objects.values_list('product_id', 'orders'))
+        self.sales_loaded_at = time.monotonic()
+
+    def terms_for(self, product):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            tokens = tokenize(getattr(product, field))
+            if field == 'details':
+                tokens = tokens[:settings.SEARCH_DETAILS_TOKENS]
+            for token in tokens:
+                weights[token] = max(weights.get(token, 0), weight)
+        return weights
+
+    def add(self, product):
+        with self.lock:
+            self.remove(product.product_id)
+            terms = self.terms_for(product)
+            self.docs[product.product_id] = ({
+                'product_id': product.product_id,
+                'product_name': product.product_name,
+                'category': product.category,
+                'price': str(product.price),
+            }, terms)
+            for term, weight in terms.items():
+                if term not in self.postings:
+                    self.index_term(term)
+                self.postings[term][product.product_id] = weight
+
+    def remove(self, product_id):
+        with self.lock:
+            doc = self.docs.pop(product_id, None)
+            if doc is None:
+                return
+            for term in doc[1]:
+                postings = self.postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(product_id, None)
+                if not postings:
+                    del self.postings[term]
+                    self.unindex_term(term)
+
+    def index_term(self, term):
+        for length in range(MIN_PREFIX, min(len(term), MAX_PREFIX) + 1):
+            self.prefixes[term[:length]].add(term)
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in deletions(term):
+                self.deletes[variant].add(term)
+
+    def unindex_term(self, term):
+        keys = [(self.prefixes, term[:length]) for length in range(MIN_PREFIX, min(len(term), MAX_PREFIX) + 1)]
+        if len(term) >= MIN_TYPO_LENGTH:
+            keys += [(self.deletes, variant) for variant in deletions(term)]
+        for table, key in keys:
+            terms = table.get(key)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del table[key]
+
+    def expand(self, word, prefix, typo):
+        """{indexed term: match quality} for one query word."""
+        matches = {}
+        if prefix and len(word) >= MIN_PREFIX:
+            for term in self.prefixes.get(word[:MAX_PREFIX], ()):
+                if term.startswith(word):
+                    matches[term] = PREFIX
+        if typo and len(word) >= MIN_TYPO_LENGTH:
+            candidates = set(self.deletes.get(word, ()))
+            for variant in deletions(word) | {word}:
+                candidates.update(self.deletes.get(variant, ()))
+                if variant in self.postings:
+                    candidates.add(variant)
+            for term in candidates:
+                if term not in matches and within_one_edit(word, term):
+                    matches[term] = TYPO
+        if word in self.postings:
+            matches[word] = EXACT
+        return matches
+
+    def search(self, query, limit=10, typo=True):
+        words = tokenize(query)
+        if not words:
+            return []
+        with self.lock:
+            scores = None
+            for position, word in enumerate(words):
+                # Only the word being typed is completed as a prefix.
+                matches = self.expand(word, prefix=position == len(words) - 1, typo=typo)
+                word_scores = {}
+                for term, quality in matches.items():
+                    for product_id, weight in self.postings[term].items():
+                        score = weight * quality
+                        if score > word_scores.get(product_id, 0):
+                            word_scores[product_id] = score
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {
+                        product_id: score + word_scores[product_id]
+                        for product_id, score in scores.items() if product_id in word_scores
+                    }
+                if not scores:
+                    return []
+            best = heapq.nlargest(
+                limit, scores.items(),
+                key=lambda item: (item[1], self.sales.get(item[0], 0), -item[0]),
+            )
+            return [
+                {**self.docs[product_id][0], 'sales': self.sales.get(product_id, 0)}
+                for product_id, _ in best
+            ]
+
+
+# store -> SearchIndex
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def store_index():
+    store = current_store()
+    index = _indexes.get(store)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(store, SearchIndex())
+    return index
+
+
+def get_index():
+    """The current store's index, rebuilt when another worker has changed products."""
+    index = store_index()
+    if index.version is None or index.version != get_version(VERSION_NAME):
+        with index.lock:
+            if index.version is None or index.version != get_version(VERSION_NAME):
+                index.build()
+    elif time.monotonic() - index.sales_loaded_at > settings.SEARCH_SALES_REFRESH_SECONDS:
+        index.load_sales()
+    return index
+
+
+def apply_change(product_id, product=None):
+    version = bump_version(VERSION_NAME)
+    index = store_index()
+    with index.lock:
+        if index.version is None:
+            return
+        if product is None:
+            index.remove(product_id)
+        else:
+            index.add(product)
+        # A gap means another worker wrote in between; rebuild on the next query.
+        index.version = version if version == index.version + 1 else None
+
+
+def product_saved(product):
+    transaction.on_commit(lambda: apply_change(product.product_id, product), using=store_db())
+
+
+def product_deleted(product_id):
+    transaction.on_commit(lambda: apply_change(product_id), using=store_db())
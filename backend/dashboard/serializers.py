@@ -1,6 +1,25 @@
 from rest_framework import serializers
-from django.db.models import Sum
-from .models import Product, Order, Cart, Wishlist, Review, Category, OrderItem, StoreInfo
+from django.db import models
+from .jobs import get_task
+from .media import versioned_url
+from .models import Product, Order, Cart, Wishlist, Review, Category, OrderItem, StoreInfo, CustomerStats, ProductRatingSummary, Job
+
+
+class VersionedImageField(serializers.ImageField):
+    # Content-hash URLs can be cached forever; overwriting the file changes the URL.
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = versioned_url(value.name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class VersionedMediaSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: VersionedImageField,
+    }
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,11 +28,24 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(VersionedMediaSerializer):
+    rating_summary = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = '__all__'
-        read_only_fields = ['product_id']
+        read_only_fields = ['product_id', 'category_ref']
+
+    def get_rating_summary(self, obj):
+        try:
+            summary = obj.rating_summary
+        except ProductRatingSummary.DoesNotExist:
+            return None
+        return {
+            'count': summary.count,
+            'average': round(summary.average, 2),
+            'distribution': summary.distribution(),
+        }
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -35,22 +67,18 @@ class OrderSerializer(serializers.ModelSerializer):
             'timestamp',
             'products',
             'total_amount',
+            'item_count',
+            'grand_total',
         ]
+        read_only_fields = ['item_count', 'grand_total']
 
     def get_products(self, obj):
-        items = OrderItem.objects.filter(order_number=obj.order_number)
-        result = []
-        for item in items:
-            product = Product.objects.filter(product_id=item.product_id).first()
-            if product:
-                result.append(f"{product.product_name} ×{item.quantity}")
-        return result
+        # Inner join drops lines whose product no longer exists.
+        items = OrderItem.objects.filter(order_number=obj.order_number).select_related('product')
+        return [f"{item.product.product_name} ×{item.quantity}" for item in items]
 
     def get_total_amount(self, obj):
-        total = OrderItem.objects.filter(order_number=obj.order_number).aggregate(
-            total=Sum('amount')
-        )['total']
-        return float(total or 0.0)
+        return float(obj.items_total or 0.0)
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -71,8 +99,30 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class StoreInfoSerializer(serializers.ModelSerializer):
+class StoreInfoSerializer(VersionedMediaSerializer):
 
     class Meta:
         model = StoreInfo
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class CustomerStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerStats
+        fields = '__all__'
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = '__all__'
+        read_only_fields = [
+            'status', 'attempts', 'locked_by', 'locked_at', 'last_error', 'result', 'created_at', 'finished_at',
+        ]
+
+    def validate_task(self, value):
+        try:
+            get_task(value)
+        except KeyError:
+            raise serializers.ValidationError(f"Unknown task {value!r}")
+        return value
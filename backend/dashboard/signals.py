@@ -0,0 +1,74 @@
+# dashboard/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .addresses import record_address
+from .affinity import schedule_paid_order
+from .catalog import invalidate as invalidate_catalog
+from .coalescing import orders_changed
+from .customers import schedule_refresh
+from .models import Category, Order, OrderItem, Product, ProductRatingSummary, Review, StoreInfo
+from .order_totals import ensure_totals, schedule_order_totals
+from .ratings import review_saved, review_deleted
+from .realtime import order_saved as publish_order
+from .refcache import register as cache_reference_table
+from .search import product_saved, product_deleted
+from .sketches import schedule_paid_value
+from .status_events import record_save
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    schedule_refresh(instance.user_id)
+    orders_changed()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    if not created:
+        ensure_totals(instance)
+    record_save(instance, created)
+    record_address(instance, kwargs.get('update_fields'))
+    publish_order(instance, created)
+    schedule_paid_order(instance, created)
+    schedule_paid_value(instance, created)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    # The totals refresh also refreshes the customer, from the order row it reads anyway.
+    schedule_order_totals(instance.order_number_id)
+    orders_changed()
+
+
+@receiver(post_save, sender=Review)
+def review_changed(sender, instance, created, **kwargs):
+    review_saved(instance, created)
+
+
+@receiver(post_delete, sender=Review)
+def review_removed(sender, instance, **kwargs):
+    review_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=StoreInfo)
+@receiver([post_save, post_delete], sender=ProductRatingSummary)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    product_saved(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_removed(sender, instance, **kwargs):
+    product_deleted(instance.product_id)
+
+
+# Small reference tables served from process-local memory; see dashboard.refcache.
+cache_reference_table(Category)
+cache_reference_table(StoreInfo)
@@ -0,0 +1,170 @@
+# dashboard/sketches.py
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, OrderValueSketch
+from .stores import store_db
+
+DAY, MONTH = 'day', 'month'
+
+
+class ValueSketch:
+    """DDSketch-style quantile sketch: values fall into logarithmic buckets.
+
+    Every quantile is within a relative error of `accuracy`, sketches merge by
+    adding bucket counts, and the size is bounded by the value range rather
+    than the number of orders.
+    """
+
+    def __init__(self, buckets=None, zero_count=0, total=0, accuracy=None):
+        self.accuracy = accuracy or settings.ORDER_VALUE_SKETCH_ACCURACY
+        self.gamma = (1 + self.accuracy) / (1 - self.accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {int(index): count for index, count in (buckets or {}).items()}
+        self.zero_count = zero_count
+        self.total = Decimal(total)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.buckets, row.zero_count, row.total)
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, value, weight=1):
+        value = Decimal(value)
+        self.total += value * weight
+        if value <= 0:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(float(value)) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + weight
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.total += other.total
+        return self
+
+    def value_at(self, index):
+        # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i].
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q):
+        count = self.count
+        if not count:
+            return None
+        rank = q * (count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self.value_at(index)
+        return self.value_at(max(self.buckets))
+
+    def histogram(self, bins):
+        """Up to `bins` log-spaced ranges covering the observed values."""
+        if not self.buckets:
+            return [{'from': 0, 'to': 0, 'count': self.zero_count}] if self.zero_count else []
+        low, high = min(self.buckets), max(self.buckets)
+        width = max(1, math.ceil((high - low + 1) / bins))
+        result = []
+        for first in range(low, high + 1, width):
+            last = min(first + width - 1, high)
+            result.append({
+                'from': round(self.gamma ** (first - 1), 2),
+                'to': round(self.gamma ** last, 2),
+                'count': sum(self.buckets.get(index, 0) for index in range(first, last + 1)),
+            })
+        if self.zero_count:
+            result.insert(0, {'from': 0, 'to': 0, 'count': self.zero_count})
+        return result
+
+    def row_fields(self):
+        return {
+            'count': self.count, 'zero_count': self.zero_count, 'total': self.total,
+            'buckets': {str(index): count for index, count in sorted(self.buckets.items())},
+        }
+
+
+def periods_for(day):
+    return [(DAY, day), (MONTH, day.replace(day=1))]
+
+
+def add_value(day, value):
+    with transaction.atomic(using=store_db()):
+        for period, start in periods_for(day):
+            row, _ = OrderValueSketch.objects.select_for_update().get_or_create(period=period, start=start)
+            sketch = ValueSketch.from_row(row)
+            sketch.add(value)
+            for field, field_value in sketch.row_fields().items():
+                setattr(row, field, field_value)
+            row.save()
+
+
+def sketched(queryset):
+    """The orders sketches count, for both the incremental path and the rebuild.
+
+    An order inserted as Paid before its items has no value to record yet.
+    """
+    return queryset.filter(payment_status='Paid', timestamp__isnull=False, item_count__gt=0)
+
+
+def record_paid_value(order_number):
+    order = sketched(Order.objects.filter(pk=order_number)).values('timestamp', 'items_total').first()
+    if order is None:
+        return
+    add_value(timezone.localtime(order['timestamp']).date(), order['items_total'])
+
+
+def schedule_paid_value(order, created=False):
+    if order.became_paid(created):
+        transaction.on_commit(lambda: record_paid_value(order.order_number), using=store_db())
+
+
+def range_rows(first, last):
+    """Sketch rows covering [first, last]: whole months as month rows, the ragged edges as day rows."""
+    rows = []
+    day = first
+    while day <= last:
+        month_end = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        if day.day == 1 and month_end <= last:
+            rows.append((MONTH, day))
+            day = month_end + timedelta(days=1)
+        else:
+            edge = min(month_end, last)
+            rows.extend((DAY, day + timedelta(days=offset)) for offset in range((edge - day).days + 1))
+            day = edge + timedelta(days=1)
+    return rows
+
+
+def merged_sketch(first=None, last=None):
+    """One sketch for the date range; at most ~62 day rows plus one row per month are read."""
+    sketch = ValueSketch()
+    if first is None and last is not None:
+        first = OrderValueSketch.objects.filter(period=MONTH).order_by('start').values_list('start', flat=True).first()
+        if first is None:
+            return sketch
+    if first is None:
+        queryset = OrderValueSketch.objects.filter(period=MONTH)
+    else:
+        wanted = range_rows(first, last or timezone.localdate())
+        months = [start for period, start in wanted if period == MONTH]
+        days = [start for period, start in wanted if period == DAY]
+        queryset = OrderValueSketch.objects.filter(
+            Q(period=MONTH, start__in=months) | Q(period=DAY, start__in=days)
+        )
+    for row in queryset:
+        sketch.merge(ValueSketch.from_row(row))
+    return sketch
+
@@ -0,0 +1,86 @@
+# dashboard/status_events.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .affinity import queue_paid_order
+from .coalescing import orders_changed
+from .customers import schedule_refresh
+from .models import Order, OrderStatusEvent
+from .realtime import statuses_bulk_updated
+from .sketches import record_paid_value
+from .stores import store_db
+
+STATUS_FIELDS = ('payment_status', 'order_status')
+
+_source = ContextVar('order_status_source', default='api')
+
+
+@contextmanager
+def event_source(name):
+    """Tag status events written inside the block (e.g. 'webhook', 'reconcile')."""
+    token = _source.set(name)
+    try:
+        yield
+    finally:
+        _source.reset(token)
+
+
+def transition_events(order_number, old, new, source=None):
+    """Unsaved events for every status field that differs between the `old` and `new` dicts."""
+    return [
+        OrderStatusEvent(
+            order_number=order_number, field=field,
+            old_value=old.get(field), new_value=new[field],
+            source=source or _source.get(),
+        )
+        for field in STATUS_FIELDS
+        if field in new and old.get(field) != new[field]
+    ]
+
+
+def record_save(order, created):
+    old = {} if created else getattr(order, '_loaded_statuses', None)
+    if old is None:
+        # Loaded without statuses (e.g. .only()); nothing reliable to diff against.
+        return
+    events = transition_events(order.order_number, old, {
+        'payment_status': order.payment_status, 'order_status': order.order_status,
+    })
+    if events:
+        OrderStatusEvent.objects.bulk_create(events)
+
+
+def bulk_update_statuses(order_numbers, changes, source='bulk'):
+    """Set-based status update for many orders with one batched event insert.
+
+    Returns the {order_number: old statuses} that actually changed.
+    """
+    with transaction.atomic(using=store_db()):
+        current = {
+            row['order_number']: row for row in
+            Order.objects.select_for_update()
+            .filter(order_number__in=order_numbers)
+            .values('order_number', 'user_id', 'items_total', *STATUS_FIELDS)
+        }
+        events = []
+        changed = {}
+        for order_number, old in current.items():
+            order_events = transition_events(order_number, old, changes, source)
+            if order_events:
+                events.extend(order_events)
+                changed[order_number] = old
+        if changed:
+            Order.objects.filter(order_number__in=list(changed)).update(**changes)
+            OrderStatusEvent.objects.bulk_create(events, batch_size=500)
+            statuses_bulk_updated(changed, changes)
+            orders_changed()
+
+        # queryset.update() sends no signals, so refresh the derived tables here.
+        for order_number, old in changed.items():
+            schedule_refresh(old['user_id'])
+            if changes.get('payment_status') == 'Paid' and old['payment_status'] != 'Paid':
+                queue_paid_order(order_number)
+                transaction.on_commit(lambda number=order_number: record_paid_value(number), using=store_db())
+    return changed
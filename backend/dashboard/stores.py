@@ -0,0 +1,111 @@
+# dashboard/stores.py
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+
+# Apps whose tables live in each store's database; users and auth stay shared on 'default'.
+STORE_APPS = {'dashboard'}
+
+_store = ContextVar('store', default=None)
+
+
+def current_store():
+    # Outside a request (management commands, workers) DJANGO_STORE picks the store.
+    return _store.get() or settings.DEFAULT_STORE
+
+
+def store_db():
+    return settings.STORES[current_store()]['database']
+
+
+def store_connection():
+    return connections[store_db()]
+
+
+def media_prefix():
+    """Upload path prefix keeping stores' media files apart; empty for the default store."""
+    store = current_store()
+    return '' if store == 'default' else f'stores/{store}/'
+
+
+@contextmanager
+def use_store(name):
+    token = _store.set(name)
+    try:
+        yield
+    finally:
+        _store.reset(token)
+
+
+def store_for_request(request):
+    """Store named by the X-Store header, else matched by host, else the default; None if unknown."""
+    name = request.headers.get(settings.STORE_HEADER)
+    if name:
+        return name if name in settings.STORES else None
+    host = request.get_host().split(':')[0].lower()
+    for name, config in settings.STORES.items():
+        if host in config.get('hosts', ()):
+            return name
+    return settings.DEFAULT_STORE
+
+
+def user_stores(user):
+    """Names of the stores `user` may work in."""
+    if user.is_superuser:
+        return list(settings.STORES)
+    return [name for name in (getattr(user, 'stores', None) or [settings.DEFAULT_STORE]) if name in settings.STORES]
+
+
+def can_use_store(user, store=None):
+    return (store or current_store()) in user_stores(user)
+
+
+@sync_and_async_middleware
+def store_middleware(get_response):
+    def unknown():
+        return JsonResponse({"error": "Unknown store"}, status=404)
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            store = store_for_request(request)
+            if store is None:
+                return unknown()
+            with use_store(store):
+                return await get_response(request)
+    else:
+        def middleware(request):
+            store = store_for_request(request)
+            if store is None:
+                return unknown()
+            with use_store(store):
+                return get_response(request)
+    return middleware
+
+
+class StoreRouter:
+    """Sends store-owned models to the current store's database."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in STORE_APPS:
+            return store_db()
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if app_label in STORE_APPS:
+            return db in {config['database'] for config in settings.STORES.values()}
+        return db == 'default'
+
+
+def make_cache_key(key, key_prefix, version):
+    # Namespaces every cache entry (versions, throttles, coalesced results) by store.
+    return f'{current_store()}:{key_prefix}:{version}:{key}'
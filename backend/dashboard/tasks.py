@@ -0,0 +1,35 @@
+# dashboard/tasks.py
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+
+from .affinity import record_paid_order
+from .customers import refresh_customer
+from .jobs import task
+from .order_totals import refresh_order_totals
+
+
+@task('orders.refresh_totals')
+def refresh_totals(order_number):
+    refresh_order_totals(order_number)
+
+
+@task('customers.refresh')
+def refresh_customer_stats(user_id):
+    refresh_customer(user_id)
+
+
+@task('affinity.record_paid_order')
+def paid_order(order_number):
+    record_paid_order(order_number)
+
+
+@task('management.command')
+def management_command(name, args=(), options=None):
+    """Run a batch command (e.g. build_order_cube) off the request path; returns the tail of its output."""
+    if name not in settings.JOBS_COMMANDS:
+        raise ValueError(f"Command {name!r} is not allowed as a job")
+    output = StringIO()
+    call_command(name, *args, stdout=output, **(options or {}))
+    return output.getvalue()[-2000:]
@@ -0,0 +1,18 @@
+# dashboard/testing.py
+from django.apps import apps
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class DashboardTestRunner(DiscoverRunner):
+    """Builds the test database straight from the models.
+
+    The repo ships no migrations, and the storefront bot owns the unmanaged tables
+    (orders, order_items, ...), so both are created from the model definitions here.
+    """
+
+    def setup_databases(self, **kwargs):
+        for model in apps.get_models():
+            model._meta.managed = True
+        settings.MIGRATION_MODULES = {config.label: None for config in apps.get_app_configs()}
+        return super().setup_databases(**kwargs)
@@ -1,3 +1,782 @@
-from django.test import TestCase
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import affinity, catalog, refcache, search
+from .affinity import record_paid_order
+from .breakdown import MEASURES, breakdown, live_rows
+from .jobs import claim, enqueue, enqueue_scheduled, requeue_stale, run, task
+from .management.commands.run_workers import work
+from .models import (
+    Category, CustomerStats, FulfilmentWeek, Job, Order, OrderAddress, OrderItem, OrderStatusEvent, Product, ProductOrderCount, ProductPairCount,
+    OrderValueSketch, ProductRatingSummary, Review, StoreInfo, SyncState,
+)
+from .order_totals import install_order_totals
+from .ratings import install_rating_triggers, trigger_sql
+from .sketches import DAY, MONTH, ValueSketch, add_value, merged_sketch, range_rows, record_paid_value
+from .stores import (
+    StoreRouter, current_store, make_cache_key, store_for_request, store_middleware, use_store, user_stores,
+)
+from .throttling import AdmissionControlMixin, TokenBucketThrottle
+from .versions import bump_version, get_version
+
+
+def make_order(number, **fields):
+    return Order.objects.create(order_number=number, username='alice', invoice_id=f'INV-{number}', **fields)
+
+
+def totals(number):
+    return Order.objects.filter(pk=number).values_list('items_total', 'item_count', 'grand_total').get()
+
+
+class OrderTotalsTests(TestCase):
+    def setUp(self):
+        StoreInfo.objects.create(delivery_fee=Decimal('3.50'))
+        self.product = Product.objects.create(product_name='Tea', price=Decimal('5.00'))
+
+    def add_item(self, order, quantity, amount):
+        return OrderItem.objects.create(order_number=order, product=self.product, quantity=quantity, amount=amount)
+
+    def test_item_writes_maintain_totals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = make_order('A1')
+            self.add_item(order, 2, Decimal('10.00'))
+            item = self.add_item(order, 1, Decimal('5.00'))
+        self.assertEqual(totals('A1'), (Decimal('15.00'), 3, Decimal('18.50')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(totals('A1'), (Decimal('10.00'), 2, Decimal('13.50')))
+
+    def test_item_writes_refresh_the_customer_without_reading_the_order_per_item(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = make_order('A1', user_id=7, payment_status='Paid')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.add_item(order, 2, Decimal('10.00'))
+        self.assertEqual(len(callbacks), 2)  # totals (with the customer) and the orders version
+        self.assertEqual(CustomerStats.objects.get(user_id=7).paid_revenue, Decimal('10.00'))
+
+    def test_fee_is_kept_when_store_fee_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = make_order('A1')
+            self.add_item(order, 1, Decimal('10.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreInfo.objects.update(delivery_fee=Decimal('9.00'))
+            self.add_item(order, 1, Decimal('2.00'))
+        self.assertEqual(totals('A1'), (Decimal('12.00'), 2, Decimal('15.50')))
+
+    def test_status_change_sums_items_written_without_signals(self):
+        order = make_order('A1', payment_status='Pending')
+        # The storefront bot writes items straight to the table.
+        OrderItem.objects.bulk_create([OrderItem(order_number=order, product=self.product, quantity=4, amount=Decimal('20.00'))])
+        self.assertEqual(totals('A1'), (Decimal('0'), 0, Decimal('0')))
+
+        order = Order.objects.get(pk='A1')
+        order.payment_status = 'Paid'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save(update_fields=['payment_status'])
+        self.assertEqual(totals('A1'), (Decimal('20.00'), 4, Decimal('23.50')))
+
+    def test_install_fills_orders_never_computed(self):
+        order = make_order('A1')
+        make_order('A2')
+        OrderItem.objects.bulk_create([
+            OrderItem(order_number=order, product=self.product, quantity=1, amount=Decimal('7.00')),
+            OrderItem(order_number=order, product=self.product, quantity=2, amount=Decimal('8.00')),
+        ])
+        self.assertEqual(install_order_totals('default'), 1)
+        self.assertEqual(totals('A1'), (Decimal('15.00'), 3, Decimal('18.50')))
+        self.assertEqual(totals('A2'), (Decimal('0'), 0, Decimal('0')))
+        self.assertEqual(install_order_totals('default'), 0)
+
+
+class OrderTotalsRepairTests(TransactionTestCase):
+    # check_order_totals compares batches in worker threads, which need committed rows.
+
+    def test_repair_fixes_drift(self):
+        product = Product.objects.create(product_name='Tea', price=Decimal('5.00'))
+        order = make_order('A1')
+        OrderItem.objects.create(order_number=order, product=product, quantity=2, amount=Decimal('10.00'))
+        make_order('A2')
+        Order.objects.filter(pk='A1').update(items_total=Decimal('99.00'), item_count=9, grand_total=Decimal('101.00'))
+        Order.objects.filter(pk='A2').update(items_total=Decimal('5.00'), item_count=1, grand_total=Decimal('5.00'))
+
+        call_command('check_order_totals', workers=1, stdout=StringIO())
+        self.assertEqual(totals('A1'), (Decimal('99.00'), 9, Decimal('101.00')))
+
+        call_command('check_order_totals', repair=True, workers=1, stdout=StringIO())
+        # The charged fee (grand_total - items_total) is kept; an order with no items totals zero.
+        self.assertEqual(totals('A1'), (Decimal('10.00'), 2, Decimal('12.00')))
+        self.assertEqual(totals('A2'), (Decimal('0'), 0, Decimal('0')))
+
+
+calls = []
+
+
+@task('tests.record')
+def record_call(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError('boom')
+    return {'value': value}
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_takes_ready_jobs_by_priority(self):
+        enqueue('tests.record', {'value': 'later'}, delay=timedelta(hours=1))
+        low = enqueue('tests.record', {'value': 'low'})
+        high = enqueue('tests.record', {'value': 'high'}, priority=5)
+
+        job = claim('w1')
+        self.assertEqual(job.id, high.id)
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'w1', 1))
+        self.assertEqual(claim('w2').id, low.id)
+        self.assertIsNone(claim('w3'))
+
+    def test_run_records_result_and_releases_lease(self):
+        enqueue('tests.record', {'value': 1})
+        job = run(claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.locked_by, job.locked_at), (Job.SUCCEEDED, {'value': 1}, None, None))
+
+    @override_settings(JOBS_BACKOFF_SECONDS=10, JOBS_BACKOFF_MAX_SECONDS=3600)
+    def test_failures_back_off_then_fail(self):
+        enqueue('tests.record', {'value': 1, 'fail': True}, max_attempts=2)
+        before = timezone.now()
+        job = run(claim('w1'))
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('boom', job.last_error)
+        # First retry waits the base delay, +/-20% jitter.
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=8))
+        self.assertIsNone(claim('w1'))
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        job = run(claim('w1'))
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(calls, [1, 1])
+
+    @override_settings(JOBS_LEASE_SECONDS=60)
+    def test_requeue_stale_recovers_expired_leases_only(self):
+        for value in ('dead', 'exhausted', 'alive'):
+            enqueue('tests.record', {'value': value}, max_attempts=1 if value == 'exhausted' else 3)
+        dead, exhausted, alive = (claim('w1') for _ in range(3))
+        expired = timezone.now() - timedelta(seconds=61)
+        Job.objects.filter(id__in=[dead.id, exhausted.id]).update(locked_at=expired)
+
+        self.assertEqual(requeue_stale(), 1)
+        statuses = dict(Job.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[dead.id], Job.QUEUED)
+        self.assertEqual(statuses[exhausted.id], Job.FAILED)
+        self.assertEqual(statuses[alive.id], Job.RUNNING)
+
+    @override_settings(JOBS_SCHEDULE={'rebuild_customer_stats': 3600})
+    def test_scheduled_commands_are_queued_once_per_interval(self):
+        [job] = enqueue_scheduled()
+        self.assertEqual((job.task, job.payload), ('management.command', {'name': 'rebuild_customer_stats'}))
+        self.assertEqual(enqueue_scheduled(), [])
+
+        SyncState.set_value('jobs.schedule.rebuild_customer_stats', time.time() - 3601)
+        self.assertEqual(len(enqueue_scheduled()), 1)
+        self.assertEqual(Job.objects.count(), 2)
+
+
+    def test_only_staff_can_use_the_jobs_api(self):
+        make = get_user_model().objects.create_user
+        member = make('member', 'pw', email='member@example.com', first_name='A', last_name='B')
+        staff = make('staff', 'pw', email='staff@example.com', first_name='A', last_name='B', is_staff=True)
+        job = {'task': 'management.command', 'payload': {'name': 'build_order_cube'}}
+
+        self.client.force_login(member)
+        self.assertEqual(self.client.post('/api/jobs/', job, content_type='application/json').status_code, 403)
+        self.assertEqual(self.client.get('/api/jobs/').status_code, 403)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.post('/api/jobs/', job, content_type='application/json').status_code, 201)
+        self.assertEqual(len(self.client.get('/api/jobs/').json()), 1)
+
+
+class JobWorkerTests(TransactionTestCase):
+    # work() closes its database connections on exit.
+
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(JOBS_LEASE_SECONDS=60, JOBS_SCHEDULE={})
+    def test_worker_loop_requeues_and_runs_orphaned_jobs(self):
+        enqueue('tests.record', {'value': 'orphan'})
+        orphan = claim('dead-worker')
+        Job.objects.filter(id=orphan.id).update(locked_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertEqual(work('/t0', poll=0, burst=True, stop=threading.Event()), 1)
+        orphan.refresh_from_db()
+        self.assertEqual((orphan.status, orphan.attempts), (Job.SUCCEEDED, 2))
+        self.assertEqual(calls, ['orphan'])
+
+
+@override_settings(
+    THROTTLE_BUCKETS={
+        'read': {'capacity': 3, 'refill': 1.0},
+        'write': {'capacity': 2, 'refill': 1.0},
+        'analytics': {'capacity': 8, 'refill': 2.0},
+    },
+    THROTTLE_FULL_HISTORY_COST=4,
+)
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        patcher = mock.patch('dashboard.throttling.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method='get', path='/api/x/', user_id=1):
+        request = Request(getattr(APIRequestFactory(), method)(path))
+        request.user = SimpleNamespace(pk=user_id, is_authenticated=True)
+        return request
+
+    def allow(self, request, view=None):
+        throttle = TokenBucketThrottle()
+        return throttle.allow_request(request, view or SimpleNamespace()), throttle.wait()
+
+    def test_capacity_then_refill(self):
+        self.assertEqual([self.allow(self.request())[0] for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(self.allow(self.request())[1], 1.0)
+        self.now += 1
+        self.assertEqual(self.allow(self.request()), (True, None))
+        self.assertFalse(self.allow(self.request())[0])
+
+    def test_buckets_are_per_scope_and_user(self):
+        for _ in range(3):
+            self.allow(self.request())
+        self.assertFalse(self.allow(self.request())[0])
+        # Writes and other users have their own budget.
+        self.assertTrue(self.allow(self.request('post'))[0])
+        self.assertTrue(self.allow(self.request(user_id=2))[0])
+
+    def test_full_history_analytics_costs_more(self):
+        view = AdmissionControlMixin()
+        full = self.request(path='/api/analytics/revenue/')
+        windowed = self.request(path='/api/analytics/revenue/?days=30')
+        self.assertEqual(view.get_throttle_cost(full), 4)
+        self.assertEqual(view.get_throttle_cost(windowed), 1)
+
+        self.assertTrue(self.allow(full, view)[0])
+        self.assertTrue(self.allow(full, view)[0])
+        allowed, wait = self.allow(full, view)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 2.0)  # 4 tokens short at 2 tokens/second
+        self.now += 0.5
+        self.assertTrue(self.allow(windowed, view)[0])
+
+
+class MockBTCPay:
+    """Greenfield invoice listing served from a local HTTP server, recording each request."""
+
+    def __init__(self, invoices):
+        self.invoices = invoices
+        self.requests = []
+        mock_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {name: values[0] for name, values in parse_qs(url.query).items()}
+                mock_server.requests.append((url.path, params, self.headers.get('Authorization')))
+                skip, take = int(params['skip']), int(params['take'])
+                body = json.dumps(mock_server.invoices[skip:skip + take]).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(BTCPAY_API_KEY='test-key', BTCPAY_STORE_ID='store1', BTCPAY_RECONCILE_OVERLAP_HOURS=48)
+class ReconcileBTCPayTests(TestCase):
+    def setUp(self):
+        statuses = {
+            'settled': ('Pending', 'Pending'),
+            'expired': ('Pending', 'Pending'),
+            'paid-but-expired': ('Paid', 'Processing'),
+            'settled-shipped': ('Pending', 'Shipped'),
+            'still-new': ('Pending', 'Pending'),
+        }
+        for number, (payment_status, order_status) in statuses.items():
+            Order.objects.create(
+                order_number=number, username='alice', invoice_id=f'INV-{number}',
+                payment_status=payment_status, order_status=order_status,
+            )
+        self.btcpay = MockBTCPay([
+            {'id': 'INV-settled', 'status': 'Settled'},
+            {'id': 'INV-expired', 'status': 'Expired'},
+            {'id': 'INV-paid-but-expired', 'status': 'Expired'},
+            {'id': 'INV-settled-shipped', 'status': 'Settled'},
+            {'id': 'INV-still-new', 'status': 'New'},
+            {'id': 'INV-unknown', 'status': 'Settled'},
+        ])
+        self.addCleanup(self.btcpay.close)
+
+    def reconcile(self, **options):
+        out = StringIO()
+        call_command('reconcile_btcpay', base_url=self.btcpay.url, page_size=2, concurrency=2, stdout=out, **options)
+        return out.getvalue()
+
+    def statuses(self):
+        return {
+            number: (payment_status, order_status) for number, payment_status, order_status in
+            Order.objects.values_list('order_number', 'payment_status', 'order_status')
+        }
+
+    def test_corrects_lagging_orders_only(self):
+        output = self.reconcile()
+        self.assertIn('corrected 3 orders', output)
+        self.assertEqual(self.statuses(), {
+            'settled': ('Paid', 'Processing'),
+            'expired': ('Failed', 'Cancelled'),
+            # A paid order is never failed, and fulfilment progress is never rolled back.
+            'paid-but-expired': ('Paid', 'Processing'),
+            'settled-shipped': ('Paid', 'Shipped'),
+            'still-new': ('Pending', 'Pending'),
+        })
+        self.assertTrue(OrderStatusEvent.objects.filter(order_number='settled', source='reconcile').exists())
+
+    def test_pages_through_every_invoice(self):
+        self.reconcile()
+        skips = sorted(int(params['skip']) for _, params, _ in self.btcpay.requests)
+        # Six invoices in pages of two; the short (empty) page ends the scan.
+        self.assertEqual(skips[:4], [0, 2, 4, 6])
+        path, params, auth = self.btcpay.requests[0]
+        self.assertEqual(path, '/api/v1/stores/store1/invoices')
+        self.assertEqual(auth, 'token test-key')
+        self.assertNotIn('startDate', params)
+
+    def test_dry_run_changes_nothing(self):
+        before = self.statuses()
+        self.assertIn('would correct 3 orders', self.reconcile(dry_run=True))
+        self.assertEqual(self.statuses(), before)
+        self.assertIsNone(SyncState.get_value('btcpay.reconciled_through'))
+
+    def test_incremental_run_rechecks_overlap_behind_watermark(self):
+        self.reconcile()
+        watermark = int(SyncState.get_value('btcpay.reconciled_through'))
+        self.btcpay.requests.clear()
+        self.assertIn('corrected 0 orders', self.reconcile())
+        starts = {int(params['startDate']) for _, params, _ in self.btcpay.requests}
+        self.assertEqual(starts, {watermark - 48 * 3600})
+
+
+@override_settings(ORDER_VALUE_SKETCH_ACCURACY=0.01)
+class ValueSketchTests(TestCase):
+    QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+
+    def values(self, n, seed):
+        rng = random.Random(seed)
+        return [Decimal(str(round(rng.lognormvariate(3.5, 1.2), 2))) + Decimal('0.01') for _ in range(n)]
+
+    def exact(self, values, q):
+        ordered = sorted(values)
+        return float(ordered[int(q * (len(ordered) - 1))])
+
+    def test_quantiles_within_relative_error(self):
+        values = self.values(5000, seed=1)
+        sketch = ValueSketch()
+        for value in values:
+            sketch.add(value)
+        self.assertEqual(sketch.count, 5000)
+        self.assertEqual(sketch.total, sum(values))
+        for q in self.QUANTILES:
+            expected = self.exact(values, q)
+            self.assertLessEqual(abs(sketch.quantile(q) - expected) / expected, 0.01 + 1e-9, q)
+
+    def test_merge_matches_one_sketch_over_all_values(self):
+        first, second = self.values(2000, seed=2), self.values(3000, seed=3)
+        whole, left, right = ValueSketch(), ValueSketch(), ValueSketch()
+        for value in first + second:
+            whole.add(value)
+        for value in first:
+            left.add(value)
+        for value in second:
+            right.add(value)
+        merged = left.merge(right)
+        self.assertEqual(merged.buckets, whole.buckets)
+        self.assertEqual((merged.count, merged.total), (whole.count, whole.total))
+        for q in self.QUANTILES:
+            expected = self.exact(first + second, q)
+            self.assertLessEqual(abs(merged.quantile(q) - expected) / expected, 0.01 + 1e-9, q)
+
+    def test_zero_values_and_empty_sketch(self):
+        sketch = ValueSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        for value in (0, 0, 0, 10):
+            sketch.add(value)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertAlmostEqual(sketch.quantile(1.0), 10, delta=0.1)
+
+    def test_range_uses_month_rows_for_whole_months(self):
+        rows = range_rows(date(2025, 1, 30), date(2025, 3, 2))
+        self.assertEqual(rows, [
+            (DAY, date(2025, 1, 30)), (DAY, date(2025, 1, 31)),
+            (MONTH, date(2025, 2, 1)),
+            (DAY, date(2025, 3, 1)), (DAY, date(2025, 3, 2)),
+        ])
+
+    def test_stored_sketches_merge_across_day_and_month_rows(self):
+        values = self.values(300, seed=4)
+        days = [date(2025, 1, 20) + timedelta(days=n % 60) for n in range(len(values))]
+        for day, value in zip(days, values):
+            add_value(day, value)
+
+        first, last = date(2025, 1, 25), date(2025, 3, 5)
+        wanted = [value for day, value in zip(days, values) if first <= day <= last]
+        sketch = merged_sketch(first, last)
+        self.assertEqual(sketch.count, len(wanted))
+        self.assertEqual(sketch.total, sum(wanted))
+        for q in self.QUANTILES:
+            expected = self.exact(wanted, q)
+            self.assertLessEqual(abs(sketch.quantile(q) - expected) / expected, 0.01 + 1e-9, q)
+
+    def test_rebuild_matches_incremental_recording(self):
+        product = Product.objects.create(product_name='Tea', price=Decimal('5.00'))
+        paid_at = timezone.now() - timedelta(days=3)
+        for number, amounts in (('V1', ['12.00']), ('V2', ['3.50', '4.00']), ('V3', [])):
+            # V3 was inserted as Paid before its items arrived.
+            order = make_order(number, payment_status='Paid', timestamp=paid_at)
+            OrderItem.objects.bulk_create([
+                OrderItem(order_number=order, product=product, quantity=1, amount=Decimal(amount)) for amount in amounts
+            ])
+        install_order_totals('default')
+        OrderValueSketch.objects.all().delete()
+        for number in ('V1', 'V2', 'V3'):
+            record_paid_value(number)
+
+        def stored():
+            return sorted(OrderValueSketch.objects.values_list('period', 'start', 'count', 'zero_count', 'total', 'buckets'))
+
+        incremental = stored()
+        call_command('build_order_value_sketches', stdout=StringIO())
+        self.assertEqual(stored(), incremental)
+        self.assertEqual(incremental[0][2:4], (2, 0))
+
+
+STORES = {
+    'default': {'database': 'default', 'hosts': []},
+    'shop2': {'database': 'default', 'hosts': ['shop2.example.com']},
+}
+
+
+@override_settings(STORES=STORES, DEFAULT_STORE='default', ALLOWED_HOSTS=['*'])
+class StoreRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_store_for_request(self):
+        self.assertEqual(store_for_request(self.factory.get('/', HTTP_X_STORE='shop2')), 'shop2')
+        self.assertIsNone(store_for_request(self.factory.get('/', HTTP_X_STORE='nope')))
+        self.assertEqual(store_for_request(self.factory.get('/', HTTP_HOST='Shop2.example.com:8000')), 'shop2')
+        self.assertEqual(store_for_request(self.factory.get('/', HTTP_HOST='other.example.com')), 'default')
+
+    def test_middleware_scopes_the_request(self):
+        seen = []
+        middleware = store_middleware(lambda request: seen.append(current_store()) or HttpResponse())
+        self.assertEqual(middleware(self.factory.get('/', HTTP_X_STORE='nope')).status_code, 404)
+        middleware(self.factory.get('/', HTTP_X_STORE='shop2'))
+        self.assertEqual(seen, ['shop2'])
+        self.assertEqual(current_store(), 'default')
+
+    @override_settings(STORES={**STORES, 'shop2': {'database': 'shop2_db', 'hosts': []}})
+    def test_router_and_cache_keys_follow_the_store(self):
+        router = StoreRouter()
+        with use_store('shop2'):
+            self.assertEqual(router.db_for_read(Order), 'shop2_db')
+            self.assertIsNone(router.db_for_write(get_user_model()))
+            self.assertEqual(make_cache_key('k', '', 1), 'shop2::1:k')
+        self.assertEqual(router.db_for_read(Order), 'default')
+        self.assertEqual(make_cache_key('k', '', 1), 'default::1:k')
+
+
+@override_settings(STORES=STORES, DEFAULT_STORE='default')
+class StoreAccessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('coalescing-metrics')
+
+    def make_user(self, username, **fields):
+        return get_user_model().objects.create_user(
+            username, 'pw', email=f'{username}@example.com', first_name='A', last_name='B', **fields,
+        )
+
+    def get(self, user, store=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+        if store:
+            headers['HTTP_X_STORE'] = store
+        return self.client.get(self.url, **headers)
+
+    def test_user_without_stores_keeps_the_default_store(self):
+        user = self.make_user('plain')
+        self.assertEqual(self.get(user).status_code, 200)
+        self.assertEqual(self.get(user, 'shop2').status_code, 403)
+
+    def test_listed_stores_only(self):
+        user = self.make_user('shop2staff', stores=['shop2'])
+        self.assertEqual(self.get(user, 'shop2').status_code, 200)
+        self.assertEqual(self.get(user).status_code, 403)
+        self.assertEqual(user_stores(user), ['shop2'])
+
+    def test_session_users_are_checked_too(self):
+        user = self.make_user('session')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_X_STORE='shop2').status_code, 403)
+
+    def test_superusers_use_every_store(self):
+        user = self.make_user('root', is_superuser=True, is_staff=True)
+        self.assertEqual(self.get(user, 'shop2').status_code, 200)
+        self.assertEqual(user_stores(user), ['default', 'shop2'])
+
+
+class DatabaseVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        refcache._tables.clear()
+        # on_commit never fires inside TestCase, so later tests must not see these copies.
+        self.addCleanup(refcache._tables.clear)
+
+    @override_settings(VERSIONS_IN_DATABASE=True)
+    def test_refcache_sees_bumps_from_other_workers(self):
+        self.assertEqual(refcache.rows(StoreInfo), [])
+        StoreInfo.objects.bulk_create([StoreInfo(currency='USD')])
+        self.assertEqual(refcache.rows(StoreInfo), [])
+        # Another worker's bump reaches this one through the store database, not its own cache.
+        version = bump_version('refcache:dashboard.storeinfo')
+        cache.clear()
+        self.assertEqual(get_version('refcache:dashboard.storeinfo'), version)
+        self.assertEqual([row.currency for row in refcache.rows(StoreInfo)], ['USD'])
+
+
+class AffinityTests(TestCase):
+    def setUp(self):
+        self.tea = Product.objects.create(product_name='Tea', price=Decimal('5.00'))
+        self.cup = Product.objects.create(product_name='Cup', price=Decimal('8.00'))
+
+    def paid_order(self, number):
+        order = make_order(number)
+        for product in (self.tea, self.cup):
+            OrderItem.objects.create(order_number=order, product=product, quantity=1, amount=product.price)
+        order.payment_status = 'Paid'
+        order.save()
+        return order
+
+    def test_settlement_queues_a_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paid_order('P1')
+        job = Job.objects.get(task='affinity.record_paid_order')
+        self.assertEqual(job.payload, {'order_number': 'P1'})
+        self.assertFalse(ProductPairCount.objects.exists())
+
+    def test_record_paid_order_counts_incrementally(self):
+        self.paid_order('P1')
+        record_paid_order('P1')
+        self.paid_order('P2')
+        record_paid_order('P2')
+        self.assertEqual(SyncState.get_value(affinity.BASKETS), '2')
+        self.assertEqual(ProductOrderCount.objects.get(product_id=self.tea.pk).orders, 2)
+        self.assertEqual(
+            ProductPairCount.objects.get(product_id=self.tea.pk, other_product_id=self.cup.pk).orders, 2,
+        )
+        with mock.patch('dashboard.affinity.paid_order_count') as counted:
+            record_paid_order('P2')
+        counted.assert_not_called()
+        self.assertEqual(SyncState.get_value(affinity.BASKETS), '3')
+
+    def test_increment_survives_a_lost_insert_race(self):
+        lookup = {'product_id': self.tea.pk, 'other_product_id': self.cup.pk}
+        ProductPairCount.objects.create(orders=1, **lookup)
+        real_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            calls.append(kwargs)
+            # The first UPDATE runs before another settlement's INSERT commits.
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update):
+            with transaction.atomic():
+                affinity.increment(ProductPairCount, lookup)
+        self.assertEqual(ProductPairCount.objects.get(**lookup).orders, 2)
+
+
+class RegionAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            'analyst', 'pw', email='analyst@example.com', first_name='A', last_name='B',
+        )
+        self.client.force_login(user)
+
+    def test_groups_on_the_parsed_address(self):
+        for number, country, city, total in (
+            ('R1', 'BD', 'Dhaka', '10.00'), ('R2', 'BD', 'Dhaka', '5.00'), ('R3', 'BD', 'Sylhet', '4.00'),
+        ):
+            make_order(number, payment_status='Paid', timestamp=timezone.now())
+            Order.objects.filter(pk=number).update(items_total=Decimal(total))
+            OrderAddress.objects.update_or_create(order_number=number, defaults={'country': country, 'city': city})
+        make_order('R4', payment_status='Paid', timestamp=timezone.now())
+        OrderAddress.objects.filter(pk='R4').delete()
+
+        response = self.client.get(reverse('region-analytics'), {'level': 'city', 'country': 'BD'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(cell['city'], cell['orders'], cell['revenue']) for cell in response.json()['cells']],
+            [('Dhaka', 2, 15.0), ('Sylhet', 1, 4.0)],
+        )
+        response = self.client.get(reverse('region-analytics'))
+        self.assertEqual({cell['country']: cell['orders'] for cell in response.json()['cells']}, {'BD': 3, '': 1})
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(product_name='Tea', price=Decimal('5.00'))
+
+    def review(self, user_id, rating):
+        return Review(user_id=user_id, username='u', product_id=self.product.pk, order_number='O1', rating=rating)
+
+    def summary(self):
+        return ProductRatingSummary.objects.filter(product_id=self.product.pk).values_list('count', 'total').first()
+
+    def test_signal_path_adds_and_removes(self):
+        first = self.review(1, 4)
+        first.save()
+        self.review(2, 2).save()
+        self.assertEqual(self.summary(), (2, 6))
+        first.rating = 5
+        first.save()
+        self.assertEqual(self.summary(), (2, 7))
+        first.delete()
+        self.assertEqual(self.summary(), (1, 2))
+
+    def test_install_counts_reviews_written_without_signals(self):
+        # Stands in for the bot's direct inserts made before the triggers existed.
+        Review.objects.bulk_create([self.review(1, 5), self.review(2, 3)])
+        self.assertIsNone(self.summary())
+        install_rating_triggers('default')
+        self.assertEqual(self.summary(), (2, 8))
+
+    def test_triggers_cover_every_write(self):
+        triggers = trigger_sql()
+        self.assertEqual(set(triggers), {'review_ratings_insert', 'review_ratings_update', 'review_ratings_delete'})
+        self.assertIn('ON DUPLICATE KEY UPDATE', triggers['review_ratings_insert'])
+        self.assertIn('OLD.rating', triggers['review_ratings_delete'])
+
+
+class CategoryRenameTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search._indexes.clear()
+        self.addCleanup(search._indexes.clear)
+        user = get_user_model().objects.create_user(
+            'editor', 'pw', email='editor@example.com', first_name='A', last_name='B',
+        )
+        self.client.force_login(user)
+
+    def test_rename_reaches_the_search_index_and_catalog(self):
+        category = Category.objects.create(name='Beverages')
+        product = Product.objects.create(
+            product_name='Green', category='Beverages', category_ref=category, price=Decimal('5.00'),
+        )
+        self.assertEqual([hit['product_id'] for hit in search.get_index().search('beverages')], [product.pk])
+        catalog_version = get_version(catalog.VERSION_NAME)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/categories/{category.pk}/', {'name': 'Infusions'}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        index = search.get_index()
+        self.assertEqual([hit['product_id'] for hit in index.search('infusions')], [product.pk])
+        self.assertEqual(index.search('beverages', typo=False), [])
+        self.assertNotEqual(get_version(catalog.VERSION_NAME), catalog_version)
+
+
+class OrderCubeTests(TestCase):
+    def test_order_counts_without_category_come_from_the_cube(self):
+        tea = Product.objects.create(product_name='Tea', category='Drinks', price=Decimal('5.00'))
+        cake = Product.objects.create(product_name='Cake', category='Food', price=Decimal('8.00'))
+        yesterday = timezone.now() - timedelta(days=1)
+        for number, method, products in (('C1', 'BTC', (tea, cake)), ('C2', 'BTC', (tea,)), ('C3', 'LN', (cake,))):
+            order = make_order(number, payment_method=method, timestamp=yesterday)
+            for product in products:
+                OrderItem.objects.create(order_number=order, product=product, quantity=1, amount=product.price)
+        call_command('build_order_cube', stdout=StringIO())
+
+        end = timezone.localdate()
+        for dims in (['payment_method'], [], ['payment_method', 'category']):
+            cube, source = breakdown(dims, list(MEASURES), end=end)
+            self.assertEqual(source, 'cube')
+            live = live_rows(dims, list(MEASURES), end=end)
+            self.assertEqual(
+                {tuple(row[dim] for dim in dims): row['orders'] for row in cube},
+                {key: values['orders'] for key, values in live.items()},
+            )
+        rows, _ = breakdown(['payment_method'], ['orders', 'revenue'], end=end)
+        self.assertEqual(
+            {row['payment_method']: (row['orders'], row['revenue']) for row in rows},
+            {'BTC': (2, 18.0), 'LN': (1, 8.0)},
+        )
+
+
+class FulfilmentMetricsTests(TestCase):
+    def event(self, value, at, field='order_status'):
+        return OrderStatusEvent.objects.create(
+            order_number='F1', field=field, new_value=value, source='api', created_at=at,
+        )
+
+    def weeks(self):
+        return list(FulfilmentWeek.objects.filter(metric='paid_to_shipped').values_list('week', 'count'))
+
+    def test_milestone_moving_to_an_earlier_week_clears_the_old_week(self):
+        monday = timezone.make_aware(datetime(2026, 3, 2, 12))
+        self.event('Paid', monday, field='payment_status')
+        self.event('Shipped', monday + timedelta(days=8))
+        call_command('compute_fulfilment_metrics', stdout=StringIO())
+        self.assertEqual(self.weeks(), [(date(2026, 3, 9), 1)])
+
+        # A late-committed event shows the order actually shipped the same week it was paid.
+        self.event('Shipped', monday + timedelta(days=1))
+        call_command('compute_fulfilment_metrics', stdout=StringIO())
+        self.assertEqual(self.weeks(), [(date(2026, 3, 2), 1)])
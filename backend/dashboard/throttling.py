@@ -0,0 +1,91 @@
+# dashboard/throttling.py
+import math
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Per-user token bucket per scope ('read', 'write', 'analytics'), kept in the shared cache.
+
+    Views may set `throttle_scope` and define `get_throttle_cost(request)`; by default
+    safe methods draw one token from 'read' and everything else from 'write', so
+    writes keep their own budget however hard a client polls the read endpoints.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None) or ('read' if request.method in SAFE_METHODS else 'write')
+        bucket = settings.THROTTLE_BUCKETS.get(scope)
+        if bucket is None:
+            return True
+        cost = view.get_throttle_cost(request) if hasattr(view, 'get_throttle_cost') else 1
+        ident = request.user.pk if request.user and request.user.is_authenticated else self.get_ident(request)
+        key = f'throttle:{scope}:{ident}'
+
+        now = time.time()
+        tokens, updated = cache.get(key, (bucket['capacity'], now))
+        tokens = min(bucket['capacity'], tokens + (now - updated) * bucket['refill'])
+        if tokens < cost:
+            self.retry_after = (cost - tokens) / bucket['refill']
+            return False
+        # Read-modify-write without a lock: concurrent requests can overdraw by a
+        # token or two, which is fine for throttling purposes.
+        cache.set(key, (tokens - cost, now), timeout=math.ceil(bucket['capacity'] / bucket['refill']))
+        return True
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
+
+
+def acquire_slot(pool):
+    """Claim one of the pool's slots, waiting up to its queue time; returns the slot key or None."""
+    config = settings.ADMISSION_POOLS[pool]
+    deadline = time.monotonic() + config['queue_seconds']
+    while True:
+        for slot in range(config['slots']):
+            key = f'admission:{pool}:{slot}'
+            # The lease expires on its own if a worker dies while holding it.
+            if cache.add(key, 1, timeout=config['lease_seconds']):
+                return key
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.05)
+
+
+def release_slot(key):
+    cache.delete(key)
+
+
+@contextmanager
+def admitted(pool):
+    """Run the block in one of the pool's slots, or raise Throttled (429 with Retry-After)."""
+    slot = acquire_slot(pool)
+    if slot is None:
+        raise Throttled(wait=settings.ADMISSION_POOLS[pool]['retry_after'])
+    try:
+        yield
+    finally:
+        release_slot(slot)
+
+
+class AdmissionControlMixin:
+    """Analytics throttle scope plus a cap on concurrent executions across all workers.
+
+    The cap is applied by `dashboard.coalescing.coalesced` around the one request
+    that actually computes, so requests sharing its result hold no slot. Views
+    outside the pool (writes, the webhook) never wait on it, so the workers left
+    over stay available to them.
+    """
+    admission_pool = 'analytics'
+    throttle_scope = 'analytics'
+
+    def get_throttle_cost(self, request):
+        # Bounded windows are cheap; full-history aggregates cost more.
+        bounded = request.query_params.get('days') or request.query_params.get('from')
+        return 1 if bounded else settings.THROTTLE_FULL_HISTORY_COST
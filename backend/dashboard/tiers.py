@@ -0,0 +1,57 @@
+# dashboard/tiers.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+HOT_TIER = (Order, OrderItem)
+ARCHIVE_TIER = (ArchivedOrder, ArchivedOrderItem)
+
+
+def hot_boundary():
+    # Everything newer than this is guaranteed to still be in the hot tier,
+    # because `archive_orders` only moves orders older than the same window.
+    return timezone.now() - timedelta(days=settings.ORDER_HOT_TIER_DAYS)
+
+
+def tiers_for(since=None):
+    """(order model, order item model) pairs that can hold orders placed at or after `since`."""
+    if since is not None and since >= hot_boundary():
+        return [HOT_TIER]
+    return [HOT_TIER, ARCHIVE_TIER]
+
+
+def orders_since(order_model, since=None):
+    queryset = order_model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(timestamp__gte=since)
+    return queryset
+
+
+def items_since(item_model, since=None):
+    queryset = item_model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(order_number__timestamp__gte=since)
+    return queryset
+
+
+def distinct_customers(since=None):
+    # Guest orders (no user_id) are left out, matching the all-time count from customer_stats.
+    querysets = [
+        orders_since(order_model, since).filter(user_id__isnull=False).values('user_id')
+        for order_model, _ in tiers_for(since)
+    ]
+    if len(querysets) == 1:
+        return querysets[0].distinct().count()
+    # UNION (not UNION ALL) de-duplicates customers present in both tiers.
+    return querysets[0].union(*querysets[1:]).count()
+
+
+def merge_by_month(rows, field):
+    """Sum `field` of `{'month': ..., field: ...}` rows coming from several tiers."""
+    merged = {}
+    for row in rows:
+        merged[row['month']] = merged.get(row['month'], 0) + row[field]
+    return [{'month': month, field: merged[month]} for month in sorted(merged)]
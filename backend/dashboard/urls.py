@@ -13,10 +13,27 @@ from .views import (
     ProductAnalyticsView,
     OrderAnalyticsView,
     RevenueAnalyticsView,
-    StoreInfoViewSet  
+    StoreInfoViewSet,
+    CustomerViewSet,
+    CohortAnalyticsView,
+    RFMAnalyticsView,
+    ProductAffinityView,
+    RatingAnalyticsView,
+    FunnelAnalyticsView,
+    BreakdownAnalyticsView,
+    CategoryAnalyticsView,
+    FulfilmentAnalyticsView,
+    CoalescingMetricsView,
+    RegionAnalyticsView,
+    OrderValueAnalyticsView,
+    ForecastAnalyticsView,
+    StoreSummaryView,
+    JobViewSet,
+    dashboard_stream,
+    DashboardStreamTicketView,
+    public_catalog,
+    public_product
 )
-from django.conf import settings
-from django.conf.urls.static import static
 
 router = DefaultRouter()
 router.register('products', ProductViewSet)
@@ -27,11 +44,33 @@ router.register('wishlist', WishlistViewSet)
 router.register('reviews', ReviewViewSet)
 router.register('categories', CategoryViewSet)
 router.register('store-info', StoreInfoViewSet, basename='store-info')
+router.register('customers', CustomerViewSet)
+router.register('jobs', JobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('public/catalog/', public_catalog, name='public-catalog'),
+    path('public/products/', public_catalog, {'document': 'products'}, name='public-products'),
+    path('public/products/<int:product_id>/', public_product, name='public-product'),
+    path('public/categories/', public_catalog, {'document': 'categories'}, name='public-categories'),
+    path('public/store/', public_catalog, {'document': 'store'}, name='public-store'),
     path('dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('stores/summary/', StoreSummaryView.as_view(), name='store-summary'),
+    path('dashboard/stream/', dashboard_stream, name='dashboard-stream'),
+    path('dashboard/stream/ticket/', DashboardStreamTicketView.as_view(), name='dashboard-stream-ticket'),
     path('analytics/products/', ProductAnalyticsView.as_view(), name='product-analytics'),
     path('analytics/orders/', OrderAnalyticsView.as_view(), name='order-analytics'),
     path('analytics/revenue/', RevenueAnalyticsView.as_view(), name='revenue-analytics'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('analytics/cohorts/', CohortAnalyticsView.as_view(), name='cohort-analytics'),
+    path('analytics/rfm/', RFMAnalyticsView.as_view(), name='rfm-analytics'),
+    path('analytics/fulfilment/', FulfilmentAnalyticsView.as_view(), name='fulfilment-analytics'),
+    path('analytics/categories/', CategoryAnalyticsView.as_view(), name='category-analytics'),
+    path('analytics/breakdown/', BreakdownAnalyticsView.as_view(), name='breakdown-analytics'),
+    path('analytics/funnel/', FunnelAnalyticsView.as_view(), name='funnel-analytics'),
+    path('analytics/ratings/', RatingAnalyticsView.as_view(), name='rating-analytics'),
+    path('analytics/regions/', RegionAnalyticsView.as_view(), name='region-analytics'),
+    path('analytics/order-values/', OrderValueAnalyticsView.as_view(), name='order-value-analytics'),
+    path('analytics/forecast/', ForecastAnalyticsView.as_view(), name='forecast-analytics'),
+    path('analytics/coalescing/', CoalescingMetricsView.as_view(), name='coalescing-metrics'),
+    path('analytics/products/<int:product_id>/affinity/', ProductAffinityView.as_view(), name='product-affinity'),
+]
@@ -0,0 +1,50 @@
+# dashboard/versions.py
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import SyncState
+from .stores import store_db
+
+# Version counters live in the shared cache so that a write in one worker
+# invalidates process-local state in every other worker. Counters start from
+# the clock, so a counter lost to eviction never repeats a value seen before.
+# Without a shared cache (VERSIONS_IN_DATABASE) they are SyncState rows of the
+# store's database instead: a primary key lookup per check, but every worker
+# still sees every bump.
+
+
+def _key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    if settings.VERSIONS_IN_DATABASE:
+        value = SyncState.get_value(_key(name))
+        if value is None:
+            SyncState.objects.get_or_create(key=_key(name), defaults={'value': str(time.time_ns())})
+            value = SyncState.get_value(_key(name))
+        return int(value)
+    version = cache.get(_key(name))
+    if version is None:
+        cache.add(_key(name), time.time_ns(), None)
+        version = cache.get(_key(name))
+    return version
+
+
+def bump_version(name):
+    """Atomically advance the counter and return the new value."""
+    if settings.VERSIONS_IN_DATABASE:
+        with transaction.atomic(using=store_db()):
+            get_version(name)
+            state = SyncState.objects.select_for_update().get(key=_key(name))
+            state.value = str(int(state.value) + 1)
+            state.save(update_fields=['value', 'updated_at'])
+            return int(state.value)
+    try:
+        return cache.incr(_key(name))
+    except ValueError:
+        get_version(name)
+        return cache.incr(_key(name))
@@ -1,13 +1,28 @@
 # dashboard/views.py
 from rest_framework import viewsets, filters, mixins, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Avg, Max
 from django.db.models.functions import TruncMonth
+from django.db import connections, transaction
+from django.utils import timezone
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from rest_framework.parsers import MultiPartParser, FormParser
-
-from .models import Product, Order, OrderItem, Cart, Wishlist, Review, Category, StoreInfo
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+import asyncio
+
+from .models import (
+    Product, Order, OrderItem, Cart, Wishlist, Review, Category, StoreInfo,
+    CustomerStats, CustomerCohort, CustomerSegment, ProductAffinity,
+    ProductRatingSummary, ProductOrderCount, FulfilmentWeek, Job, Forecast,
+)
 from .serializers import (
     ProductSerializer,
     OrderSerializer,
@@ -15,13 +30,28 @@ from .serializers import (
     WishlistSerializer,
     ReviewSerializer,
     CategorySerializer,
-    StoreInfoSerializer
+    StoreInfoSerializer,
+    CustomerStatsSerializer,
+    JobSerializer
 )
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from .tiers import tiers_for, orders_since, items_since, distinct_customers, merge_by_month
+from .breakdown import DIMENSIONS, MEASURES, breakdown, parse_day, day_after
+from .status_events import STATUS_FIELDS, bulk_update_statuses
+from .realtime import get_broker, issue_ticket, redeem_ticket
+from .catalog import get_snapshot, invalidate as invalidate_catalog
+from .search import get_index, product_saved
+from .jobs import enqueue
+from .customers import customer_total
+from .throttling import AdmissionControlMixin
+from .coalescing import coalesced, metrics as coalescing_metrics
+from .sketches import merged_sketch
+from .stores import store_db, use_store, user_stores
+from . import refcache
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related('rating_summary')
     serializer_class = ProductSerializer
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [IsAuthenticated] 
@@ -31,6 +61,15 @@ class ProductViewSet(viewsets.ModelViewSet):
         context.update({"request": self.request})
         return context
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Autocomplete: ?q=<text>&limit=10&typo=1, ranked by match then paid orders."""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        typo = request.query_params.get('typo', '1') not in ('0', 'false')
+        return Response(get_index().search(request.query_params.get('q', ''), limit=limit, typo=typo))
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -41,18 +80,43 @@ class OrderViewSet(viewsets.ModelViewSet):
     pagination_class = PageNumberPagination
     permission_classes = [IsAuthenticated] 
 
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        order_numbers = request.data.get('order_numbers')
+        changes = {field: request.data[field] for field in STATUS_FIELDS if request.data.get(field)}
+        if not isinstance(order_numbers, list) or not order_numbers or not changes:
+            return Response(
+                {"error": "order_numbers and payment_status or order_status are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        changed = bulk_update_statuses(order_numbers, changes)
+        return Response({"updated": len(changed)})
+
 class OrderItemViewSet(viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated] 
 
-class CartViewSet(viewsets.ModelViewSet):
+class UserProductFilterMixin:
+    # `?user_id=` uses the (userID, product_id) unique index, `?product_id=` the product_id index.
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for param in ('user_id', 'product_id'):
+            value = self.request.query_params.get(param)
+            if value is not None:
+                if not value.isdigit():
+                    return queryset.none()
+                queryset = queryset.filter(**{param: int(value)})
+        return queryset
+
+
+class CartViewSet(UserProductFilterMixin, viewsets.ModelViewSet):
     queryset = Cart.objects.all()
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated] 
 
 
-class WishlistViewSet(viewsets.ModelViewSet):
+class WishlistViewSet(UserProductFilterMixin, viewsets.ModelViewSet):
     queryset = Wishlist.objects.all()
     serializer_class = WishlistSerializer
     permission_classes = [IsAuthenticated] 
@@ -69,31 +133,86 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated] 
 
-
-class DashboardSummaryView(APIView):
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_serializer(refcache.rows(Category), many=True).data)
+
+    def perform_update(self, serializer):
+        with transaction.atomic(using=store_db()):
+            category = serializer.save()
+            # Cascade a rename to the products' text column in one set-based UPDATE.
+            renamed = Product.objects.filter(category_ref=category).exclude(category=category.name)
+            product_ids = list(renamed.values_list('pk', flat=True))
+            renamed.update(category=category.name)
+            # update() sends no post_save, so refresh the search index and catalog snapshot here.
+            for product in Product.objects.filter(pk__in=product_ids):
+                product_saved(product)
+            invalidate_catalog()
+
+
+def window_start(request):
+    """Start of the `?days=N` window, or None for all-time reports."""
+    days = request.query_params.get('days')
+    if not days or not days.isdigit():
+        return None
+    return timezone.now() - timedelta(days=int(days))
+
+
+class CustomerPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class CustomerViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = CustomerStats.objects.all()
+    serializer_class = CustomerStatsSerializer
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['username']
+    ordering_fields = ['paid_revenue', 'last_order_at', 'first_order_at', 'order_count']
+    ordering = ['-paid_revenue']
+    pagination_class = CustomerPagination
+    permission_classes = [IsAuthenticated]
+
+
+def customer_count(since):
+    # All-time count reads the counter kept alongside customer_stats instead of scanning orders.
+    if since is None:
+        return customer_total()
+    return distinct_customers(since)
+
+
+class DashboardSummaryView(AdmissionControlMixin, APIView):
     permission_classes = [IsAuthenticated] 
+    @coalesced
     def get(self, request):
-        total_revenue = (
-            OrderItem.objects.filter(order_number__payment_status='Paid')
+        since = window_start(request)
+        tiers = tiers_for(since)
+
+        total_revenue = sum(
+            items_since(item_model, since).filter(order_number__payment_status='Paid')
             .aggregate(total=Sum('amount'))['total'] or 0
+            for _, item_model in tiers
         )
 
-        active_orders = Order.objects.filter(
+        # Only orders in a final status are archived, so active ones are always hot.
+        active_orders = orders_since(Order, since).filter(
             order_status__in=['Pending', 'Processing', 'Shipped']
         ).count()
 
         total_products = Product.objects.count()
 
-        total_customers = Order.objects.values('user_id').distinct().count()
+        total_customers = customer_count(since)
 
-        monthly_totals = (
-            OrderItem.objects
+        monthly_totals = merge_by_month((
+            entry
+            for _, item_model in tiers
+            for entry in items_since(item_model, since)
             .filter(order_number__payment_status='Paid')
             .annotate(month=TruncMonth('order_number__timestamp'))
             .values('month')
             .annotate(amount=Sum('amount'))
             .order_by('month')
-        )
+        ), 'amount')
 
         revenue_trend = [
             {'month': entry['month'].strftime('%b'), 'amount': float(entry['amount'])}
@@ -101,18 +220,16 @@ class DashboardSummaryView(APIView):
         ]
 
         recent_orders = []
-        for order in Order.objects.order_by('-timestamp')[:5]:
-            total = (
-                OrderItem.objects
-                .filter(order_number=order.order_number)
-                .aggregate(total=Sum('amount'))['total'] or 0.0
-            )
-            recent_orders.append({
-                "order_number": order.order_number,
-                "username": order.username,
-                "order_status": order.order_status,
-                "total_amount": float(total)
-            })
+        for order_model, _ in tiers:
+            for order in orders_since(order_model, since).order_by('-timestamp')[:5 - len(recent_orders)]:
+                recent_orders.append({
+                    "order_number": order.order_number,
+                    "username": order.username,
+                    "order_status": order.order_status,
+                    "total_amount": float(order.items_total)
+                })
+            if len(recent_orders) == 5:
+                break
 
         return Response({
             "total_revenue": float(total_revenue),
@@ -124,45 +241,59 @@ class DashboardSummaryView(APIView):
         })
 
 
-class ProductAnalyticsView(APIView):
+class ProductAnalyticsView(AdmissionControlMixin, APIView):
     permission_classes = [IsAuthenticated] 
+    @coalesced
     def get(self, request):
-        order_data = (
-            OrderItem.objects
-            .filter(order_number__payment_status='Paid')
-            .values('product_id')
-            .annotate(sales=Sum('quantity'), revenue=Sum('amount'))
-            .order_by('-sales')
-        )
+        since = window_start(request)
+        totals = {}
+        for _, item_model in tiers_for(since):
+            rows = (
+                items_since(item_model, since)
+                .filter(order_number__payment_status='Paid')
+                .values('product_id')
+                .annotate(sales=Sum('quantity'), revenue=Sum('amount'))
+            )
+            for row in rows:
+                sales, revenue = totals.get(row['product_id'], (0, 0))
+                totals[row['product_id']] = (sales + row['sales'], revenue + row['revenue'])
+
+        order_data = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
 
         product_map = {
             p.product_id: p.product_name for p in Product.objects.all()
         }
 
         results = [{
-            'product_id': item['product_id'],
-            'product_name': product_map.get(item['product_id'], 'Unknown Product'),
-            'sales': item['sales'],
-            'revenue': float(item['revenue'])
-        } for item in order_data]
+            'product_id': product_id,
+            'product_name': product_map.get(product_id, 'Unknown Product'),
+            'sales': sales,
+            'revenue': float(revenue)
+        } for product_id, (sales, revenue) in order_data]
 
         return Response(results)
 
 
-class OrderAnalyticsView(APIView):
+class OrderAnalyticsView(AdmissionControlMixin, APIView):
     permission_classes = [IsAuthenticated] 
+    @coalesced
     def get(self, request):
-        total_orders = Order.objects.count()
-        total_customers = Order.objects.values('user_id').distinct().count()
+        since = window_start(request)
+        tiers = tiers_for(since)
+        total_orders = sum(orders_since(order_model, since).count() for order_model, _ in tiers)
+        total_customers = customer_count(since)
 
         order_frequency = round(total_orders / total_customers, 2) if total_customers > 0 else 0
 
-        monthly_data = (
-            Order.objects.annotate(month=TruncMonth('timestamp'))
+        monthly_data = merge_by_month((
+            entry
+            for order_model, _ in tiers
+            for entry in orders_since(order_model, since)
+            .annotate(month=TruncMonth('timestamp'))
             .values('month')
             .annotate(count=Count('order_number'))
             .order_by('month')
-        )
+        ), 'count')
 
         monthly_order_trend = [
             {"month": entry["month"].strftime("%b"), "count": entry["count"]}
@@ -176,24 +307,34 @@ class OrderAnalyticsView(APIView):
         })
 
 
-class RevenueAnalyticsView(APIView):
+class RevenueAnalyticsView(AdmissionControlMixin, APIView):
     permission_classes = [IsAuthenticated] 
+    @coalesced
     def get(self, request):
-        paid_orders = Order.objects.filter(payment_status='Paid')
-
-        order_items = OrderItem.objects.filter(order_number__in=paid_orders)
+        since = window_start(request)
+        tiers = tiers_for(since)
+
+        total_revenue = 0
+        total_orders = 0
+        monthly_rows = []
+        for order_model, _ in tiers:
+            # Denormalized items_total makes these single-table aggregates with no join.
+            paid_orders = orders_since(order_model, since).filter(payment_status='Paid')
+
+            totals = paid_orders.aggregate(total=Sum('items_total'), count=Count('order_number'))
+            total_revenue += totals['total'] or 0
+            total_orders += totals['count']
+            monthly_rows.extend(
+                paid_orders
+                .annotate(month=TruncMonth('timestamp'))
+                .values('month')
+                .annotate(amount=Sum('items_total'))
+                .order_by('month')
+            )
 
-        total_revenue = order_items.aggregate(total=Sum('amount'))['total'] or 0
-        total_orders = paid_orders.count()
         average_order_value = round(total_revenue / total_orders, 2) if total_orders else 0
 
-        monthly_data = (
-            order_items
-            .annotate(month=TruncMonth('order_number__timestamp'))
-            .values('month')
-            .annotate(amount=Sum('amount'))
-            .order_by('month')
-        )
+        monthly_data = merge_by_month(monthly_rows, 'amount')
 
         monthly_revenue_trend = [
             {"month": entry["month"].strftime("%b"), "amount": float(entry["amount"])}
@@ -206,12 +347,387 @@ class RevenueAnalyticsView(APIView):
             "monthly_revenue_trend": monthly_revenue_trend,
         })
 
+class CohortAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        cohorts = {}
+        for cell in CustomerCohort.objects.order_by('cohort_month', 'month_offset'):
+            customers = cohorts.setdefault(cell.cohort_month, [])
+            # Fill months with no returning customers so offsets line up with list positions.
+            customers.extend([0] * (cell.month_offset - len(customers)))
+            customers.append(cell.customers)
+
+        months = request.query_params.get('months')
+        cohort_months = sorted(cohorts)
+        if months and months.isdigit():
+            cohort_months = cohort_months[-int(months):]
+
+        results = []
+        for month in cohort_months:
+            customers = cohorts[month]
+            size = customers[0] if customers else 0
+            results.append({
+                "cohort": month.strftime('%Y-%m'),
+                "size": size,
+                "customers": customers,
+                "retention": [round(count / size, 4) if size else 0 for count in customers],
+            })
+        return Response(results)
+
+
+class RFMAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        segments = (
+            CustomerSegment.objects
+            .values('segment')
+            .annotate(
+                customers=Count('user_id'),
+                monetary=Sum('monetary'),
+                avg_recency_days=Avg('recency_days'),
+                avg_frequency=Avg('frequency'),
+            )
+            .order_by('-monetary')
+        )
+        computed_at = CustomerSegment.objects.aggregate(at=Max('computed_at'))['at']
+
+        return Response({
+            "computed_at": computed_at,
+            "segments": [{
+                "segment": entry['segment'],
+                "customers": entry['customers'],
+                "monetary": float(entry['monetary'] or 0),
+                "avg_recency_days": round(entry['avg_recency_days'] or 0, 1),
+                "avg_frequency": round(entry['avg_frequency'] or 0, 2),
+            } for entry in segments],
+        })
+
+class ProductAffinityView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request, product_id):
+        affinities = list(ProductAffinity.objects.filter(product_id=product_id).order_by('rank'))
+        names = dict(
+            Product.objects.filter(product_id__in=[a.other_product_id for a in affinities])
+            .values_list('product_id', 'product_name')
+        )
+        return Response([{
+            'product_id': affinity.other_product_id,
+            'product_name': names.get(affinity.other_product_id, 'Unknown Product'),
+            'orders': affinity.orders,
+            'confidence': round(affinity.confidence, 4),
+            'lift': round(affinity.lift, 4),
+        } for affinity in affinities])
+
+class RatingAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        order = request.query_params.get('order', 'top')
+        min_reviews = request.query_params.get('min_reviews', '1')
+        limit = request.query_params.get('limit', '10')
+        min_reviews = int(min_reviews) if min_reviews.isdigit() else 1
+        limit = min(int(limit), 100) if limit.isdigit() else 10
+
+        ordering = ['-average', '-count'] if order != 'bottom' else ['average', '-count']
+        summaries = (
+            ProductRatingSummary.objects
+            .filter(count__gte=min_reviews)
+            .select_related('product')
+            .order_by(*ordering)[:limit]
+        )
+
+        return Response([{
+            'product_id': summary.product_id,
+            'product_name': summary.product.product_name,
+            'count': summary.count,
+            'average': round(summary.average, 2),
+            'distribution': summary.distribution(),
+        } for summary in summaries])
+
+class FunnelAnalyticsView(AdmissionControlMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    @coalesced
+    def get(self, request):
+        product_id = request.query_params.get('product_id')
+        wishlist = Wishlist.objects.all()
+        cart = Cart.objects.all()
+        purchases = ProductOrderCount.objects.all()
+        if product_id is not None:
+            if not product_id.isdigit():
+                return Response({"error": "product_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            wishlist = wishlist.filter(product_id=int(product_id))
+            cart = cart.filter(product_id=int(product_id))
+            purchases = purchases.filter(product_id=int(product_id))
+
+        # One GROUP BY per stage; paid purchases come from the product_order_counts rollup.
+        funnel = {}
+        def stage(product):
+            return funnel.setdefault(product, {
+                'wishlisted': 0, 'carted': 0, 'cart_units': 0, 'cart_value': 0, 'purchased': 0,
+            })
+
+        for row in wishlist.values('product_id').annotate(users=Count('pk')).order_by():
+            stage(row['product_id'])['wishlisted'] = row['users']
+        for row in cart.values('product_id').annotate(
+            users=Count('pk'), units=Sum('quantity'), value=Sum('amount')
+        ).order_by():
+            entry = stage(row['product_id'])
+            entry.update(carted=row['users'], cart_units=row['units'], cart_value=float(row['value'] or 0))
+        for product, orders in purchases.values_list('product_id', 'orders'):
+            stage(product)['purchased'] = orders
+
+        names = dict(Product.objects.filter(product_id__in=funnel).values_list('product_id', 'product_name'))
+        products = sorted(({
+            'product_id': product,
+            'product_name': names.get(product, 'Unknown Product'),
+            **entry,
+            'cart_rate': round(entry['carted'] / entry['wishlisted'], 4) if entry['wishlisted'] else None,
+            'purchase_rate': round(entry['purchased'] / entry['carted'], 4) if entry['carted'] else None,
+        } for product, entry in funnel.items()), key=lambda row: row['wishlisted'], reverse=True)
+
+        abandoned = cart.aggregate(value=Sum('amount'), carts=Count('user_id', distinct=True))
+        return Response({
+            "abandoned_cart_value": float(abandoned['value'] or 0),
+            "abandoned_carts": abandoned['carts'],
+            "products": products,
+        })
+
+class BreakdownAnalyticsView(AdmissionControlMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    @coalesced
+    def get(self, request):
+        dims = [d for d in request.query_params.get('dims', '').split(',') if d]
+        measures = [m for m in request.query_params.get('measures', '').split(',') if m] or list(MEASURES)
+
+        unknown = [d for d in dims if d not in DIMENSIONS] + [m for m in measures if m not in MEASURES]
+        if unknown or len(set(dims)) != len(dims):
+            return Response({
+                "error": f"Unknown or repeated dims/measures: {', '.join(unknown) or ', '.join(dims)}",
+                "dims": list(DIMENSIONS),
+                "measures": list(MEASURES),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        start = parse_day(request.query_params.get('from'))
+        end = parse_day(request.query_params.get('to'))
+        rollup = request.query_params.get('rollup') in ('1', 'true')
+
+        rows, source = breakdown(dims, list(dict.fromkeys(measures)), start, day_after(end), rollup)
+        return Response({
+            "dims": dims,
+            "measures": measures,
+            "source": source,
+            "rows": rows,
+        })
+
+class CategoryAnalyticsView(AdmissionControlMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    @coalesced
+    def get(self, request):
+        since = window_start(request)
+        totals = {}
+        for _, item_model in tiers_for(since):
+            rows = (
+                items_since(item_model, since)
+                .filter(order_number__payment_status='Paid')
+                .values('product__category_ref')
+                .annotate(revenue=Sum('amount'), units=Sum('quantity'), orders=Count('order_number', distinct=True))
+                .order_by()
+            )
+            for row in rows:
+                entry = totals.setdefault(row['product__category_ref'], {'revenue': 0, 'units': 0, 'orders': 0})
+                for field in entry:
+                    entry[field] += row[field] or 0
+
+        names = {category.category_id: category.name for category in refcache.rows(Category)}
+        results = sorted(({
+            'category_id': category_id,
+            'category': names.get(category_id, 'Uncategorized'),
+            'revenue': float(entry['revenue']),
+            'units': entry['units'],
+            'orders': entry['orders'],
+        } for category_id, entry in totals.items()), key=lambda row: row['revenue'], reverse=True)
+
+        return Response(results)
+
+class FulfilmentAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        weeks = request.query_params.get('weeks', '12')
+        weeks = int(weeks) if weeks.isdigit() else 12
+        since = timezone.localdate() - timedelta(weeks=weeks)
+
+        metrics = {}
+        for row in FulfilmentWeek.objects.filter(week__gte=since).order_by('week'):
+            metrics.setdefault(row.metric, []).append({
+                "week": row.week,
+                "count": row.count,
+                "p50_hours": round(row.p50, 2),
+                "p90_hours": round(row.p90, 2),
+                "p99_hours": round(row.p99, 2),
+            })
+        return Response(metrics)
+
+REGION_LEVELS = {
+    'country': ['country'],
+    'region': ['country', 'region'],
+    'city': ['country', 'region', 'city'],
+    'postcode': ['country', 'postcode'],
+}
+
+
+class RegionAnalyticsView(AdmissionControlMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    @coalesced
+    def get(self, request):
+        level = request.query_params.get('level', 'country')
+        if level not in REGION_LEVELS:
+            return Response({"error": f"level must be one of {', '.join(REGION_LEVELS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        columns = REGION_LEVELS[level]
+        filters = {
+            f'address__{field}': request.query_params[field]
+            for field in ('country', 'region') if request.query_params.get(field)
+        }
+        since = window_start(request)
+
+        totals = {}
+        for order_model, _ in tiers_for(since):
+            # One join to order_addresses on the primary key, grouped on its geo index columns;
+            # nothing is parsed here.
+            rows = (
+                orders_since(order_model, since).filter(payment_status='Paid', **filters)
+                .values(*(f'address__{field}' for field in columns))
+                .annotate(orders=Count('pk'), revenue=Sum('items_total'))
+                .order_by()
+            )
+            for row in rows:
+                key = tuple(row[f'address__{field}'] or '' for field in columns)
+                entry = totals.setdefault(key, {'orders': 0, 'revenue': 0})
+                entry['orders'] += row['orders']
+                entry['revenue'] += row['revenue'] or 0
+
+        peak = max((entry['revenue'] for entry in totals.values()), default=0)
+        cells = sorted(({
+            **dict(zip(columns, key)),
+            'orders': entry['orders'],
+            'revenue': float(entry['revenue']),
+            # 0..1 for colouring a heatmap/choropleth cell.
+            'intensity': round(float(entry['revenue'] / peak), 4) if peak else 0,
+        } for key, entry in totals.items()), key=lambda cell: cell['revenue'], reverse=True)
+        return Response({
+            "level": level,
+            "keys": columns,
+            "max_revenue": float(peak),
+            "cells": cells,
+        })
+
+class OrderValueAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        """Order value percentiles and histogram from the stored sketches: ?from=&to= or ?days=N."""
+        first = parse_day(request.query_params.get('from'))
+        last = parse_day(request.query_params.get('to'))
+        since = window_start(request)
+        if since is not None and first is None:
+            first = timezone.localtime(since).date()
+        try:
+            bins = min(max(int(request.query_params.get('bins', 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "bins must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        sketch = merged_sketch(first, last)
+        count = sketch.count
+
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+
+        return Response({
+            "count": count,
+            "average_order_value": round(float(sketch.total) / count, 2) if count else 0,
+            "p50": rounded(sketch.quantile(0.5)),
+            "p90": rounded(sketch.quantile(0.9)),
+            "p99": rounded(sketch.quantile(0.99)),
+            "relative_error": sketch.accuracy,
+            "histogram": sketch.histogram(bins),
+        })
+
+class ForecastAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        """Stored forecasts for ?series=store|category:<name>&metric=revenue|orders; nothing is fitted here."""
+        series = request.query_params.get('series', 'store')
+        metric = request.query_params.get('metric', 'revenue')
+        rows = list(
+            Forecast.objects.filter(series=series, metric=metric, day__gte=timezone.localdate())
+            .order_by('day').values('day', 'value', 'lower', 'upper', 'generated_at')
+        )
+        return Response({
+            "series": series,
+            "metric": metric,
+            "generated_at": rows[0]['generated_at'] if rows else None,
+            "available_series": list(
+                Forecast.objects.filter(metric=metric).values_list('series', flat=True).distinct().order_by('series')
+            ),
+            "forecast": [
+                {
+                    "day": row['day'].isoformat(),
+                    "value": row['value'],
+                    "lower": row['lower'],
+                    "upper": row['upper'],
+                }
+                for row in rows
+            ],
+        })
+
+def store_summary(store):
+    """Headline numbers for one store; runs in a fan-out thread."""
+    try:
+        with use_store(store):
+            revenue = orders = 0
+            for order_model, _ in tiers_for():
+                totals = order_model.objects.filter(payment_status='Paid').aggregate(
+                    revenue=Sum('items_total'), orders=Count('order_number'),
+                )
+                revenue += totals['revenue'] or 0
+                orders += totals['orders']
+            return {
+                "store": store,
+                "total_revenue": float(revenue),
+                "paid_orders": orders,
+                "active_orders": Order.objects.filter(order_status__in=['Pending', 'Processing', 'Shipped']).count(),
+                "total_products": Product.objects.count(),
+                "total_customers": customer_count(None),
+            }
+    finally:
+        # Each pool thread opens its own connections; release them with the task.
+        connections.close_all()
+
+
+class StoreSummaryView(APIView):
+    """Cross-store dashboard: each store the user may use is queried in parallel."""
+    permission_classes = [IsAdminUser]
+    def get(self, request):
+        stores = user_stores(request.user)
+        with ThreadPoolExecutor(max_workers=max(1, min(len(stores), settings.STORE_FANOUT_WORKERS))) as pool:
+            rows = list(pool.map(store_summary, stores))
+        return Response({
+            "stores": rows,
+            "total_revenue": sum(row["total_revenue"] for row in rows),
+            "paid_orders": sum(row["paid_orders"] for row in rows),
+            "active_orders": sum(row["active_orders"] for row in rows),
+            "total_products": sum(row["total_products"] for row in rows),
+        })
+
+class CoalescingMetricsView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        return Response(coalescing_metrics())
+
 class StoreInfoViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.UpdateModelMixin):
     queryset = StoreInfo.objects.all()
     serializer_class = StoreInfoSerializer
     permission_classes = [IsAuthenticated] 
     def get_object(self):
-        return StoreInfo.objects.first()
+        return refcache.first(StoreInfo)
 
     def list(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -225,4 +741,120 @@ class StoreInfoViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Up
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin):
+    queryset = Job.objects.order_by('-id')
+    serializer_class = JobSerializer
+    # Jobs run batch commands (rebuilds, backfills, reconciliation) and expose their output;
+    # registration is open, so this is staff only.
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for field in ('status', 'task'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = enqueue(
+            data['task'], data.get('payload'), priority=data.get('priority', 0),
+            max_attempts=data.get('max_attempts'),
+        )
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.FAILED:
+            return Response({"error": "Only failed jobs can be retried"}, status=status.HTTP_400_BAD_REQUEST)
+        job.status, job.attempts, job.run_at, job.finished_at = Job.QUEUED, 0, timezone.now(), None
+        job.save(update_fields=['status', 'attempts', 'run_at', 'finished_at'])
+        return Response(self.get_serializer(job).data)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        counts = dict(Job.objects.values_list('status').annotate(count=Count('id')).order_by())
+        oldest = (
+            Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now())
+            .order_by('run_at').values_list('run_at', flat=True).first()
+        )
+        return Response({
+            "counts": {value: counts.get(value, 0) for value, _ in Job.STATUS_CHOICES},
+            "oldest_ready_seconds": round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0,
+        })
+
+
+class DashboardStreamTicketView(APIView):
+    permission_classes = [IsAuthenticated]
+    def post(self, request):
+        # `live` is false under WSGI, where the stream is refused; the client polls instead.
+        return Response({
+            "ticket": issue_ticket(request.user.pk),
+            "live": isinstance(request._request, ASGIRequest),
+        })
+
+
+async def dashboard_stream(request):
+    """Server-Sent Events feed of order deltas, opened with a ticket from dashboard/stream/ticket/.
+
+    Only served under ASGI (store_dashboard.asgi): under WSGI each open stream would pin
+    a worker thread for good, so it answers 503 and clients fall back to polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live updates need the ASGI server; poll dashboard/summary/"}, status=503)
+    redeemed = await sync_to_async(redeem_ticket)(request.GET.get('ticket', ''))
+    if redeemed is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    _, store = redeemed
+
+    broker = get_broker()
+    with use_store(store):
+        subscription = broker.subscribe()
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.REALTIME_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def catalog_response(request, document):
+    if document.etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(document.body, content_type='application/json')
+    response['ETag'] = document.etag
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+@require_safe
+def public_catalog(request, document='catalog'):
+    """Unauthenticated, read-only catalog served from the in-memory snapshot."""
+    return catalog_response(request, get_snapshot().documents[document])
+
+
+@require_safe
+def public_product(request, product_id):
+    document = get_snapshot().products.get(product_id)
+    if document is None:
+        return JsonResponse({"error": "Product not found"}, status=404)
+    return catalog_response(request, document)
@@ -0,0 +1,33 @@
+# dashboard/warmup.py
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Do the lazy first-request work up front so a freshly started worker answers its first request fast.
+
+    Populates the URL resolvers (importing every view module) and the models'
+    field caches, which serializers and querysets look fields up in. No database
+    connection is opened here: under `gunicorn --preload` it would be shared by
+    every forked worker.
+    """
+    started = time.perf_counter()
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018 - populates the resolver tree
+
+    # Both live on the model's Options, so they persist for the life of the process.
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta._forward_fields_map  # noqa: B018 - cached name -> field lookup used by queries
+    logger.info("Warm-up finished in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+def warm_up_if_enabled():
+    if settings.WARMUP_ON_START:
+        warm_up()
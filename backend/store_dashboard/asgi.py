@@ -3,6 +3,10 @@ ASGI config for store_dashboard project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the app through this module (e.g. ``uvicorn store_dashboard.asgi:application``)
+so /api/dashboard/stream/ Server-Sent Events connections wait on the event loop
+instead of each holding a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +18,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'store_dashboard.settings')
 
 application = get_asgi_application()
+
+# Runs in each worker before it accepts traffic; DJANGO_WARMUP=0 disables it.
+from dashboard.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from datetime import timedelta
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,8 +35,11 @@ ALLOWED_HOSTS = ['*']
 
 # Application definition
 
+# DJANGO_ADMIN=0 leaves the admin out of API-only workers (fewer imports at startup)
+ADMIN_ENABLED = os.getenv('DJANGO_ADMIN', '1') == '1'
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    *(['django.contrib.admin'] if ADMIN_ENABLED else []),
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -57,7 +62,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'corsheaders.middleware.CorsMiddleware'
+    'corsheaders.middleware.CorsMiddleware',
+    'dashboard.stores.store_middleware',
 ]
 
 ROOT_URLCONF = 'store_dashboard.urls'
@@ -94,6 +100,26 @@ DATABASES = {
     }
 }
 
+# Stores served by this deployment. Each store's dashboard tables live in its own
+# database; users/auth stay on 'default'. Extra stores come from STORES_JSON, e.g.
+#   {"shop2": {"hosts": ["shop2.example.com"], "db": {"NAME": "ecom_shop2"}}}
+# where "db" overrides keys of the default connection settings. A user works in the
+# stores listed in their `stores` field (DEFAULT_STORE when empty); superusers in all.
+STORES = {'default': {'database': 'default', 'hosts': []}}
+for _name, _config in json.loads(os.getenv('STORES_JSON', '{}')).items():
+    DATABASES[_name] = {**DATABASES['default'], **_config.get('db', {})}
+    STORES[_name] = {'database': _name, 'hosts': [host.lower() for host in _config.get('hosts', [])]}
+
+# Store for requests without a matching host/header and for management commands
+DEFAULT_STORE = os.getenv('DJANGO_STORE', 'default')
+STORE_HEADER = 'X-Store'
+STORE_FANOUT_WORKERS = 8
+
+DATABASE_ROUTERS = ['dashboard.stores.StoreRouter']
+
+# Creates the unmanaged (bot-owned) tables too, since the tests run without migrations
+TEST_RUNNER = 'dashboard.testing.DashboardTestRunner'
+
 
 
 # Password validation
@@ -142,8 +168,9 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
         'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # ✅ Add this for JWT Bearer tokens
-        'rest_framework.authentication.SessionAuthentication',  # (Optional, for Browsable API sessions)
+        # JWT Bearer tokens and Browsable API sessions; both refuse users outside the request's store
+        'dashboard.authentication.StoreJWTAuthentication',
+        'dashboard.authentication.StoreSessionAuthentication',
     ),
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
@@ -152,6 +179,27 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASS' : (
         'rest_framework.permission.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'dashboard.throttling.TokenBucketThrottle',
+    ),
+}
+
+# Token buckets per user: `capacity` tokens, refilled at `refill` tokens/second.
+# Writes have their own bucket so heavy reading never eats into them. One Analytics
+# page load makes up to ~8 full-history calls (32 tokens), so 'analytics' holds a few
+# loads back to back; the admission pools, not this bucket, protect the database.
+THROTTLE_BUCKETS = {
+    'read': {'capacity': 120, 'refill': 2.0},
+    'write': {'capacity': 60, 'refill': 1.0},
+    'analytics': {'capacity': 120, 'refill': 1.0},
+}
+# Tokens drawn by an analytics request without a ?days/?from window
+THROTTLE_FULL_HISTORY_COST = 4
+
+# Concurrent executions across all workers for the heavy analytics/summary views.
+# Keep `slots` below the worker count so writes and the webhook always have workers free.
+ADMISSION_POOLS = {
+    'analytics': {'slots': 4, 'queue_seconds': 2, 'lease_seconds': 120, 'retry_after': 5},
 }
 
 ## just token expiration controller
@@ -162,16 +210,99 @@ SIMPLE_JWT = {
         'BLACKLIST_AFTER_ROTATION': True,
     }
 
+# Shared cache for version keys, throttling and coalescing. Without DJANGO_CACHE_URL
+# each worker has its own local-memory cache and nothing is shared between workers,
+# so the version counters that invalidate refcache tables, catalog snapshots and
+# search indexes move to the store database (dashboard.versions) to stay shared.
+# Production should still set DJANGO_CACHE_URL.
+VERSIONS_IN_DATABASE = not os.getenv('DJANGO_CACHE_URL')
+if os.getenv('DJANGO_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('DJANGO_CACHE_URL'),
+            'KEY_FUNCTION': 'dashboard.stores.make_cache_key',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_FUNCTION': 'dashboard.stores.make_cache_key',
+        }
+    }
+
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
     "https://sb.tamimulahsan.com",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'x-store')
+# Lets the frontend read how long to back off after a 429
+CORS_EXPOSE_HEADERS = ['Retry-After']
 
 
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media offload: 'nginx' (X-Accel-Redirect to an `internal` location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT), 'apache' (X-Sendfile) or None to stream from Django.
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Product search index: details tokens indexed per product, and how often sales ranks are reloaded
+SEARCH_DETAILS_TOKENS = 64
+SEARCH_SALES_REFRESH_SECONDS = 300
+
+# Single-flight coalescing of identical analytics requests (dashboard.coalescing)
+SINGLE_FLIGHT_LOCK_SECONDS = 60
+# Followers in other workers poll (backing off to 0.5s) this long before computing themselves
+SINGLE_FLIGHT_WAIT_SECONDS = 10
+# How long a leader's result stays up for the followers already polling. Bot-written
+# orders do not move the data version, so anything longer would serve stale numbers.
+SINGLE_FLIGHT_RESULT_SECONDS = 2
+
+# Background jobs (dashboard.jobs, `manage.py run_workers`)
+JOBS_WORKERS = 4
+JOBS_MAX_ATTEMPTS = 3
+JOBS_BACKOFF_SECONDS = 10
+JOBS_BACKOFF_MAX_SECONDS = 3600
+# A running job's lease is renewed every third of this while it runs; a job whose lease
+# expired lost its worker and is requeued by the other workers' periodic sweep.
+JOBS_LEASE_SECONDS = 1800
+JOBS_REQUEUE_INTERVAL_SECONDS = 60
+# Batch commands that may be queued through the `management.command` task
+JOBS_COMMANDS = [
+    'build_order_cube', 'build_product_affinity', 'rebuild_customer_stats', 'rebuild_rating_summaries',
+    'compute_customer_segments', 'compute_fulfilment_metrics', 'check_order_totals',
+]
+
+# Batch commands the workers queue themselves: command -> seconds between runs. Rows the
+# storefront bot inserts directly (new customers, their orders) only reach customer_stats
+# and the customer count through this rebuild, so those can lag by up to its interval.
+JOBS_SCHEDULE = {
+    'rebuild_customer_stats': 3600,
+}
+
+# Pre-build URL resolvers and model field caches when a worker boots (dashboard.warmup)
+WARMUP_ON_START = os.getenv('DJANGO_WARMUP', '1') == '1'
+
+# Relative error of order-value quantiles (dashboard.sketches); changing it requires
+# `manage.py build_order_value_sketches` since stored bucket indexes depend on it
+ORDER_VALUE_SKETCH_ACCURACY = 0.01
+
+# Country code for parsed delivery addresses that don't name one (dashboard.addresses)
+ADDRESS_DEFAULT_COUNTRY = os.getenv('ADDRESS_DEFAULT_COUNTRY', '')
+
+# BTCPay Greenfield API for `manage.py reconcile_btcpay`
+BTCPAY_URL = os.getenv('BTCPAY_URL', 'https://btcpay.example.com')
+BTCPAY_API_KEY = os.getenv('BTCPAY_API_KEY', '')
+BTCPAY_STORE_ID = os.getenv('BTCPAY_STORE_ID', '')
+BTCPAY_RECONCILE_OVERLAP_HOURS = 48
+
+# Prefix for absolute image URLs in the public catalog (e.g. https://sb.tamimulahsan.com)
+PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', '')
+
 
 # HSTS
 SECURE_HSTS_SECONDS = 31536000  # 1 year in seconds
@@ -186,4 +317,27 @@ SECURE_SSL_REDIRECT = False
 SESSION_COOKIE_SECURE = True
 
 # Secure csrf Cookies 
-CSRF_COOKIE_SECURE = True
\ No newline at end of file
+CSRF_COOKIE_SECURE = True
+
+# Order storage tiers: orders older than this many days in a final status
+# are moved to the archive tables by `manage.py archive_orders`.
+ORDER_HOT_TIER_DAYS = 365
+ORDER_ARCHIVABLE_STATUSES = ['Delivered', 'Cancelled']
+
+# Product affinity ("frequently bought together"). Paid orders saved through Django queue
+# an `affinity.record_paid_order` job that updates it incrementally; run `manage.py build_product_affinity` nightly (cron, or the
+# `management.command` job) to pick up bot-written payments and re-rank every product.
+AFFINITY_TOP_K = 10
+AFFINITY_MIN_ORDERS = 2
+
+# Real-time dashboard deltas (Server-Sent Events). LocalBroker only reaches clients
+# connected to the same worker; use RedisBroker when running several workers.
+# The stream is only served under ASGI (store_dashboard.asgi); under WSGI it answers
+# 503 and the dashboard polls the summary instead.
+REALTIME_BACKEND = os.getenv('REALTIME_BACKEND', 'dashboard.realtime.LocalBroker')
+REALTIME_REDIS_URL = os.getenv('REALTIME_REDIS_URL', 'redis://localhost:6379/0')
+REALTIME_CHANNEL = 'dashboard-events'
+REALTIME_QUEUE_SIZE = 100
+REALTIME_KEEPALIVE_SECONDS = 20
+# Lifetime of the single-use ticket that opens a stream (POST /api/dashboard/stream/ticket/)
+REALTIME_TICKET_SECONDS = 30
@@ -14,15 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path , include
+from django.conf import settings
+from django.urls import path , include, re_path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from users.views import RegisterView
+from dashboard.media import serve_media
 
 
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/', include('dashboard.urls')),
      # 🔐 Auth routes
     path('api/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -30,4 +30,11 @@ urlpatterns = [
     path('api/register/', RegisterView.as_view(), name='register'),
     path('webhook/', include('webhook.urls')),
     path('api/users/', include('users.urls')),  # new users endpoints
+    # Media works with DEBUG = False; versioned URLs are emitted by the serializers
+    re_path(r'^media/v/(?P<version>[0-9a-f]+)/(?P<path>.+)$', serve_media, name='media-versioned'),
+    re_path(r'^media/(?P<path>.+)$', serve_media, name='media'),
 ]
+
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin
+    urlpatterns.append(path('admin/', admin.site.urls))
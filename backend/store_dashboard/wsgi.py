@@ -3,6 +3,9 @@ WSGI config for store_dashboard project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Under WSGI the /api/dashboard/stream/ live feed is disabled (it would hold a worker
+thread per open dashboard) and the frontend polls; serve store_dashboard.asgi for it.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
@@ -14,3 +17,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'store_dashboard.settings')
 
 application = get_wsgi_application()
+
+# Runs in each worker before it accepts traffic; DJANGO_WARMUP=0 disables it.
+from dashboard.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
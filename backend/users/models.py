@@ -27,6 +27,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     last_login = models.DateTimeField(blank=True, null=True)
+    # Store names (settings.STORES) this user may work in; empty means DEFAULT_STORE
+    # only. Superusers may use every store.
+    stores = models.JSONField(default=list, blank=True)
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']
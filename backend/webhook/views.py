@@ -1,15 +1,20 @@
 import os
-from dotenv import load_dotenv
+from functools import lru_cache
 import hmac
 import hashlib
 import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from dashboard.models import Order
+from dashboard.status_events import event_source
 # Create your views here.
 
-load_dotenv()
-webhook_secret = os.getenv("BTCPAY_WEBHOOK_SECRET")
+@lru_cache(maxsize=None)
+def webhook_secret():
+    # Read .env on the first webhook, not while every worker is importing URLconfs.
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("BTCPAY_WEBHOOK_SECRET")
 
 
 @csrf_exempt
@@ -23,7 +28,7 @@ def btcpay_webhook(request):
 
         #Verify signatuure
         expected_sig = "sha256=" + hmac.new(
-            webhook_secret.encode(), payload, hashlib.sha256
+            webhook_secret().encode(), payload, hashlib.sha256
         ).hexdigest()
 
         if not hmac.compare_digest(expected_sig, signature or ""):
@@ -50,7 +55,8 @@ def btcpay_webhook(request):
              order = Order.objects.get(invoice_id=invoice_id)
              order.payment_status = payment_status
              order.order_status = order_status
-             order.save(update_fields=["payment_status", "order_status"])
+             with event_source("webhook"):
+                 order.save(update_fields=["payment_status", "order_status"])
         except Order.DoesNotExist:
             return JsonResponse({"error": "Order not found for invoice"}, status = 404)
         
@@ -18,6 +18,8 @@ api.interceptors.request.use((config) => {
 });
 
 
+const MAX_THROTTLE_RETRIES = 3;
+
 // Redirect to login upon access token/refresh token expiration - response interceptor
 api.interceptors.response.use(
     response => {
@@ -26,6 +28,16 @@ api.interceptors.response.use(
     async error => {
         const originalRequest = error.config;
 
+        // Throttled: wait as long as the server asks (Retry-After), then retry a few times
+        if (error.response?.status === 429 && (originalRequest._throttleRetries || 0) < MAX_THROTTLE_RETRIES) {
+            originalRequest._throttleRetries = (originalRequest._throttleRetries || 0) + 1;
+            const retryAfter = parseFloat(error.response.headers['retry-after']);
+            const seconds = Number.isFinite(retryAfter) ? retryAfter : 2 ** originalRequest._throttleRetries;
+            // Jitter keeps the page's parallel requests from retrying in lockstep
+            await new Promise(resolve => setTimeout(resolve, Math.min(seconds, 30) * 1000 + Math.random() * 1000));
+            return api(originalRequest);
+        }
+
         // If the error is 401 and it's not the refresh token endpoint itself
         if (error.response.status === 401 && !originalRequest._retry) {
             originalRequest._retry = true; // Mark as retried to avoid infinite loops
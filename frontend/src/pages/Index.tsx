@@ -25,6 +25,9 @@ interface DashboardData {
   }[];
 }
 
+const SUMMARY_POLL_MS = 30000;
+const STREAM_MAX_FAILURES = 3;
+
 const DashboardOverview = () => {
 
   const [dashboardData, setDashboardData] = useState<DashboardData | null>(null);
@@ -35,6 +38,83 @@ const DashboardOverview = () => {
       .catch(err => console.error('Dashboard load failed:', err));
   }, []);
 
+  // Apply pushed order deltas instead of reloading the whole summary. The stream is opened
+  // with a single-use ticket; when the server can't stream (WSGI) or keeps failing, poll.
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let poll: ReturnType<typeof setInterval> | undefined;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let failures = 0;
+    let closed = false;
+
+    const startPolling = () => {
+      if (closed || poll) return;
+      poll = setInterval(() => {
+        api.get('dashboard/summary/')
+          .then(res => setDashboardData(res.data))
+          .catch(err => console.error('Dashboard refresh failed:', err));
+      }, SUMMARY_POLL_MS);
+    };
+
+    const applyDelta = (event: MessageEvent) => {
+      const message = JSON.parse(event.data);
+      setDashboardData(prev => {
+        if (!prev) return prev;
+        const kpi = message.kpi || {};
+        const next = {
+          ...prev,
+          active_orders: prev.active_orders + (kpi.active_orders || 0),
+          total_revenue: prev.total_revenue + (kpi.total_revenue || 0),
+        };
+        if (message.type === 'order.created') {
+          next.recent_orders = [message.order, ...prev.recent_orders].slice(0, 5);
+        } else if (message.type === 'order.status') {
+          next.recent_orders = prev.recent_orders.map(order =>
+            order.order_number === message.order_number
+              ? { ...order, order_status: message.order_status }
+              : order
+          );
+        }
+        return next;
+      });
+    };
+
+    const connect = async () => {
+      try {
+        const { data } = await api.post('dashboard/stream/ticket/');
+        if (closed) return;
+        if (!data.live) {
+          startPolling();
+          return;
+        }
+        source = new EventSource(`${api.defaults.baseURL}dashboard/stream/?ticket=${encodeURIComponent(data.ticket)}`);
+        source.onopen = () => { failures = 0; };
+        source.onmessage = applyDelta;
+        source.onerror = () => {
+          // Tickets are single-use, so reconnect with a fresh one instead of EventSource's own retry.
+          source?.close();
+          failures += 1;
+          if (failures >= STREAM_MAX_FAILURES) {
+            startPolling();
+          } else {
+            retry = setTimeout(connect, 5000 * failures);
+          }
+        };
+      } catch (err) {
+        console.error('Live updates unavailable:', err);
+        startPolling();
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      source?.close();
+      clearInterval(poll);
+      clearTimeout(retry);
+    };
+  }, []);
+
   if (!dashboardData) {
     return <p className="text-muted-foreground">Loading dashboard...</p>;
   }
@@ -47,7 +47,6 @@ const OrdersPage = () => {
   const [editDialogOpen, setEditDialogOpen] = useState(false);
   const [editStatus, setEditStatus] = useState<string>('');
   const [editPaymentStatus, setEditPaymentStatus] = useState<string>('');
-  const [deliveryFee, setDeliveryFee] = useState<number>(0);
 
   useEffect(() => {
     api.get('orders/')
@@ -57,14 +56,6 @@ const OrdersPage = () => {
     api.get('products/')
       .then(res => setProducts(res.data))
       .catch(err => console.error('Failed to load products'));
-    // Fetch delivery fee from store-info
-    api.get('store-info/')
-    .then(res => {
-      if (res.data && res.data.delivery_fee) {
-        setDeliveryFee(parseFloat(res.data.delivery_fee)); // Convert string to number
-      }
-    })
-    .catch(err => console.error('Failed to load store info'));
   }, []);
   
 
@@ -210,9 +201,7 @@ const OrdersPage = () => {
                     {Array.isArray(order.products) ? order.products.join(', ') : 'Unknown Product'}
                   </TableCell>
                   <TableCell className="text-right">
-                    £{order.total_amount
-                      ? (parseFloat(order.total_amount) + deliveryFee).toFixed(2)
-                      : deliveryFee.toFixed(2)}
+                    £{parseFloat(order.grand_total || '0').toFixed(2)}
                   </TableCell>
                   <TableCell>
                     <OrderStatusBadge status={order.order_status} />
@@ -275,9 +264,7 @@ const OrdersPage = () => {
                 <div>
                   <h3 className="text-sm font-medium text-muted-foreground">Amount</h3>
                   <p className="text-sm">
-                    £{selectedOrder.total_amount
-                      ? (parseFloat(selectedOrder.total_amount) + deliveryFee).toFixed(2)
-                      : deliveryFee.toFixed(2)}
+                    £{parseFloat(selectedOrder.grand_total || '0').toFixed(2)}
                     </p>
                 </div>
                 <div>
@@ -22,6 +22,9 @@ export interface Order {
   payment_status: string | null;
   order_number: string;
   order_status: string | null;
+  total_amount?: number;
+  item_count?: number;
+  grand_total?: string;
 }
 
 // Wishlist type based on wishlist table